@@ -0,0 +1,407 @@
+import asyncio
+import collections
+import json
+import random
+import typing as t
+
+import discord
+from aiohttp import web
+
+__all__ = ("FakeDiscord", "Ids")
+
+Payload = t.Dict[str, t.Any]
+Handler = t.Callable[[web.Request], t.Awaitable[web.StreamResponse]]
+
+
+class Ids:
+    # Fixed so the bot can be configured with them through the environment
+    GUILD = 1000
+    APPLICATION = 1001
+    BOT = 1002
+    MOD = 1003
+    MOD_ROLE = 1010
+    TICKET_CATEGORY = 1020
+    SUPPORT_CHANNEL = 1021
+    MOD_LOG_CHANNEL = 1022
+    PATREON_CHANNEL = 1023
+    QUESTIONS_CHANNEL = 1024
+
+
+def _user(user_id: int, name: str, bot: bool = False) -> Payload:
+    return {
+        "id": str(user_id),
+        "username": name,
+        "global_name": name,
+        "discriminator": "0",
+        "avatar": None,
+        "bot": bot,
+    }
+
+
+def _json(
+    data: t.Any, status: int = 200, headers: t.Optional[t.Dict[str, str]] = None
+) -> web.Response:
+    # discord.py only decodes bodies sent as exactly application/json, without a charset
+    headers = {**(headers or {}), "Content-Type": "application/json"}
+    return web.Response(body=json.dumps(data).encode(), status=status, headers=headers)
+
+
+def _timestamp(snowflake: int) -> str:
+    return discord.utils.snowflake_time(snowflake).isoformat()
+
+
+@t.final
+class _Snowflakes:
+    __slots__ = ("_last",)
+
+    def __init__(self) -> None:
+        self._last = 0
+
+    def next(self) -> int:
+        # Strictly increasing, several can be made within the same millisecond
+        self._last = max(self._last + 1, discord.utils.time_snowflake(discord.utils.utcnow()))
+        return self._last
+
+
+@t.final
+class FakeDiscord:
+    # Stands in for Discord's REST API and feeds the gateway events requests would cause back
+    # into the client, with optional latency and 429s on every request
+    __slots__ = (
+        "_random",
+        "_runner",
+        "_state",
+        "calls",
+        "channels",
+        "latency",
+        "messages",
+        "port",
+        "rate_limit",
+        "rate_limited",
+        "retry_after",
+        "snowflakes",
+    )
+
+    def __init__(
+        self,
+        *,
+        latency: float = 0.0,
+        rate_limit: float = 0.0,
+        retry_after: float = 1.0,
+        seed: t.Optional[int] = None,
+    ) -> None:
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.port = 0
+        self.calls: t.Counter[str] = collections.Counter()
+        self.rate_limited = 0
+        self.snowflakes = _Snowflakes()
+        self.channels: t.Dict[int, Payload] = {}
+        self.messages: t.DefaultDict[int, t.List[Payload]] = collections.defaultdict(list)
+        self._random = random.Random(seed)
+        self._runner: t.Optional[web.AppRunner] = None
+        self._state: t.Optional[t.Any] = None
+
+        for channel_id, name, kind, parent in (
+            (Ids.TICKET_CATEGORY, "Tickets", 4, None),
+            (Ids.SUPPORT_CHANNEL, "support", 0, None),
+            (Ids.MOD_LOG_CHANNEL, "mod-log", 0, None),
+            (Ids.PATREON_CHANNEL, "patreon", 0, None),
+            (Ids.QUESTIONS_CHANNEL, "questions", 0, None),
+        ):
+            self.channels[channel_id] = self._channel(channel_id, name, kind, parent)
+
+    def reset(self) -> None:
+        self.calls.clear()
+        self.rate_limited = 0
+
+    def _channel(
+        self,
+        channel_id: int,
+        name: str,
+        kind: int,
+        parent_id: t.Optional[int],
+        topic: t.Optional[str] = None,
+        overwrites: t.Sequence[Payload] = (),
+    ) -> Payload:
+        return {
+            "id": str(channel_id),
+            "guild_id": str(Ids.GUILD),
+            "type": kind,
+            "name": name,
+            "position": len(self.channels),
+            "parent_id": str(parent_id) if parent_id else None,
+            "topic": topic,
+            "nsfw": False,
+            "rate_limit_per_user": 0,
+            "permission_overwrites": list(overwrites),
+        }
+
+    def _message(self, channel_id: int, author: Payload, content: str, **extra: t.Any) -> Payload:
+        message_id = self.snowflakes.next()
+        return {
+            "id": str(message_id),
+            "channel_id": str(channel_id),
+            "guild_id": str(Ids.GUILD),
+            "author": author,
+            "content": content,
+            "timestamp": _timestamp(message_id),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": [],
+            "pinned": False,
+            "type": 0,
+            **extra,
+        }
+
+    def guild(self) -> Payload:
+        member = {
+            "roles": [],
+            "joined_at": _timestamp(Ids.GUILD),
+            "deaf": False,
+            "mute": False,
+            "flags": 0,
+        }
+        return {
+            "id": str(Ids.GUILD),
+            "name": "Bench",
+            "owner_id": str(Ids.MOD),
+            "features": [],
+            "premium_tier": 0,
+            "member_count": 2,
+            "roles": [
+                {"id": str(Ids.GUILD), "name": "@everyone", "permissions": "0", "position": 0},
+                {"id": str(Ids.MOD_ROLE), "name": "Moderator", "permissions": "8", "position": 1},
+            ],
+            "members": [
+                {**member, "user": _user(Ids.BOT, "hom", bot=True)},
+                {**member, "user": _user(Ids.MOD, "mod"), "roles": [str(Ids.MOD_ROLE)]},
+            ],
+            "channels": list(self.channels.values()),
+        }
+
+    def member(self, user_id: int, roles: t.Sequence[int] = ()) -> Payload:
+        return {
+            "user": _user(user_id, f"user{user_id}"),
+            "roles": [str(role) for role in roles],
+            "joined_at": _timestamp(user_id),
+            "deaf": False,
+            "mute": False,
+            "flags": 0,
+            "permissions": "0",
+        }
+
+    def interaction(
+        self, custom_id: str, user_id: int, channel_id: int, roles: t.Sequence[int] = ()
+    ) -> Payload:
+        interaction_id = self.snowflakes.next()
+        return {
+            "id": str(interaction_id),
+            "application_id": str(Ids.APPLICATION),
+            "type": 3,
+            "token": f"token-{interaction_id}",
+            "version": 1,
+            "guild_id": str(Ids.GUILD),
+            "channel_id": str(channel_id),
+            # Newer clients resolve the channel from this rather than channel_id
+            "channel": {"id": str(channel_id), "type": 0, "guild_id": str(Ids.GUILD)},
+            "member": self.member(user_id, roles),
+            "data": {"custom_id": custom_id, "component_type": 2},
+            "locale": "en-US",
+            "guild_locale": "en-US",
+            "app_permissions": "8",
+        }
+
+    def attach(self, state: t.Any) -> None:
+        # Events are only sent once the client has a guild to apply them to
+        self._state = state
+
+    def _dispatch(self, event: str, data: Payload) -> None:
+        if self._state:
+            getattr(self._state, f"parse_{event}")(data)
+
+    def add_ticket(self, owner_id: int, messages: int, topic: str = "Other") -> int:
+        # Only the history knows about these messages, like tickets opened before live capture
+        channel_id = self.snowflakes.next()
+        overwrites = [{"id": str(owner_id), "type": 1, "allow": "1024", "deny": "0"}]
+        channel = self._channel(
+            channel_id, f"help-user{owner_id}", 0, Ids.TICKET_CATEGORY, topic, overwrites
+        )
+        self.channels[channel_id] = channel
+
+        author = _user(owner_id, f"user{owner_id}")
+        self.messages[channel_id] = [
+            self._message(channel_id, author, f"Message {i} " + "lorem ipsum " * 8)
+            for i in range(messages)
+        ]
+        self._dispatch("channel_create", channel)
+        return channel_id
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler: Handler) -> web.StreamResponse:
+        resource = request.match_info.route.resource
+        self.calls[f"{request.method} {resource.canonical if resource else request.path}"] += 1
+
+        if self.latency:
+            await asyncio.sleep(self._random.uniform(0.5, 1.5) * self.latency)
+
+        if self.rate_limit and self._random.random() < self.rate_limit:
+            self.rate_limited += 1
+            # discord.py treats a 429 without Via as a Cloudflare ban rather than a rate limit
+            return _json(
+                {"message": "You are being rate limited.", "retry_after": self.retry_after},
+                status=429,
+                headers={"Via": "1.1 google", "X-RateLimit-Scope": "user"},
+            )
+
+        return await handler(request)
+
+    async def _me(self, _: web.Request) -> web.Response:
+        return _json(_user(Ids.BOT, "hom", bot=True))
+
+    async def _application(self, _: web.Request) -> web.Response:
+        return _json(
+            {
+                "id": str(Ids.APPLICATION),
+                "name": "hom",
+                "icon": None,
+                "description": "",
+                "bot_public": False,
+                "bot_require_code_grant": False,
+                "owner": _user(Ids.MOD, "mod"),
+                "verify_key": "",
+                "flags": 0,
+            }
+        )
+
+    async def _commands(self, _: web.Request) -> web.Response:
+        return _json([])
+
+    async def _user(self, request: web.Request) -> web.Response:
+        user_id = int(request.match_info["user_id"])
+        return _json(_user(user_id, f"user{user_id}"))
+
+    async def _no_content(self, request: web.Request) -> web.Response:
+        await request.read()
+        return web.Response(status=204)
+
+    async def _create_channel(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        channel_id = self.snowflakes.next()
+        parent_id = data.get("parent_id")
+        channel = self._channel(
+            channel_id,
+            data["name"],
+            data.get("type", 0),
+            int(parent_id) if parent_id else None,
+            data.get("topic"),
+            data.get("permission_overwrites", ()),
+        )
+        self.channels[channel_id] = channel
+        self._dispatch("channel_create", channel)
+        return _json(channel)
+
+    async def _edit_channel(self, request: web.Request) -> web.Response:
+        if not (channel := self.channels.get(int(request.match_info["channel_id"]))):
+            return _json({"message": "Unknown Channel", "code": 10003}, status=404)
+
+        channel.update({k: v for k, v in (await request.json()).items() if k in channel})
+        self._dispatch("channel_update", channel)
+        return _json(channel)
+
+    async def _delete_channel(self, request: web.Request) -> web.Response:
+        channel_id = int(request.match_info["channel_id"])
+        if not (channel := self.channels.pop(channel_id, None)):
+            return _json({"message": "Unknown Channel", "code": 10003}, status=404)
+
+        self.messages.pop(channel_id, None)
+        self._dispatch("channel_delete", channel)
+        return _json(channel)
+
+    async def _history(self, request: web.Request) -> web.Response:
+        messages = self.messages.get(int(request.match_info["channel_id"]), [])
+        ids = [int(m["id"]) for m in messages]
+        limit = int(request.query.get("limit", 50))
+
+        if "after" in request.query:
+            start = next(
+                (i for i, m in enumerate(ids) if m > int(request.query["after"])), len(ids)
+            )
+            page = messages[start : start + limit]
+        else:
+            before = int(request.query.get("before", 1 << 63))
+            end = next((i for i, m in enumerate(ids) if m >= before), len(ids))
+            page = messages[max(0, end - limit) : end]
+
+        # Newest first, like Discord
+        return _json(page[::-1])
+
+    async def _send_message(self, request: web.Request) -> web.Response:
+        channel_id = int(request.match_info.get("channel_id", Ids.MOD_LOG_CHANNEL))
+
+        if request.content_type.startswith("multipart/"):
+            data: Payload = {}
+            reader = await request.multipart()
+
+            while part := await reader.next():
+                if getattr(part, "name", None) == "payload_json":
+                    data = json.loads(await part.text())  # type: ignore
+                else:
+                    await part.read()  # type: ignore
+        else:
+            data = await request.json()
+
+        author = _user(Ids.BOT, "hom", bot=True)
+        message = self._message(
+            channel_id, author, data.get("content") or "", embeds=data.get("embeds") or []
+        )
+
+        if channel_id in self.channels:
+            self.messages[channel_id].append(message)
+            self._dispatch("message_create", message)
+
+        return _json(message)
+
+    async def _unknown(self, request: web.Request) -> web.Response:
+        await request.read()
+        return _json({"message": "Not implemented by the fake", "code": 0}, status=404)
+
+    async def start(self) -> str:
+        app = web.Application(middlewares=[self._middleware])
+        routes = (
+            ("GET", "/users/@me", self._me),
+            ("GET", "/users/{user_id}", self._user),
+            ("GET", "/oauth2/applications/@me", self._application),
+            ("PUT", "/applications/{application_id}/commands", self._commands),
+            ("POST", "/interactions/{interaction_id}/{token}/callback", self._no_content),
+            ("POST", "/webhooks/{application_id}/{token}", self._send_message),
+            ("POST", "/guilds/{guild_id}/channels", self._create_channel),
+            ("PATCH", "/channels/{channel_id}", self._edit_channel),
+            ("DELETE", "/channels/{channel_id}", self._delete_channel),
+            ("GET", "/channels/{channel_id}/messages", self._history),
+            ("POST", "/channels/{channel_id}/messages", self._send_message),
+            ("PUT", "/channels/{channel_id}/permissions/{target_id}", self._no_content),
+            ("DELETE", "/channels/{channel_id}/permissions/{target_id}", self._no_content),
+            ("POST", "/channels/{channel_id}/typing", self._no_content),
+        )
+
+        for method, path, handler in routes:
+            app.router.add_route(method, f"/api/v10{path}", handler)
+
+        app.router.add_route("*", "/api/v10/{path:.*}", self._unknown)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", 0).start()
+
+        self.port = self._runner.addresses[0][1]
+        return f"http://127.0.0.1:{self.port}/api/v10"
+
+    async def close(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
@@ -0,0 +1,223 @@
+import asyncio
+import collections
+import time
+import typing as t
+
+import discord
+
+from bench.fake import FakeDiscord
+from bench.fake import Ids
+from hom.bot import Bot
+from hom.catalog import TicketType
+from hom.cogs import views
+
+__all__ = ("Harness", "Result", "close_tickets", "open_tickets", "report")
+
+
+def _percentile(values: t.Sequence[float], q: float) -> float:
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Result(t.NamedTuple):
+    scenario: str
+    operations: int
+    elapsed: float
+    latencies: t.List[float]
+    errors: t.Dict[str, int]
+    calls: t.Dict[str, int]
+    rate_limited: int
+
+    @property
+    def throughput(self) -> float:
+        return len(self.latencies) / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        return {
+            "scenario": self.scenario,
+            "operations": self.operations,
+            "completed": len(self.latencies),
+            "elapsed": self.elapsed,
+            "throughput": self.throughput,
+            "p50": _percentile(self.latencies, 0.5),
+            "p99": _percentile(self.latencies, 0.99),
+            "max": max(self.latencies, default=0.0),
+            "errors": self.errors,
+            "calls": sum(self.calls.values()),
+            "calls_by_route": self.calls,
+            "rate_limited": self.rate_limited,
+        }
+
+
+@t.final
+class Harness:
+    __slots__ = ("bot", "fake")
+
+    def __init__(self, fake: FakeDiscord) -> None:
+        self.fake = fake
+        self.bot = Bot()
+
+    async def start(self) -> None:
+        discord.http.Route.BASE = await self.fake.start()
+        await self.bot.login("bench")
+
+        state = self.bot._connection
+        state._add_guild_from_data(self.fake.guild())  # type: ignore
+        self.fake.attach(state)
+        await self.bot.apply_guild_configs()
+
+        # There's no gateway to send READY, which is all the close queue waits for
+        self.bot._ready.set()
+
+    async def close(self) -> None:
+        # The bot flushes its mod logs on the way out, so the fake has to outlive it
+        await self.bot.close()
+        await self.fake.close()
+
+    def interaction(
+        self, custom_id: str, user_id: int, channel_id: int, roles: t.Sequence[int] = ()
+    ) -> discord.Interaction[Bot]:
+        data = self.fake.interaction(custom_id, user_id, channel_id, roles)
+        return discord.Interaction(data=data, state=self.bot._connection)  # type: ignore
+
+
+async def _measure(
+    name: str,
+    fake: FakeDiscord,
+    operations: t.Sequence[t.Callable[[], t.Awaitable[None]]],
+    delays: t.Sequence[float],
+) -> Result:
+    latencies: t.List[float] = []
+    errors: t.Counter[str] = collections.Counter()
+
+    async def run(operation: t.Callable[[], t.Awaitable[None]], delay: float) -> None:
+        await asyncio.sleep(delay)
+        started = time.perf_counter()
+
+        try:
+            await operation()
+        except Exception as e:
+            errors[type(e).__name__] += 1
+        else:
+            latencies.append(time.perf_counter() - started)
+
+    fake.reset()
+    started = time.perf_counter()
+    await asyncio.gather(*(run(op, delay) for op, delay in zip(operations, delays)))
+
+    return Result(
+        name,
+        len(operations),
+        time.perf_counter() - started,
+        latencies,
+        dict(errors),
+        dict(fake.calls),
+        fake.rate_limited,
+    )
+
+
+async def open_tickets(harness: Harness, tickets: int, duration: float) -> Result:
+    catalog = harness.bot.catalogs.get(None)
+    buttons = [
+        views.CatalogButton(catalog, entry, catalog.style)
+        for entry in catalog
+        if isinstance(entry, TicketType)
+    ]
+
+    def operation(i: int) -> t.Callable[[], t.Awaitable[None]]:
+        button = buttons[i % len(buttons)]
+        assert button.custom_id
+
+        async def inner() -> None:
+            # A different user every time, so nobody runs into their own open ticket
+            user_id = harness.fake.snowflakes.next()
+            interaction = harness.interaction(button.custom_id or "", user_id, Ids.SUPPORT_CHANNEL)
+            await button.callback(interaction)
+
+        return inner
+
+    # Spread evenly over the duration, the way a burst of clicks would arrive
+    delays = [i * duration / tickets for i in range(tickets)]
+    return await _measure(
+        f"open {tickets} tickets in {duration:g}s",
+        harness.fake,
+        [operation(i) for i in range(tickets)],
+        delays,
+    )
+
+
+async def close_tickets(
+    harness: Harness, tickets: int, messages: int, timeout: float = 600.0
+) -> Result:
+    bot, fake = harness.bot, harness.fake
+    channel_ids = [fake.add_ticket(fake.snowflakes.next(), messages) for _ in range(tickets)]
+    deleted: t.Dict[int, asyncio.Future[None]] = {
+        channel_id: asyncio.get_running_loop().create_future() for channel_id in channel_ids
+    }
+
+    async def on_delete(channel: discord.abc.GuildChannel) -> None:
+        if (future := deleted.get(channel.id)) and not future.done():
+            future.set_result(None)
+
+    bot.add_listener(on_delete, "on_guild_channel_delete")
+    button = next(
+        item
+        for item in views.SupportMessageCloseChannel().children
+        if isinstance(item, discord.ui.Button)
+    )
+
+    def operation(channel_id: int) -> t.Callable[[], t.Awaitable[None]]:
+        async def inner() -> None:
+            # Measured from the moderator's click until the channel is gone
+            assert button.custom_id
+            interaction = harness.interaction(
+                button.custom_id, Ids.MOD, channel_id, roles=(Ids.MOD_ROLE,)
+            )
+            await button.callback(interaction)
+            await asyncio.wait_for(deleted[channel_id], timeout)
+
+        return inner
+
+    try:
+        return await _measure(
+            f"close {tickets} tickets with {messages} messages",
+            fake,
+            [operation(channel_id) for channel_id in channel_ids],
+            [0.0] * tickets,
+        )
+    finally:
+        bot.remove_listener(on_delete, "on_guild_channel_delete")
+
+
+def report(result: Result, bot: Bot) -> str:
+    completed = len(result.latencies)
+    calls = sum(result.calls.values())
+    lines = [
+        f"{result.scenario}",
+        f"  completed   {completed}/{result.operations} in {result.elapsed:.1f}s "
+        f"({result.throughput:.1f}/s)",
+        f"  latency     p50 {_percentile(result.latencies, 0.5) * 1000:.0f}ms, "
+        f"p99 {_percentile(result.latencies, 0.99) * 1000:.0f}ms, "
+        f"max {max(result.latencies, default=0.0) * 1000:.0f}ms",
+        f"  REST calls  {calls} ({calls / max(result.operations, 1):.1f} per operation), "
+        f"{result.rate_limited} rate limited",
+    ]
+
+    if result.errors:
+        errors = ", ".join(f"{name} x{count}" for name, count in result.errors.items())
+        lines.append(f"  errors      {errors}")
+
+    for route, count in sorted(result.calls.items(), key=lambda item: -item[1])[:8]:
+        lines.append(f"    {count:>7}  {route}")
+
+    lines.append("  handlers")
+    lines.extend(
+        f"    {s.handler:<40} defer p50 {s.defer_p50 * 1000:.0f}ms p99 {s.defer_p99 * 1000:.0f}ms,"
+        f" {s.rest_calls:.1f} REST calls"
+        for s in bot.metrics.summary()
+    )
+
+    return "\n".join(lines)
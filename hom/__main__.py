@@ -1,15 +1,27 @@
 import os
+import time
 
-from hom.bot import Bot
 from hom.config import Config
 
 if __name__ == "__main__":
-    if os.name != "nt":
-        import uvloop
+    if Config.WORKERS > 1:
+        from hom import launcher
 
-        # Faster drop in replacement for the asyncio event loop
-        # Only works on unix-like systems
-        uvloop.install()
+        shard_count = Config.SHARD_COUNT or launcher.recommended_shards(Config.DISCORD_TOKEN)
+        launcher.Supervisor(shard_count, Config.WORKERS).run()
 
-    bot = Bot()
-    bot.run(Config.DISCORD_TOKEN)
+    else:
+        started = time.perf_counter()
+        from hom.bot import Bot
+
+        if os.name != "nt":
+            import uvloop
+
+            # Faster drop in replacement for the asyncio event loop
+            # Only works on unix-like systems
+            uvloop.install()
+
+        bot = Bot(
+            shard_count=Config.SHARD_COUNT, started=started, metrics_port=Config.METRICS_PORT
+        )
+        bot.run(Config.DISCORD_TOKEN, root_logger=True)
@@ -0,0 +1,124 @@
+import asyncio
+import functools
+import hashlib
+import logging
+import os
+import tempfile
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import aiohttp
+
+__all__ = ("AttachmentStore", "StoredAttachment")
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+T = t.TypeVar("T")
+
+
+class StoredAttachment(t.NamedTuple):
+    filename: str
+    digest: str
+    # Relative to the store's root directory
+    path: str
+    size: int
+
+
+@t.final
+class AttachmentStore:
+    __slots__ = ("_executor", "_max_size", "_root", "_semaphore", "_session")
+
+    def __init__(
+        self, root: Path, *, concurrency: int = 4, max_size: int = 25 * 1024 * 1024
+    ) -> None:
+        self._root = root
+        self._max_size = max_size
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._session: t.Optional[aiohttp.ClientSession] = None
+        # Disk writes happen off the event loop, one thread per concurrent download
+        self._executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="hom-attachments"
+        )
+
+    @property
+    def root(self) -> Path:
+        return self._root
+
+    async def start(self) -> None:
+        if not self._session:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60))
+
+    async def close(self) -> None:
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+        self._executor.shutdown(wait=False)
+
+    async def _run(self, func: t.Callable[..., T], *args: t.Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    def _create(self) -> t.Tuple[t.IO[bytes], str]:
+        self._root.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self._root, suffix=".part")
+        return os.fdopen(fd, "wb"), tmp
+
+    def _store(self, tmp: str, digest: str, filename: str) -> StoredAttachment:
+        # Files are named by their content hash so the same image is only stored once
+        path = Path(digest[:2]) / f"{digest}{Path(filename).suffix.lower()}"
+        target = self._root / path
+        target.parent.mkdir(exist_ok=True)
+
+        if not target.exists():
+            os.replace(tmp, target)
+
+        return StoredAttachment(filename, digest, path.as_posix(), target.stat().st_size)
+
+    async def _download(self, url: str, file: t.IO[bytes]) -> t.Optional[str]:
+        assert self._session
+        digest = hashlib.sha256()
+        size = 0
+
+        async with self._session.get(url) as response:
+            response.raise_for_status()
+
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                size += len(chunk)
+                if size > self._max_size:
+                    return None
+
+                digest.update(chunk)
+                await self._run(file.write, chunk)
+
+        return digest.hexdigest()
+
+    async def save(
+        self, url: str, filename: str, size: t.Optional[int] = None
+    ) -> t.Optional[StoredAttachment]:
+        if size and size > self._max_size:
+            return None
+
+        file, tmp = await self._run(self._create)
+
+        try:
+            async with self._semaphore:
+                try:
+                    digest = await self._download(url, file)
+                finally:
+                    await self._run(file.close)
+
+            if not digest:
+                return None
+
+            return await self._run(self._store, tmp, digest, filename)
+
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            logger.warning(f"Failed to download attachment {filename!r}", exc_info=True)
+            return None
+
+        finally:
+            await self._run(Path(tmp).unlink, True)
@@ -1,25 +1,327 @@
-from pathlib import Path
+import asyncio
+import logging
+import time
+import tracemalloc
+import typing as t
 
 import discord
 from discord.ext import commands
+from discord.ext import tasks
 
+from hom.attachments import AttachmentStore
+from hom.capacity import CategoryStore
+from hom.capacity import TicketCapacity
+from hom.catalog import Catalogs
+from hom.config import Config
 from hom.config import Constants
+from hom.cooldowns import Cooldowns
+from hom.database import Database
+from hom.extensions import EXTENSIONS
+from hom.guilds import GuildConfigs
+from hom.jobs import CloseQueue
+from hom.metrics import Metrics
+from hom.metrics import MetricsServer
+from hom.modlog import ModLog
+from hom.profiles import build_profile
+from hom.registry import Registry
+from hom.scheduler import RestScheduler
+from hom.search import TranscriptIndex
+from hom.startup import StartupTimer
+from hom.stats import TicketStats
+from hom.sweeper import InactivitySweeper
+from hom.sync import CommandSync
+from hom.tickets import TicketIndex
+from hom.tickets import TicketStore
+from hom.transcripts import TranscriptLog
+from hom.watchdog import LoopWatchdog
 
 __all__ = ("Bot",)
 
+logger = logging.getLogger(__name__)
 
-class Bot(commands.Bot):
-    def __init__(self) -> None:
-        super().__init__(Constants.PREFIX, intents=discord.Intents.all())
+
+class Bot(commands.AutoShardedBot):
+    def __init__(
+        self,
+        *,
+        shard_ids: t.Optional[t.List[int]] = None,
+        shard_count: t.Optional[int] = None,
+        started: t.Optional[float] = None,
+        metrics_port: t.Optional[int] = None,
+    ) -> None:
+        # Imports are only timed when the caller noted when it started importing the bot
+        self.startup = StartupTimer(started or time.perf_counter())
+        self.startup.mark("imports")
+
+        if Config.TRACEMALLOC and not tracemalloc.is_tracing():
+            tracemalloc.start(Config.TRACEMALLOC)
+
+        self.profile = build_profile(
+            Config.CACHE_PROFILE,
+            EXTENSIONS,
+            max_messages=Config.MAX_MESSAGES or None,
+            chunk_guilds_at_startup=Config.CHUNK_GUILDS,
+        )
+        self.metrics = Metrics()
+        super().__init__(
+            Constants.PREFIX,
+            intents=self.profile.intents,
+            member_cache_flags=self.profile.member_cache_flags,
+            max_messages=self.profile.max_messages,
+            chunk_guilds_at_startup=self.profile.chunk_guilds_at_startup,
+            shard_ids=shard_ids,
+            shard_count=shard_count,
+            http_trace=self.metrics.trace,
+        )
+        self.metrics_server = MetricsServer(self.metrics, metrics_port) if metrics_port else None
+        self.watchdog = (
+            LoopWatchdog(self.metrics, Config.LOOP_STALL_MS / 1000)
+            if Config.LOOP_STALL_MS
+            else None
+        )
+        self.db = Database(Config.DATA_DIR / "hom.db")
+        self.guild_configs = GuildConfigs(Config.GUILDS_FILE)
+        self.catalogs = Catalogs(Config.CATALOG_FILE)
+        self.registry = Registry()
+        self.cooldowns = Cooldowns()
+        self.scheduler = RestScheduler()
+        self.tickets = TicketIndex()
+        self.capacities: t.Dict[int, TicketCapacity] = {}
+        self.category_store = CategoryStore(self.db)
+        self.ticket_store = TicketStore(self.db)
+        self.ticket_stats = TicketStats(self.db)
+        self.sweeper = InactivitySweeper(
+            self.db, Config.INACTIVITY_PING_HOURS * 3600, Config.INACTIVITY_CLOSE_HOURS * 3600
+        )
+        self.transcript_log = TranscriptLog(Config.DATA_DIR / "transcripts")
+        self.close_queue = CloseQueue(self.db)
+        self.transcript_index = TranscriptIndex(self.db)
+        self.command_sync = CommandSync(self.db, self.tree)
+        self.attachments = AttachmentStore(Config.DATA_DIR / "attachments")
+        self.mod_logs: t.Dict[int, ModLog] = {}
+
+    @property
+    def partitioned(self) -> bool:
+        # Only part of the shards run in this process, the rest belong to other workers
+        return self.shard_ids is not None
+
+    def owns_guild(self, guild_id: int) -> bool:
+        if self.shard_ids is None or self.shard_count is None:
+            return True
+
+        return (guild_id >> 22) % self.shard_count in self.shard_ids
+
+    def capacity(self, guild_id: int) -> TicketCapacity:
+        if (capacity := self.capacities.get(guild_id)) is None:
+            capacity = self.capacities[guild_id] = TicketCapacity()
+
+        return capacity
+
+    def mod_log(self, guild_id: int) -> ModLog:
+        if (mod_log := self.mod_logs.get(guild_id)) is None:
+            config = self.guild_configs.get(guild_id)
+            mod_log = self.mod_logs[guild_id] = ModLog(
+                self, self.scheduler, config.mod_log_channel
+            )
+            mod_log.start()
+
+        return mod_log
+
+    async def apply_guild_configs(self) -> None:
+        overflow = await self.category_store.all()
+        categories: t.List[discord.CategoryChannel] = []
+
+        configs = self.guild_configs
+        if (
+            configs.home_guild is None
+            and not len(configs)
+            and not self.partitioned
+            and len(self.guilds) == 1
+        ):
+            # Deployments from before HOM_HOME_GUILD served their only guild from the
+            # environment, which keeps working without it
+            configs.home_guild = self.guilds[0].id
+            await self.transcript_index.assign(configs.home_guild)
+
+        for guild in self.guilds:
+            if not configs.configured(guild.id):
+                # Otherwise the registry would file the environment's IDs under this guild
+                self.registry.clear(guild.id)
+                logger.warning(f"Guild {guild.id} has no configuration, tickets are disabled")
+                continue
+
+            config = configs.get(guild.id)
+            stored = overflow.get(guild.id, [])
+            self.registry.resolve(guild, config, stored)
+
+            if config.catalog and config.catalog not in self.catalogs:
+                logger.error(f"Unknown ticket catalog {config.catalog!r} for guild {guild.id}")
+
+            category_ids = (*config.categories, *stored)
+            found = [c for c in map(self.registry.category, category_ids) if c]
+            self.capacity(guild.id).rebuild(found)
+            self.mod_log(guild.id).channel_id = config.mod_log_channel
+            categories.extend(found)
+
+        self.tickets.rebuild(categories)
+        self.sweeper.rebuild(c for category in categories for c in category.text_channels)
 
     async def setup_hook(self) -> None:
-        for path in Path("./hom/cogs").glob("[!_]*.py"):
-            await self.load_extension(f"hom.cogs.{path.stem}")
+        self.startup.mark("login")
+
+        if self.watchdog:
+            self.watchdog.start()
+
+        await asyncio.gather(self.guild_configs.reload(), self.catalogs.load())
+
+        if self.guild_configs.home_guild is None and len(self.guild_configs):
+            raise RuntimeError("HOM_HOME_GUILD has to be set when HOM_GUILDS_FILE is used")
+
+        await self.db.connect()
+        await asyncio.gather(
+            self.attachments.start(),
+            self.ticket_store.setup(),
+            self.ticket_stats.setup(),
+            self.sweeper.setup(),
+            self.category_store.setup(),
+            self.close_queue.setup(),
+            self.transcript_index.setup(),
+            self.command_sync.setup(),
+        )
+        self.sweep_cooldowns.start()
+
+        if self.metrics_server:
+            try:
+                await self.metrics_server.start()
+            except OSError:
+                # Metrics are nice to have, a taken port shouldn't keep the bot offline
+                logger.exception("Couldn't start the metrics server")
+
+        self.startup.mark("setup")
+
+        # Cogs don't depend on each other being loaded, only on the bot's own state
+        await asyncio.gather(*(self.load_extension(e.name) for e in EXTENSIONS if not e.lazy))
+        self.startup.mark("extensions")
+
+        # Every worker registers the same commands, so only the one running shard 0 syncs them
+        if self.application_id and (not self.shard_ids or 0 in self.shard_ids):
+            try:
+                await self.command_sync.sync(self.application_id)
+            except discord.HTTPException:
+                logger.exception("Failed to sync application commands")
+
+            self.startup.mark("command sync")
+
+        self.add_listener(self._on_first_event, "on_socket_event_type")
+
+    async def _on_first_event(self, event: str) -> None:
+        if event == "READY":
+            self.remove_listener(self._on_first_event, "on_socket_event_type")
+            self.startup.mark("gateway ready")
+
+    async def _load_lazy_extensions(self) -> None:
+        for extension in EXTENSIONS:
+            if extension.lazy and extension.name not in self.extensions:
+                await self.load_extension(extension.name)
+
+        self.startup.mark("lazy extensions")
 
     async def on_ready(self) -> None:
         user = self.user.display_name if self.user else "Bot"
+        await self.apply_guild_configs()
+        # Listeners that go by which channels are tickets wait for this, on_ready itself fires
+        # for every listener at once and the ticket index isn't rebuilt until the above is done
+        self.dispatch("tickets_ready")
         print(f"{user} has connected to Discord!")
 
+        if "guild chunking" in self.startup:
+            # Reconnects fire this again, but startup only happens once
+            return None
+
+        if self.guild_configs.home_guild is None and self.guilds:
+            # Without a home guild there's no telling which guild the environment's IDs are for
+            logger.critical("HOM_HOME_GUILD has to be set when the bot is in several guilds")
+            await self.close()
+            return None
+
+        self.startup.mark("guild chunking")
+        await self._load_lazy_extensions()
+        logger.info("Startup timings:\n" + "\n".join(self.startup.report()))
+
+    async def on_guild_join(self, _: discord.Guild) -> None:
+        await self.apply_guild_configs()
+
+    async def on_guild_remove(self, guild: discord.Guild) -> None:
+        self.registry.clear(guild.id)
+        await self.apply_guild_configs()
+
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel) -> None:
+        self.tickets.update(channel)
+        self.capacity(channel.guild.id).update(channel)
+
+        if isinstance(channel, discord.TextChannel) and self.tickets.is_ticket(channel):
+            self.sweeper.track(channel)
+
+    async def on_guild_channel_update(
+        self, _: discord.abc.GuildChannel, channel: discord.abc.GuildChannel
+    ) -> None:
+        self.registry.update(channel)
+        self.tickets.update(channel)
+        self.capacity(channel.guild.id).update(channel)
+
+        if isinstance(channel, discord.TextChannel) and self.tickets.is_ticket(channel):
+            self.sweeper.track(channel)
+        else:
+            await self.sweeper.remove(channel.id)
+
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel) -> None:
+        capacity = self.capacity(channel.guild.id)
+        self.tickets.remove(channel.id)
+        capacity.remove(channel)
+
+        if isinstance(channel, discord.CategoryChannel) and channel.id in capacity:
+            self.registry.forget(channel.id)
+            self.tickets.remove_category(channel.id)
+            capacity.remove_category(channel.id)
+            await self.category_store.remove(channel.id)
+
+        self.registry.remove(channel.id)
+
+        if self.tickets.is_ticket(channel):
+            await self.ticket_store.remove(channel.id)
+            # Tickets closed through the close queue have already been counted by now
+            await self.ticket_stats.closed(channel.id, None)
+            await self.sweeper.remove(channel.id)
+
+    async def on_guild_role_update(self, _: discord.Role, role: discord.Role) -> None:
+        self.registry.update(role)
+
+    async def on_guild_role_delete(self, role: discord.Role) -> None:
+        self.registry.remove(role.id)
+
+    @tasks.loop(minutes=5)
+    async def sweep_cooldowns(self) -> None:
+        self.cooldowns.sweep()
+
+    async def close(self) -> None:
+        self.sweep_cooldowns.cancel()
+
+        if self.watchdog:
+            self.watchdog.stop()
+
+        self.close_queue.stop()
+        self.sweeper.stop()
+        # Pending log entries still need the HTTP session, so they go out first
+        await asyncio.gather(*(mod_log.close() for mod_log in self.mod_logs.values()))
+        await super().close()
+
+        if self.metrics_server:
+            await self.metrics_server.close()
+
+        await self.transcript_log.close()
+        await self.attachments.close()
+        await self.db.close()
+
     async def on_command_error(  # type: ignore
         self, ctx: commands.Context[commands.Bot], exc: commands.CommandError
     ) -> None:
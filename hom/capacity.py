@@ -0,0 +1,150 @@
+import asyncio
+import collections
+import typing as t
+
+import discord
+
+from hom.database import Database
+
+__all__ = ("CategoryStore", "TicketCapacity")
+
+# Discord refuses to create more channels than this in one category
+CATEGORY_LIMIT = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS overflow_categories (
+    category_id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL
+);
+"""
+
+
+@t.final
+class TicketCapacity:
+    __slots__ = ("_channels", "_limit", "_lock", "_reserved", "_waiting")
+
+    def __init__(self, categories: t.Iterable[int] = (), *, limit: int = CATEGORY_LIMIT) -> None:
+        self._limit = limit
+        # Insertion order is the order categories are filled in
+        self._channels: t.Dict[int, t.Set[int]] = {c: set() for c in categories}
+        self._reserved: t.Dict[int, int] = {c: 0 for c in self._channels}
+        self._waiting: t.Deque[asyncio.Future[int]] = collections.deque()
+        self._lock = asyncio.Lock()
+
+    def __contains__(self, category_id: int) -> bool:
+        return category_id in self._channels
+
+    def __iter__(self) -> t.Iterator[int]:
+        return iter(list(self._channels))
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        # Held while a new category is being created so only one gets made at a time
+        return self._lock
+
+    @property
+    def waiting(self) -> int:
+        return sum(not future.done() for future in self._waiting)
+
+    def count(self, category_id: int) -> int:
+        return len(self._channels[category_id]) + self._reserved[category_id]
+
+    def add_category(
+        self, category_id: int, channels: t.Iterable[discord.abc.GuildChannel] = ()
+    ) -> None:
+        self._channels.setdefault(category_id, set()).update(c.id for c in channels)
+        self._reserved.setdefault(category_id, 0)
+        self._admit()
+
+    def remove_category(self, category_id: int) -> None:
+        self._channels.pop(category_id, None)
+        self._reserved.pop(category_id, None)
+
+    def rebuild(self, categories: t.Iterable[discord.CategoryChannel]) -> None:
+        categories = list(categories)
+        self._channels = {
+            category.id: {c.id for c in category.channels} for category in categories
+        }
+        # Reservations for tickets that are still being created carry over
+        self._reserved = {c.id: self._reserved.get(c.id, 0) for c in categories}
+        self._admit()
+
+    def reserve(self) -> t.Optional[int]:
+        for category_id in self._channels:
+            if self.count(category_id) < self._limit:
+                self._reserved[category_id] += 1
+                return category_id
+
+        return None
+
+    def release(self, category_id: int) -> None:
+        if category_id in self._reserved:
+            self._reserved[category_id] -= 1
+
+        self._admit()
+
+    def enqueue(self) -> "t.Tuple[int, asyncio.Future[int]]":
+        future: asyncio.Future[int] = asyncio.get_running_loop().create_future()
+        self._waiting.append(future)
+        return self.waiting, future
+
+    def add(self, channel: discord.abc.GuildChannel) -> None:
+        if channel.category_id in self._channels:
+            self._channels[channel.category_id].add(channel.id)
+
+    def remove(self, channel: discord.abc.GuildChannel) -> None:
+        self._discard(channel)
+        self._admit()
+
+    def update(self, channel: discord.abc.GuildChannel) -> None:
+        self._discard(channel)
+        self.add(channel)
+        self._admit()
+
+    def _discard(self, channel: discord.abc.GuildChannel) -> None:
+        for channels in self._channels.values():
+            channels.discard(channel.id)
+
+    def _admit(self) -> None:
+        # Hands freed up slots to queued tickets in the order they arrived
+        while self._waiting:
+            if self._waiting[0].done():
+                self._waiting.popleft()
+                continue
+
+            if (category_id := self.reserve()) is None:
+                return None
+
+            self._waiting.popleft().set_result(category_id)
+
+
+@t.final
+class CategoryStore:
+    __slots__ = ("_db",)
+
+    def __init__(self, db: Database) -> None:
+        self._db = db
+
+    async def setup(self) -> None:
+        await self._db.executescript(SCHEMA)
+
+    async def all(self) -> t.Dict[int, t.List[int]]:
+        categories: t.Dict[int, t.List[int]] = collections.defaultdict(list)
+
+        for category_id, guild_id in await self._db.fetchall("SELECT * FROM overflow_categories"):
+            categories[guild_id].append(category_id)
+
+        return categories
+
+    async def add(self, guild_id: int, category_id: int) -> None:
+        await self._db.execute(
+            "INSERT OR IGNORE INTO overflow_categories VALUES (?, ?)", (category_id, guild_id)
+        )
+
+    async def remove(self, category_id: int) -> None:
+        await self._db.execute(
+            "DELETE FROM overflow_categories WHERE category_id = ?", (category_id,)
+        )
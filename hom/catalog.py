@@ -0,0 +1,209 @@
+import asyncio
+import json
+import logging
+import string
+import typing as t
+from pathlib import Path
+
+import discord
+
+from hom.config import Constants
+from hom.guilds import GuildConfig
+
+__all__ = ("Catalog", "Catalogs", "Menu", "TicketType")
+
+logger = logging.getLogger(__name__)
+
+DEFAULT = "default"
+# Discord allows 5 rows of 5 buttons per message
+MAX_BUTTONS = 25
+STYLES = ("blurple", "grey", "green", "red")
+
+TICKET_FOOTER = (
+    "This channel is only visible to you and our moderators. If your question has been "
+    "answered, feel free to close the ticket."
+)
+
+_FORMATTER = string.Formatter()
+
+
+@t.final
+class TicketType:
+    __slots__ = (
+        "_embeds",
+        "_fields",
+        "_template",
+        "custom_id",
+        "example_url",
+        "label",
+        "synopsis",
+        "topic",
+    )
+
+    def __init__(
+        self,
+        label: str,
+        custom_id: str,
+        topic: str,
+        instructions: str,
+        example_url: t.Optional[str] = None,
+        synopsis: t.Optional[str] = None,
+    ) -> None:
+        self.label = label
+        self.custom_id = custom_id
+        self.topic = topic
+        self.example_url = example_url
+        self.synopsis = synopsis or label
+
+        fields = {name for _, name, _, _ in _FORMATTER.parse(instructions) if name is not None}
+        if unknown := ", ".join(sorted(fields - set(GuildConfig._fields))):
+            raise ValueError(f"Unknown placeholders {unknown} in {custom_id!r}")
+
+        self._template = discord.Embed(
+            description=f"{instructions}\n\n{Constants.FOOTER}", title=topic
+        )
+        self._template.set_footer(text=TICKET_FOOTER)
+
+        if example_url:
+            self._template.set_image(url=example_url)
+
+        # Placeholders are filled with the clicking guild's IDs, so embeds are compiled once
+        # per distinct set of values and the common case without any is compiled right here
+        self._fields = tuple(sorted(fields))
+        self._embeds: t.Dict[t.Tuple[t.Any, ...], discord.Embed] = {}
+
+        if not self._fields:
+            self._embeds[()] = self._template
+
+    def embed(self, config: GuildConfig) -> discord.Embed:
+        # The returned embed is shared, callers must copy it before changing anything
+        key = tuple(getattr(config, field) for field in self._fields)
+
+        if (embed := self._embeds.get(key)) is None:
+            embed = self._embeds[key] = self._template.copy()
+            embed.description = (self._template.description or "").format_map(config._asdict())
+
+        return embed
+
+
+class Menu(t.NamedTuple):
+    label: str
+    custom_id: str
+    prompt: str
+    synopsis: str
+    style: str
+    entries: t.Tuple["Entry", ...]
+
+
+Entry = t.Union[Menu, TicketType]
+
+
+def _style(data: t.Mapping[str, t.Any], default: str) -> str:
+    if (style := data.get("style", default)) not in STYLES:
+        raise ValueError(f"Unknown button style {style!r}, expected one of {', '.join(STYLES)}")
+
+    return t.cast(str, style)
+
+
+def _entries(data: t.Mapping[str, t.Any], topic: t.Optional[str]) -> t.Tuple[Entry, ...]:
+    if len(buttons := data["buttons"]) > MAX_BUTTONS:
+        raise ValueError(f"Menus can have at most {MAX_BUTTONS} buttons, got {len(buttons)}")
+
+    return tuple(_entry(button, topic) for button in buttons)
+
+
+def _entry(data: t.Mapping[str, t.Any], topic: t.Optional[str]) -> Entry:
+    label = data["label"]
+
+    if "buttons" in data:
+        return Menu(
+            label,
+            data["custom_id"],
+            data["prompt"],
+            data.get("synopsis", label),
+            _style(data, "blurple"),
+            _entries(data, data.get("topic", label)),
+        )
+
+    return TicketType(
+        label,
+        data["custom_id"],
+        f"{topic} {Constants.ARROW} {label}" if topic else label,
+        data["instructions"],
+        data.get("example_url"),
+        data.get("synopsis"),
+    )
+
+
+@t.final
+class Catalog:
+    __slots__ = ("_index", "entries", "name", "style", "synopsis")
+
+    def __init__(self, name: str, data: t.Mapping[str, t.Any]) -> None:
+        self.name = name
+        self.style = _style(data, "green")
+        self.entries = _entries(data, None)
+        self._index: t.Dict[str, Entry] = {}
+        self._add(self.entries)
+
+        lines: t.List[str] = []
+        for entry in self.entries:
+            lines.append(f"**{entry.label}** {Constants.ARROW} {entry.synopsis}")
+
+            if isinstance(entry, Menu):
+                lines.extend(f"- {child.synopsis}" for child in entry.entries)
+
+            lines.append("")
+
+        self.synopsis = "\n".join(lines).strip()
+
+    def _add(self, entries: t.Iterable[Entry]) -> None:
+        for entry in entries:
+            if entry.custom_id in self._index:
+                raise ValueError(f"Duplicate custom_id {entry.custom_id!r} in {self.name!r}")
+
+            self._index[entry.custom_id] = entry
+
+            if isinstance(entry, Menu):
+                self._add(entry.entries)
+
+    def __iter__(self) -> t.Iterator[Entry]:
+        return iter(self._index.values())
+
+    def find(self, custom_id: str) -> t.Optional[Entry]:
+        return self._index.get(custom_id)
+
+
+def _load(path: Path) -> t.Dict[str, Catalog]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+
+    if DEFAULT not in data:
+        raise ValueError(f"{path} has no {DEFAULT!r} catalog")
+
+    return {name: Catalog(name, catalog) for name, catalog in data.items()}
+
+
+@t.final
+class Catalogs:
+    __slots__ = ("_catalogs", "_path")
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._catalogs: t.Dict[str, Catalog] = {}
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._catalogs
+
+    def __iter__(self) -> t.Iterator[Catalog]:
+        return iter(self._catalogs.values())
+
+    def get(self, name: t.Optional[str]) -> Catalog:
+        # Guilds naming a catalog that doesn't exist are reported on startup and use the default
+        return self._catalogs.get(name or DEFAULT) or self._catalogs[DEFAULT]
+
+    async def load(self) -> int:
+        # Only loaded once, the persistent views are generated from it when the cogs load
+        loop = asyncio.get_running_loop()
+        self._catalogs = await loop.run_in_executor(None, _load, self._path)
+        logger.info(f"Loaded {len(self._catalogs)} ticket catalogs from {self._path}")
+        return len(self._catalogs)
@@ -0,0 +1,169 @@
+import asyncio
+import tracemalloc
+import typing as t
+
+from discord.ext import commands
+
+from hom import memory
+from hom import utils
+from hom.bot import Bot
+from hom.config import Config
+from hom.config import Constants
+
+__all__ = ("Admin",)
+
+T = t.TypeVar("T")
+
+
+def is_mod() -> t.Callable[[T], T]:
+    async def predicate(ctx: commands.Context[commands.Bot]) -> bool:
+        return utils.is_moderator(t.cast(Bot, ctx.bot), ctx.author)
+
+    return commands.check(predicate)
+
+
+class Admin(commands.Cog):
+    def __init__(self, bot: Bot) -> None:
+        self.bot = bot
+
+    @is_mod()
+    @commands.command(name="sync")
+    async def sync(
+        self,
+        ctx: commands.Context[commands.Bot],
+        mode: t.Optional[t.Literal["dry", "force"]] = None,
+    ) -> None:
+        assert self.bot.application_id
+
+        if mode == "dry":
+            if not (diff := await self.bot.command_sync.diff(self.bot.application_id)):
+                await ctx.reply("Commands are up to date, nothing to sync.")
+                return None
+
+            lines = [
+                *(f"+ {name}" for name in diff.added),
+                *(f"- {name}" for name in diff.removed),
+                *(f"~ {name}" for name in diff.changed),
+            ]
+            report = "\n".join(lines)[:1900]
+            await ctx.reply(f"```diff\n{report}\n```")
+            return None
+
+        if await self.bot.command_sync.sync(self.bot.application_id, force=mode == "force"):
+            await ctx.channel.send("Commands synced!")
+        else:
+            await ctx.reply("Commands are up to date, use `!sync force` to sync anyway.")
+
+    @is_mod()
+    @commands.command(name="reload")
+    async def reload(self, ctx: commands.Context[commands.Bot]) -> None:
+        try:
+            configured = await self.bot.guild_configs.reload()
+        except (OSError, ValueError, KeyError) as e:
+            await ctx.reply(f"{Constants.DENIED} Couldn't load {Config.GUILDS_FILE}: {e!r}")
+            return None
+
+        await self.bot.apply_guild_configs()
+        await ctx.reply(f"{Constants.COMPLETE} Reloaded configuration for {configured} guilds.")
+
+    @is_mod()
+    @commands.command(name="backfill")
+    async def backfill(self, ctx: commands.Context[commands.Bot]) -> None:
+        assert ctx.guild
+
+        async with ctx.typing():
+            indexed = await utils.backfill_transcript_index(self.bot, ctx.guild)
+
+        await ctx.reply(f"Indexed {indexed} archived transcripts.")
+
+    @is_mod()
+    @commands.command(name="queues")
+    async def queues(self, ctx: commands.Context[commands.Bot]) -> None:
+        lines = [
+            f"**{s.priority.name.title()}** {Constants.ARROW} {s.queued} queued, {s.active} active, "
+            f"{s.peak_queued} peak queued, {s.total} total"
+            for s in self.bot.scheduler.stats()
+        ]
+
+        lines.append(f"**Close jobs** {Constants.ARROW} {len(self.bot.close_queue)} pending")
+        backlog = sum(map(len, self.bot.mod_logs.values()))
+        lines.append(f"**Mod log** {Constants.ARROW} {backlog} queued")
+        await ctx.reply("\n".join(lines))
+
+    @is_mod()
+    @commands.command(name="startup")
+    async def startup(self, ctx: commands.Context[commands.Bot]) -> None:
+        report = "\n".join(self.bot.startup.report())
+        await ctx.reply(f"```\n{report}\n```")
+
+    @is_mod()
+    @commands.command(name="metrics")
+    async def metrics(self, ctx: commands.Context[commands.Bot]) -> None:
+        metrics = self.bot.metrics
+        content: t.List[str] = []
+
+        if stats := metrics.summary():
+            lines = [
+                f"{'Handler':<32} {'Calls':>6} {'Errors':>6} {'Defer p50/p99':>15} "
+                f"{'Total p50/p99':>15} {'REST':>5}"
+            ]
+            lines.extend(
+                f"{s.handler[-32:]:<32} {s.calls:>6} {s.errors:>6} "
+                f"{s.defer_p50 * 1000:>7.0f}/{s.defer_p99 * 1000:<7.0f}"
+                f"{s.total_p50 * 1000:>8.0f}/{s.total_p99 * 1000:<7.0f}{s.rest_calls:>5.1f}"
+                for s in stats
+            )
+            report = "\n".join(lines)[:1800]
+            content.append(f"Latencies in ms, REST is the mean per call.\n```\n{report}\n```")
+        else:
+            content.append("No interactions have been handled yet.")
+
+        if (lag := metrics.loop_lag).count:
+            content.append(
+                f"**Event loop lag** {Constants.ARROW} p50 {lag.quantile(0.5) * 1000:.1f}ms, "
+                f"p99 {lag.quantile(0.99) * 1000:.1f}ms, max {lag.max * 1000:.0f}ms, "
+                f"{metrics.loop_stalls} stalls"
+            )
+
+        await ctx.reply("\n".join(content))
+
+    @is_mod()
+    @commands.command(name="memory")
+    async def memory(self, ctx: commands.Context[commands.Bot]) -> None:
+        bot = self.bot
+        members = sum(len(g.members) for g in bot.guilds)
+        total_members = sum(g.member_count or 0 for g in bot.guilds)
+        lines = [
+            f"**Profile** {Constants.ARROW} {bot.profile.name} (intents {bot.intents.value})",
+            f"**Guilds** {Constants.ARROW} {len(bot.guilds)}",
+            f"**Members** {Constants.ARROW} {members} cached of {total_members}",
+            f"**Users** {Constants.ARROW} {len(bot.users)} cached",
+            f"**Messages** {Constants.ARROW} {len(bot.cached_messages)} cached "
+            f"(max {bot.profile.max_messages})",
+            f"**Tickets** {Constants.ARROW} {len(bot.tickets)} open",
+        ]
+
+        if rss := memory.max_rss():
+            lines.append(f"**Peak RSS** {Constants.ARROW} {rss / 1024 / 1024:.1f} MiB")
+
+        if not tracemalloc.is_tracing():
+            lines.append("\nSet `HOM_TRACEMALLOC` to see the top allocations.")
+            await ctx.reply("\n".join(lines))
+            return None
+
+        current, peak = tracemalloc.get_traced_memory()
+        lines.append(
+            f"**Traced** {Constants.ARROW} {current / 1024 / 1024:.1f} MiB "
+            f"(peak {peak / 1024 / 1024:.1f} MiB)"
+        )
+
+        loop = asyncio.get_running_loop()
+        async with ctx.typing():
+            top = await loop.run_in_executor(None, memory.top_allocations)
+
+        report = "\n".join(top)[: 1900 - sum(map(len, lines))]
+        await ctx.reply("\n".join(lines) + f"\n```\n{report}\n```")
+
+
+async def setup(bot: Bot) -> None:
+    await bot.add_cog(Admin(bot))
@@ -0,0 +1,110 @@
+import typing as t
+
+import discord
+from discord.ext import commands
+
+from hom import utils
+from hom.bot import Bot
+from hom.scheduler import Priority
+
+__all__ = ("Capture",)
+
+
+class Capture(commands.Cog):
+    def __init__(self, bot: Bot) -> None:
+        self.bot = bot
+        self.log = bot.transcript_log
+
+    def is_ticket(self, channel: t.Any) -> bool:
+        return isinstance(channel, discord.TextChannel) and self.bot.tickets.is_ticket(channel)
+
+    async def capture(self, message: discord.Message) -> None:
+        self.log.message(message)
+
+        # Backfilled messages go through here too, so replies made while offline still count
+        stats = self.bot.ticket_stats
+        if (
+            stats.awaiting_reply(message.channel.id)
+            and not message.author.bot
+            and utils.is_moderator(self.bot, message.author)
+        ):
+            await stats.replied(message.channel.id, message.author.id, message.created_at)
+
+        if message.attachments:
+            # Recorded separately so slow downloads don't hold up the log
+            self.log.attachments(message, await utils.archive_attachments(self.bot, message))
+
+    async def backfill(self, channel: discord.TextChannel) -> None:
+        if not (state := await self.log.read(channel.id)):
+            return None
+
+        after = state.last_id or channel.id
+        async for message in utils.iter_history(self.bot, channel, after=after):
+            if message.id not in state.entries:
+                await self.capture(message)
+
+    @commands.Cog.listener()
+    async def on_tickets_ready(self) -> None:
+        for channel_id in self.log.channels():
+            channel = self.bot.get_channel(channel_id)
+
+            if not channel and self.bot.partitioned:
+                # Most likely a ticket in a guild handled by another worker process
+                continue
+
+            if not self.is_ticket(channel):
+                # The ticket was deleted while we were offline
+                await self.log.remove(channel_id)
+                continue
+
+            await self.backfill(t.cast(discord.TextChannel, channel))
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel) -> None:
+        if self.is_ticket(channel):
+            self.log.open(channel.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel) -> None:
+        if self.is_ticket(channel):
+            await self.log.remove(channel.id)
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message) -> None:
+        if self.is_ticket(message.channel):
+            await self.capture(message)
+
+    @commands.Cog.listener()
+    async def on_message_edit(self, before: discord.Message, after: discord.Message) -> None:
+        if self.is_ticket(after.channel) and before.clean_content != after.clean_content:
+            self.log.edit(after)
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent) -> None:
+        # Edits to cached messages are handled above, the rest have to be fetched to be logged
+        if payload.cached_message or not payload.data.get("edited_timestamp"):
+            return None
+
+        channel = self.bot.get_channel(payload.channel_id)
+        if not self.is_ticket(channel):
+            return None
+
+        try:
+            message = await utils.scheduled(
+                self.bot,
+                Priority.ARCHIVAL,
+                t.cast(discord.TextChannel, channel).fetch_message(payload.message_id),
+            )
+        except discord.NotFound:
+            return None
+
+        self.log.edit(message)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent) -> None:
+        if self.is_ticket(self.bot.get_channel(payload.channel_id)):
+            self.log.delete(payload.channel_id, payload.message_id)
+
+
+async def setup(bot: Bot) -> None:
+    await bot.add_cog(Capture(bot))
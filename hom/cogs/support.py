@@ -1,4 +1,4 @@
-import asyncio
+import contextlib
 import typing as t
 
 import discord
@@ -6,21 +6,50 @@ from discord import AppCommandType
 from discord import app_commands
 from discord.ext import commands
 
+from hom import metrics
 from hom import utils
 from hom.bot import Bot
 from hom.cogs import views
 from hom.config import Config
 from hom.config import Constants
+from hom.jobs import CloseJob
+from hom.scheduler import Priority
+from hom.stats import Rollup
+from hom.stats import Scope
+from hom.tickets import TicketOwner
 
 __all__ = ("Support",)
 
+STATS_ROWS = 10
+
+
+def _duration(seconds: t.Optional[float]) -> str:
+    if seconds is None:
+        return "n/a"
+
+    minutes, hours, days = int(seconds // 60), int(seconds // 3600), int(seconds // 86400)
+    if days:
+        return f"{days}d {hours % 24}h"
+
+    if hours:
+        return f"{hours}h {minutes % 60}m"
+
+    return f"{minutes}m" if minutes else f"{seconds:.0f}s"
+
+
+def _summary(rollup: Rollup) -> str:
+    return (
+        f"{rollup.opened} opened, {rollup.closed} closed, first reply "
+        f"{_duration(rollup.mean_reply)}, closed in {_duration(rollup.mean_close)}, "
+        f"{rollup.pings} pings, {rollup.user_closed} closed by the user"
+    )
+
 
 class Support(commands.GroupCog, name="support"):
     def __init__(self, bot: Bot) -> None:
         super().__init__()
         self.bot = bot
         self.ratelimit = 5
-        self.ratelimits: t.Dict[int, bool] = {}
         self.support_footer = (
             "As a reminder, all moderators and admins in this server volunteer to help in their "
             "free time.\nWe appreciate your patience."
@@ -42,17 +71,80 @@ class Support(commands.GroupCog, name="support"):
             )
         )
 
-    @commands.has_role(Config.MOD_ROLE)
-    @commands.command(name="sync")
-    async def sync(self, ctx: commands.Context[commands.Bot]) -> None:
-        await self.bot.tree.sync()
-        await ctx.channel.send("Commands synced!")
+    async def cog_load(self) -> None:
+        await self.bot.close_queue.start(
+            self.close_ticket, lambda job: self.bot.owns_guild(job.guild_id)
+        )
+
+        if Config.INACTIVITY_PING_HOURS:
+            self.bot.sweeper.start(self.ping_inactive, self.close_inactive)
+
+    async def cog_unload(self) -> None:
+        self.bot.close_queue.stop()
+        self.bot.sweeper.stop()
+
+    async def close_ticket(self, job: CloseJob) -> None:
+        await self.bot.wait_until_ready()
+        await utils.close_ticket(self.bot, job)
+
+    async def ping_owner(
+        self, channel: discord.TextChannel, owner: TicketOwner
+    ) -> discord.Message:
+        message = await channel.send(
+            (
+                f"Hey {owner.mention}, just checking to see if you still need assistance.\n\n"
+                "*If you no longer need assistance or the question/concern was resolved, feel "
+                "free to close the ticket.*"
+            ),
+            view=views.SupportMessage(),
+        )
+
+        await self.bot.sweeper.pinged(channel.id, message.id)
+        return message
+
+    async def ping_inactive(self, channel: discord.TextChannel) -> t.Optional[int]:
+        await self.bot.wait_until_ready()
+
+        if not (owner := await utils.get_ticket_owner(self.bot, channel)):
+            return None
+
+        message = await utils.scheduled(self.bot, Priority.TICKET, self.ping_owner(channel, owner))
+        await self.bot.ticket_stats.pinged(channel.id, None)
+        return message.id
+
+    async def close_inactive(self, channel: discord.TextChannel) -> None:
+        await self.bot.wait_until_ready()
+        me = channel.guild.me
+        job = CloseJob(channel.id, channel.guild.id, me.id, mod_name=me.display_name)
+
+        if not await self.bot.close_queue.enqueue(job):
+            # Raising makes the sweeper try again later rather than forget about the ticket
+            raise RuntimeError(f"A close job for channel {channel.id} is already queued")
+
+        hours = Config.INACTIVITY_PING_HOURS + Config.INACTIVITY_CLOSE_HOURS
+        # The job may already have deleted the channel, which is all the notice was for
+        with contextlib.suppress(discord.HTTPException):
+            await utils.scheduled(
+                self.bot,
+                Priority.TICKET,
+                channel.send(
+                    f"{Constants.COMPLETE} Closing this ticket as nobody has replied in "
+                    f"{hours:g} hours, the channel will be deleted shortly."
+                ),
+            )
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message) -> None:
+        # The bot's own messages, pings included, don't count as activity
+        if not message.author.bot:
+            self.bot.sweeper.touch(message.channel.id, message.id)
 
     @app_commands.guild_only()  # type: ignore
     @app_commands.describe(channel="The channel to send the embed to.")
     @app_commands.command(
         name="send", description="Send the support embed to a channel (Admin only)."
     )
+    @metrics.instrumented
     async def send(
         self, interaction: discord.Interaction[commands.Bot], channel: discord.TextChannel
     ) -> None:
@@ -62,21 +154,112 @@ class Support(commands.GroupCog, name="support"):
         if not await self.mod_check(interaction):
             return None
 
-        embed = utils.build_support_embed(interaction.guild)
-        message = await channel.send(embed=embed, view=views.Support())
+        config = self.bot.guild_configs.get(interaction.guild.id)
+        view = views.catalog_view(self.bot.catalogs.get(config.catalog))
+        embed = utils.build_support_embed(self.bot, interaction.guild)
+        message = await channel.send(embed=embed, view=view)
         await interaction.followup.send(f"Done! {message.jump_url}", ephemeral=True)
 
-    async def clear_ratelimit(self, user_id: int) -> None:
-        await asyncio.sleep(self.ratelimit)
-        # del schedules deletion but does not guarantee the GC will remove the
-        # entry immediately so we set the value to False until then
-        self.ratelimits[user_id] = False
-        del self.ratelimits[user_id]
+    @app_commands.guild_only()  # type: ignore
+    @app_commands.describe(query="The words to look for in archived tickets.")
+    @app_commands.command(name="search", description="Search archived tickets (Mod only).")
+    @metrics.instrumented
+    async def search(self, interaction: discord.Interaction[commands.Bot], query: str) -> None:
+        await interaction.response.defer(ephemeral=True)
 
-    async def mod_check(self, interaction: discord.Interaction[commands.Bot]) -> bool:
-        assert isinstance(interaction.user, discord.Member)
+        if not await self.mod_check(interaction):
+            return None
+
+        assert interaction.guild
 
-        if not any(r.id == Config.MOD_ROLE for r in interaction.user.roles):
+        if not (results := await self.bot.transcript_index.search(query, interaction.guild.id)):
+            await interaction.followup.send(f"{Constants.DENIED} No tickets matched.")
+            return None
+
+        embed = discord.Embed(title=f"Results for {query[:200]}", color=discord.Colour.dark_blue())
+        for result in results:
+            owner = f"<@{result.owner_id}>" if result.owner_id else "Unknown"
+            embed.add_field(
+                name=f"#{result.channel} ({result.topic})"[:256],
+                value=(
+                    f"Owner: {owner} - Closed {discord.utils.format_dt(result.closed_at, 'R')}"
+                    f"\n{result.snippet}"
+                )[:1024],
+                inline=False,
+            )
+
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    @app_commands.guild_only()  # type: ignore
+    @app_commands.command(
+        name="stats", description="Show ticket response and close times (Mod only)."
+    )
+    @metrics.instrumented
+    async def stats(self, interaction: discord.Interaction[commands.Bot]) -> None:
+        await interaction.response.defer(ephemeral=True)
+
+        if not await self.mod_check(interaction):
+            return None
+
+        assert interaction.guild
+        stats, guild_id = self.bot.ticket_stats, interaction.guild.id
+
+        # Everything here is read from the rollups, which are kept up to date as events happen
+        embed = discord.Embed(
+            title="Ticket stats",
+            color=discord.Colour.dark_blue(),
+            description=_summary(stats.rollup(guild_id)),
+        )
+
+        categories = sorted(
+            stats.rollups(guild_id, Scope.CATEGORY).items(), key=lambda item: -item[1].opened
+        )
+        if categories:
+            embed.add_field(
+                name="Categories",
+                value="\n".join(
+                    f"**{category}** {Constants.ARROW} {_summary(rollup)}"
+                    for category, rollup in categories[:STATS_ROWS]
+                )[:1024],
+                inline=False,
+            )
+
+        moderators = sorted(
+            stats.rollups(guild_id, Scope.MODERATOR).items(),
+            key=lambda item: -(item[1].replied + item[1].closed),
+        )
+        if moderators:
+            embed.add_field(
+                name="Moderators",
+                value="\n".join(
+                    f"<@{mod_id}> {Constants.ARROW} {r.replied} first replies "
+                    f"({_duration(r.mean_reply)}), {r.pings} pings, {r.closed} closed"
+                    for mod_id, r in moderators[:STATS_ROWS]
+                )[:1024],
+                inline=False,
+            )
+
+        hours = sorted(
+            stats.rollups(guild_id, Scope.HOUR).items(), key=lambda item: -item[1].opened
+        )
+        if hours:
+            embed.add_field(
+                name="Busiest hours (UTC)",
+                value="\n".join(
+                    f"**{hour}:00** {Constants.ARROW} {r.opened} opened, "
+                    f"first reply {_duration(r.mean_reply)}"
+                    for hour, r in hours[:5]
+                ),
+                inline=False,
+            )
+
+        embed.set_footer(
+            text="Times are averages. Only tickets opened since stats were added are counted."
+        )
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    async def mod_check(self, interaction: discord.Interaction[commands.Bot]) -> bool:
+        if not utils.is_moderator(self.bot, interaction.user):
             await interaction.followup.send(
                 f"{Constants.DENIED} You are not allowed to do that.",
                 ephemeral=True,
@@ -93,7 +276,7 @@ class Support(commands.GroupCog, name="support"):
         if not interaction.channel.category:
             return False
 
-        category_match = interaction.channel.category.id == Config.TICKET_CATEGORY
+        category_match = self.bot.tickets.is_ticket(interaction.channel)
         if invert:
             category_match = not category_match
 
@@ -103,9 +286,8 @@ class Support(commands.GroupCog, name="support"):
         return category_match
 
     async def concurrency_check(self, interaction: discord.Interaction[commands.Bot]) -> bool:
-        if not self.ratelimits.get(interaction.user.id):
-            self.ratelimits[interaction.user.id] = True
-            await asyncio.create_task(self.clear_ratelimit(interaction.user.id))
+        command = interaction.command.qualified_name if interaction.command else ""
+        if not self.bot.cooldowns.acquire(command, interaction.user.id, self.ratelimit):
             return True
 
         await interaction.followup.send(
@@ -117,10 +299,10 @@ class Support(commands.GroupCog, name="support"):
 
     async def get_og_user(
         self, interaction: discord.Interaction[commands.Bot]
-    ) -> t.Optional[t.Union[discord.User, discord.Member]]:
+    ) -> t.Optional[TicketOwner]:
         assert isinstance(interaction.channel, discord.TextChannel)
 
-        if not (user := await utils.get_user_by_original_message(interaction.channel)):
+        if not (user := await utils.get_ticket_owner(self.bot, interaction.channel)):
             await interaction.followup.send(
                 f"{Constants.DENIED} Could not determine ticket owner.", ephemeral=True
             )
@@ -145,6 +327,7 @@ class Support(commands.GroupCog, name="support"):
 
         return True
 
+    @metrics.instrumented
     async def awaiting_response(
         self, interaction: discord.Interaction[commands.Bot], message: discord.Message
     ) -> None:
@@ -159,15 +342,10 @@ class Support(commands.GroupCog, name="support"):
             return None
 
         await interaction.followup.send(f"Pinging user to check the channel.", ephemeral=True)
-        await message.channel.send(
-            (
-                f"Hey {og_user.mention}, just checking to see if you still need assistance.\n\n"
-                "*If you no longer need assistance or the question/concern was resolved, feel "
-                "free to close the ticket.*"
-            ),
-            view=views.SupportMessage(),
-        )
+        await self.bot.ticket_stats.pinged(message.channel.id, interaction.user.id)
+        await self.ping_owner(t.cast(discord.TextChannel, message.channel), og_user)
 
+    @metrics.instrumented
     async def support_redirect(
         self, interaction: discord.Interaction[commands.Bot], message: discord.Message
     ) -> None:
@@ -179,7 +357,8 @@ class Support(commands.GroupCog, name="support"):
         ):
             return None
 
-        channel = utils.get_channel(interaction.guild, Config.SUPPORT_CHANNEL)
+        channel_id = self.bot.guild_configs.get(interaction.guild.id).support_channel
+        channel = self.bot.registry.channel(channel_id)
         if not channel:
             await interaction.followup.send("Couldn't find support channel, this is a bug.")
             return None
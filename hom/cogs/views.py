@@ -3,101 +3,81 @@ import typing as t
 import discord
 from discord.ext import commands
 
+from hom import metrics
 from hom import utils
-from hom.config import Config
+from hom.bot import Bot
+from hom.catalog import Catalog
+from hom.catalog import Entry
+from hom.catalog import Menu
 from hom.config import Constants
+from hom.jobs import CloseJob
 
 __all__ = (
-    "Support",
-    "SupportGroup",
+    "CatalogButton",
+    "CatalogView",
     "SupportMessage",
     "SupportMessageCloseChannel",
-    "SupportNames",
     "Verify",
+    "catalog_view",
 )
 
 ViewT = t.TypeVar("ViewT", bound=discord.ui.View)
 
 
-class Support(discord.ui.View):
-    def __init__(self) -> None:
+class CatalogButton(discord.ui.Button["CatalogView"]):
+    def __init__(self, catalog: Catalog, entry: Entry, style: str) -> None:
+        super().__init__(
+            label=entry.label, style=discord.ButtonStyle[style], custom_id=entry.custom_id
+        )
+        self.catalog = catalog
+
+    @metrics.instrumented
+    async def callback(self, interaction: discord.Interaction[t.Any]) -> None:
+        assert interaction.guild and self.custom_id
+        bot = t.cast(Bot, interaction.client)
+        config = bot.guild_configs.get(interaction.guild.id)
+
+        # Catalogs can share custom_ids and only one button is dispatched to per custom_id, so
+        # the entry comes from the catalog of the guild it was clicked in where possible
+        catalog = bot.catalogs.get(config.catalog)
+        if not (entry := catalog.find(self.custom_id)):
+            catalog, entry = self.catalog, self.catalog.find(self.custom_id)
+
+        if isinstance(entry, Menu):
+            # Views sent ephemerally are given a timeout and stored under the same custom_ids
+            # as the persistent view, which they'd take out of the view store once they expire.
+            # A stopped copy is never stored, and its clicks still reach the persistent view
+            view = CatalogView(catalog, entry)
+            view.stop()
+            await interaction.response.send_message(
+                view=view, content=entry.prompt, ephemeral=True
+            )
+
+        elif entry:
+            await interaction.response.defer()
+            await utils.create_ticket_for_user(interaction, entry.embed(config), entry.topic)
+
+
+class CatalogView(discord.ui.View):
+    def __init__(self, catalog: Catalog, menu: t.Optional[Menu] = None) -> None:
         super().__init__(timeout=None)
 
-    @discord.ui.button(
-        label="Groups",
-        style=discord.ButtonStyle.green,
-        custom_id="persistent_view:groups_instructions",
-    )
-    async def groups_instructions(
-        self: ViewT, interaction: discord.Interaction[commands.Bot], _: discord.ui.Button[ViewT]
-    ) -> None:
-        await interaction.response.send_message(
-            view=SupportGroup(),
-            content="What do you need assistance with?",
-            ephemeral=True,
-        )
+        for entry in menu.entries if menu else catalog.entries:
+            self.add_item(CatalogButton(catalog, entry, menu.style if menu else catalog.style))
 
-    @discord.ui.button(
-        label="Name Changes",
-        style=discord.ButtonStyle.green,
-        custom_id="persistent_view:names_instructions",
-    )
-    async def names_instructions(
-        self: ViewT, interaction: discord.Interaction[commands.Bot], _: discord.ui.Button[ViewT]
-    ) -> None:
-        await interaction.response.send_message(
-            view=SupportNames(),
-            content="What do you need assistance with?",
-            ephemeral=True,
-        )
 
-    @discord.ui.button(
-        label="Patreon", style=discord.ButtonStyle.green, custom_id="persistent_view:patreon"
-    )
-    async def patreon(
-        self: ViewT,
-        interaction: discord.Interaction[commands.Bot],
-        button: discord.ui.Button[ViewT],
-    ) -> None:
-        instructions = (
-            "If you are interested in claiming or signing up for patreon benefits check out "
-            f"<#{Config.PATREON_CHANNEL}> for more information.\n\nIf you've already signed up, "
-            "**thanks so much for your support**! It means a lot to us that you enjoy using "
-            f"Wise Old Man. Feel free to ask any questions you have here.\n\n{Constants.FOOTER}"
-        )
+_views: t.Dict[t.Tuple[str, t.Optional[str]], CatalogView] = {}
 
-        await interaction.response.defer()
-        await utils.create_ticket_for_user(interaction, instructions, button.label)
 
-    @discord.ui.button(
-        label="API Key",
-        style=discord.ButtonStyle.green,
-        custom_id="persistent_view:api_key",
-    )
-    async def api_key(
-        self: ViewT,
-        interaction: discord.Interaction[commands.Bot],
-        button: discord.ui.Button[ViewT],
-    ) -> None:
-        instructions = (
-            "If you'd like to get an API Key, please tell us your project's name and we'll create "
-            f"you a new API key.\n\n{Constants.FOOTER}"
-        )
+def catalog_view(catalog: Catalog, menu: t.Optional[Menu] = None) -> CatalogView:
+    # Built once per catalog and menu for the view store and the support panel, never sent
+    # in ephemeral messages
+    key = (catalog.name, menu.custom_id if menu else None)
 
-        await interaction.response.defer()
-        await utils.create_ticket_for_user(interaction, instructions, button.label)
+    if not (view := _views.get(key)):
+        view = _views[key] = CatalogView(catalog, menu)
 
-    @discord.ui.button(
-        label="Other",
-        style=discord.ButtonStyle.green,
-        custom_id="persistent_view:other_instructions",
-    )
-    async def other_instructions(
-        self: ViewT, interaction: discord.Interaction[commands.Bot], _: discord.ui.Button[ViewT]
-    ) -> None:
-        await interaction.response.defer()
-        instructions = f"Explain what you require assistance with below.\n\n{Constants.FOOTER}"
-        await utils.create_ticket_for_user(interaction, instructions, f"Other")
+    return view
 
 
 class Verify(discord.ui.View):
@@ -109,6 +89,7 @@ class Verify(discord.ui.View):
         style=discord.ButtonStyle.red,
         custom_id="persistent_view:verify_yes",
     )
+    @metrics.instrumented
     async def verify_yes(
         self: ViewT, interaction: discord.Interaction[commands.Bot], _: discord.ui.Button[ViewT]
     ) -> None:
@@ -120,179 +101,6 @@ class Verify(discord.ui.View):
         await interaction.channel.delete()
 
 
-class SupportGroup(discord.ui.View):
-    def __init__(self) -> None:
-        super().__init__(timeout=None)
-
-    @discord.ui.button(
-        label="Verify my group",
-        style=discord.ButtonStyle.blurple,
-        custom_id="persistent_view:group_verify",
-    )
-    async def group_verify(
-        self: ViewT,
-        interaction: discord.Interaction[commands.Bot],
-        button: discord.ui.Button[ViewT],
-    ) -> None:
-        instructions = (
-            "To verify your group please provide a screenshot to prove ownership. We have "
-            "attached an example of what we need to see below. The screenshot must "
-            "contain:\n\n- Your Wise Old Man group ID (found in that group's page URL), "
-            "your Discord ID, and today's date typed into your in-game chatbox.\n- Your Clan "
-            "tab open showing your username and rank. For clans, you must be Owner or Deputy "
-            "Owner to verify the group. For the old clan chat, you must be Owner or General "
-            f"(gold star).\n\n{Constants.FOOTER}"
-        )
-
-        await interaction.response.defer()
-        await utils.create_ticket_for_user(
-            interaction,
-            instructions,
-            f"Group {Constants.ARROW} {button.label}",
-            "https://cdn.discordapp.com/attachments/696219254076342312/1200157429283962880/group.jpg",
-        )
-
-    @discord.ui.button(
-        label="Reset my verification code",
-        style=discord.ButtonStyle.blurple,
-        custom_id="persistent_view:group_reset_code",
-    )
-    async def group_reset_code(
-        self: ViewT,
-        interaction: discord.Interaction[commands.Bot],
-        button: discord.ui.Button[ViewT],
-    ) -> None:
-        instructions = (
-            "To reset your verification code please provide a screenshot to prove ownership. "
-            "We have attached an example of what we need to see below. The screenshot must "
-            "contain:\n\n- Your Wise Old Man group ID (found in that group's page URL), your "
-            "Discord ID, and today's date typed into your in-game chatbox.\n- Your Clan tab "
-            "open showing your username and rank. For clans, you must be Owner or Deputy Owner "
-            "to verify the group. For the old clan chat, you must be Owner or General (gold star)."
-            "\n\nKeep in mind that verification codes should be secret, they can be used to edit "
-            "or delete a group, so please be mindful of who you choose to share it with.\n\n"
-            f"{Constants.FOOTER}"
-        )
-
-        await interaction.response.defer()
-        await utils.create_ticket_for_user(
-            interaction,
-            instructions,
-            f"Group {Constants.ARROW} {button.label}",
-            "https://cdn.discordapp.com/attachments/696219254076342312/1200157429283962880/group.jpg",
-        )
-
-    @discord.ui.button(
-        label="Remove me from a group",
-        style=discord.ButtonStyle.blurple,
-        custom_id="persistent_view:group_remove",
-    )
-    async def group_remove(
-        self: ViewT,
-        interaction: discord.Interaction[commands.Bot],
-        button: discord.ui.Button[ViewT],
-    ) -> None:
-        instructions = (
-            "To remove yourself from a group, please provide us with a screenshot containing:"
-            "\n\n- Your in-game username\n- Your Discord username/ID\n- Today's date\n\n"
-            f"{Constants.FOOTER}"
-        )
-
-        await interaction.response.defer()
-        await utils.create_ticket_for_user(
-            interaction,
-            instructions,
-            f"Group {Constants.ARROW} {button.label}",
-            "https://cdn.discordapp.com/attachments/696219254076342312/1200157428981977229/player.jpg",
-        )
-
-    @discord.ui.button(
-        label="Other",
-        style=discord.ButtonStyle.blurple,
-        custom_id="persistent_view:group_other",
-    )
-    async def group_other(
-        self: ViewT,
-        interaction: discord.Interaction[commands.Bot],
-        button: discord.ui.Button[ViewT],
-    ) -> None:
-        instructions = f"Explain what you require assistance with below.\n\n{Constants.FOOTER}"
-
-        await interaction.response.defer()
-        await utils.create_ticket_for_user(
-            interaction, instructions, f"Group {Constants.ARROW} {button.label}"
-        )
-
-
-class SupportNames(discord.ui.View):
-    def __init__(self) -> None:
-        super().__init__(timeout=None)
-
-    @discord.ui.button(
-        label="Approve a pending name change",
-        style=discord.ButtonStyle.blurple,
-        custom_id="persistent_view:names_approve",
-    )
-    async def names_approve(
-        self: ViewT,
-        interaction: discord.Interaction[commands.Bot],
-        button: discord.ui.Button[ViewT],
-    ) -> None:
-        instructions = (
-            "Some name changes get skipped, as they can't be auto-approved by our system and "
-            "require manual approval.\n\nIf yours hasn't been auto-approved, please tell us the "
-            "name change ID and we'll manually review it for you.\n\nNote: If you'd like to know "
-            "why your name change has been skipped you can visit our website at "
-            "https://wiseoldman.net/names and hover your cursor over your "
-            f"name change's ℹ️ icon.\n\n{Constants.FOOTER}"
-        )
-
-        await interaction.response.defer()
-        await utils.create_ticket_for_user(
-            interaction, instructions, f"Names {Constants.ARROW} {button.label}"
-        )
-
-    @discord.ui.button(
-        label="Delete name change history",
-        style=discord.ButtonStyle.blurple,
-        custom_id="persistent_view:names_delete",
-    )
-    async def names_delete(
-        self: ViewT,
-        interaction: discord.Interaction[commands.Bot],
-        button: discord.ui.Button[ViewT],
-    ) -> None:
-        instructions = (
-            "To request a name change history deletion, please provide us with:\n\n- Your in-game "
-            f"username\n- Your Discord username/ID\n- Today's date\n\n{Constants.FOOTER}"
-        )
-
-        await interaction.response.defer()
-        await utils.create_ticket_for_user(
-            interaction,
-            instructions,
-            f"Names {Constants.ARROW} {button.label}",
-            "https://cdn.discordapp.com/attachments/696219254076342312/1200157428981977229/player.jpg",
-        )
-
-    @discord.ui.button(
-        label="Other",
-        style=discord.ButtonStyle.blurple,
-        custom_id="persistent_view:names_other",
-    )
-    async def names_other(
-        self: ViewT,
-        interaction: discord.Interaction[commands.Bot],
-        button: discord.ui.Button[ViewT],
-    ) -> None:
-        instructions = f"Explain what you require assistance with below.\n\n{Constants.FOOTER}"
-
-        await interaction.response.defer()
-        await utils.create_ticket_for_user(
-            interaction, instructions, f"Names {Constants.ARROW} {button.label}"
-        )
-
-
 class SupportMessage(discord.ui.View):
     def __init__(self) -> None:
         super().__init__(timeout=None)
@@ -303,6 +111,7 @@ class SupportMessage(discord.ui.View):
         style=discord.ButtonStyle.blurple,
         custom_id="persistent_view:message_close",
     )
+    @metrics.instrumented
     async def message_close(
         self: ViewT, interaction: discord.Interaction[commands.Bot], _: discord.ui.Button[ViewT]
     ) -> None:
@@ -312,6 +121,9 @@ class SupportMessage(discord.ui.View):
         embed = discord.Embed(description=f"{interaction.user.mention} has closed the ticket.")
         await interaction.response.defer()
         await interaction.channel.set_permissions(interaction.user, overwrite=None)
+        await t.cast(Bot, interaction.client).ticket_stats.user_closed(
+            interaction.channel.id, interaction.user.id
+        )
         await interaction.followup.send(
             ephemeral=False, embed=embed, view=SupportMessageCloseChannel()
         )
@@ -327,14 +139,15 @@ class SupportMessageCloseChannel(discord.ui.View):
         style=discord.ButtonStyle.blurple,
         custom_id="persistent_view:message_close_channel",
     )
+    @metrics.instrumented
     async def message_close_channel(
         self: ViewT, interaction: discord.Interaction[commands.Bot], _: discord.ui.Button[ViewT]
     ) -> None:
         await interaction.response.defer()
         assert isinstance(interaction.channel, discord.channel.TextChannel)
-        assert isinstance(interaction.user, discord.Member)
+        bot = t.cast(Bot, interaction.client)
 
-        if not any(r.id == Config.MOD_ROLE for r in interaction.user.roles):
+        if not utils.is_moderator(bot, interaction.user):
             await interaction.followup.send(
                 ephemeral=True,
                 content="You do not have the required permissions to delete the channel.",
@@ -342,23 +155,33 @@ class SupportMessageCloseChannel(discord.ui.View):
 
             return None
 
-        content = f"({interaction.channel.topic}) Ticket channel closed for user:\n"
-        if user := await utils.get_user_by_original_message(interaction.channel):
-            content += f"{user.display_name} - {user.mention}"
+        job = CloseJob(
+            interaction.channel.id,
+            interaction.channel.guild.id,
+            interaction.user.id,
+            mod_name=interaction.user.display_name,
+        )
+
+        if not await bot.close_queue.enqueue(job):
+            await interaction.followup.send(
+                f"{Constants.DENIED} This ticket is already being closed.", ephemeral=True
+            )
+
+            return None
 
-        await utils.send_log_message(
-            interaction=interaction,
-            content=content,
-            mod=interaction.user,
-            channel=interaction.channel,
+        await interaction.followup.send(
+            f"{Constants.COMPLETE} Archiving this ticket, the channel will be deleted shortly."
         )
-        await interaction.channel.delete()
 
 
-async def setup(bot: commands.Bot) -> None:
-    bot.add_view(Support())
+async def setup(bot: Bot) -> None:
+    for catalog in bot.catalogs:
+        bot.add_view(catalog_view(catalog))
+
+        for entry in catalog:
+            if isinstance(entry, Menu):
+                bot.add_view(catalog_view(catalog, entry))
+
     bot.add_view(Verify())
-    bot.add_view(SupportGroup())
-    bot.add_view(SupportNames())
     bot.add_view(SupportMessage())
     bot.add_view(SupportMessageCloseChannel())
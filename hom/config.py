@@ -1,5 +1,6 @@
 import typing as t
 from os import environ
+from pathlib import Path
 
 from dotenv import load_dotenv
 
@@ -12,6 +13,22 @@ def _int(var: str) -> int:
     return int(environ[var])
 
 
+def _ints(var: str) -> t.Tuple[int, ...]:
+    return tuple(int(value) for value in environ.get(var, "").split(",") if value.strip())
+
+
+def _optional_int(var: str) -> t.Optional[int]:
+    return int(value) if (value := environ.get(var)) else None
+
+
+def _bool(var: str) -> bool:
+    return environ.get(var, "").lower() in ("1", "true", "yes")
+
+
+def _optional_bool(var: str) -> t.Optional[bool]:
+    return _bool(var) if environ.get(var) else None
+
+
 @t.final
 class Config:
     __slots__ = ()
@@ -19,10 +36,28 @@ class Config:
     DISCORD_TOKEN: t.Final[str] = environ["HOM_DISCORD_TOKEN"]
     SUPPORT_CHANNEL: t.Final[int] = _int("HOM_SUPPORT_CHANNEL")
     TICKET_CATEGORY: t.Final[int] = _int("HOM_TICKET_CATEGORY")
+    OVERFLOW_CATEGORIES: t.Final[t.Tuple[int, ...]] = _ints("HOM_OVERFLOW_CATEGORIES")
+    CREATE_OVERFLOW_CATEGORIES: t.Final[bool] = _bool("HOM_CREATE_OVERFLOW_CATEGORIES")
     MOD_LOG_CHANNEL: t.Final[int] = _int("HOM_MOD_LOG_CHANNEL")
     PATREON_CHANNEL: t.Final[int] = _int("HOM_PATREON_CHANNEL")
     QUESTIONS_CHANNEL: t.Final[int] = _int("HOM_QUESTIONS_CHANNEL")
     MOD_ROLE: t.Final[int] = _int("HOM_MOD_ROLE")
+    HOME_GUILD: t.Final[t.Optional[int]] = _optional_int("HOM_HOME_GUILD")
+    DATA_DIR: t.Final[Path] = Path(environ.get("HOM_DATA_DIR", "data"))
+    WORKERS: t.Final[int] = _optional_int("HOM_WORKERS") or 1
+    SHARD_COUNT: t.Final[t.Optional[int]] = _optional_int("HOM_SHARD_COUNT")
+    CACHE_PROFILE: t.Final[str] = environ.get("HOM_CACHE_PROFILE", "minimal")
+    MAX_MESSAGES: t.Final[int] = int(environ.get("HOM_MAX_MESSAGES", 1000))
+    CHUNK_GUILDS: t.Final[t.Optional[bool]] = _optional_bool("HOM_CHUNK_GUILDS")
+    TRACEMALLOC: t.Final[int] = int(environ.get("HOM_TRACEMALLOC", 0))
+    GUILDS_FILE: t.Final[Path] = Path(environ.get("HOM_GUILDS_FILE", DATA_DIR / "guilds.json"))
+    LOOP_STALL_MS: t.Final[int] = int(environ.get("HOM_LOOP_STALL_MS", 0))
+    METRICS_PORT: t.Final[t.Optional[int]] = _optional_int("HOM_METRICS_PORT")
+    INACTIVITY_PING_HOURS: t.Final[float] = float(environ.get("HOM_INACTIVITY_PING_HOURS", 0))
+    INACTIVITY_CLOSE_HOURS: t.Final[float] = float(environ.get("HOM_INACTIVITY_CLOSE_HOURS", 0))
+    CATALOG_FILE: t.Final[Path] = Path(
+        environ.get("HOM_CATALOG_FILE", Path(__file__).parent / "catalog.json")
+    )
 
     def __init__(self) -> None:
         raise RuntimeError("Config should not be instantiated.")
@@ -34,6 +69,7 @@ class Constants:
 
     ARROW: t.Final[str] = "→"
     PREFIX: t.Final[str] = "!"
+    TICKET_COOLDOWN: t.Final[int] = 5
     DENIED: t.Final[str] = "❌"
     COMPLETE: t.Final[str] = "✅"
     FOOTER: t.Final[str] = (
@@ -0,0 +1,38 @@
+import time
+import typing as t
+
+__all__ = ("Cooldowns",)
+
+
+@t.final
+class Cooldowns:
+    __slots__ = ("_expiries",)
+
+    def __init__(self) -> None:
+        self._expiries: t.Dict[t.Tuple[str, int], float] = {}
+
+    def __len__(self) -> int:
+        return len(self._expiries)
+
+    def acquire(self, key: str, user_id: int, period: float) -> float:
+        # Returns 0 when the cooldown was acquired, otherwise the seconds remaining
+        now = time.monotonic()
+        entry = (key, user_id)
+
+        if (expiry := self._expiries.get(entry, 0.0)) > now:
+            return expiry - now
+
+        self._expiries[entry] = now + period
+        return 0.0
+
+    def reset(self, key: str, user_id: int) -> None:
+        self._expiries.pop((key, user_id), None)
+
+    def sweep(self) -> int:
+        now = time.monotonic()
+        expired = [entry for entry, expiry in self._expiries.items() if expiry <= now]
+
+        for entry in expired:
+            del self._expiries[entry]
+
+        return len(expired)
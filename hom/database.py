@@ -0,0 +1,87 @@
+import asyncio
+import functools
+import sqlite3
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+__all__ = ("Database",)
+
+T = t.TypeVar("T")
+Params = t.Sequence[t.Any]
+Row = t.Tuple[t.Any, ...]
+Statement = t.Tuple[str, Params]
+
+
+@t.final
+class Database:
+    __slots__ = ("_conn", "_executor", "_path")
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._conn: t.Optional[sqlite3.Connection] = None
+        # SQLite connections are not safe to share between threads, so every
+        # query is funneled through a single worker thread off the event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hom-db")
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if not self._conn:
+            raise RuntimeError("The database is not connected.")
+
+        return self._conn
+
+    async def _run(self, func: t.Callable[..., T], *args: t.Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    def _connect(self) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self._path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
+    def _execute(self, sql: str, params: Params) -> int:
+        with self.conn:
+            return self.conn.execute(sql, params).rowcount
+
+    def _transaction(self, statements: t.Sequence[Statement]) -> None:
+        with self.conn:
+            for sql, params in statements:
+                self.conn.execute(sql, params)
+
+    def _executescript(self, sql: str) -> None:
+        with self.conn:
+            self.conn.executescript(sql)
+
+    def _fetchone(self, sql: str, params: Params) -> t.Optional[Row]:
+        return t.cast(t.Optional[Row], self.conn.execute(sql, params).fetchone())
+
+    def _fetchall(self, sql: str, params: Params) -> t.List[Row]:
+        return self.conn.execute(sql, params).fetchall()
+
+    async def connect(self) -> None:
+        await self._run(self._connect)
+
+    async def close(self) -> None:
+        if self._conn:
+            await self._run(self._conn.close)
+            self._conn = None
+
+        self._executor.shutdown(wait=False)
+
+    async def execute(self, sql: str, params: Params = ()) -> int:
+        return await self._run(self._execute, sql, params)
+
+    async def transaction(self, statements: t.Sequence[Statement]) -> None:
+        # Either every statement is applied or none of them are
+        await self._run(self._transaction, statements)
+
+    async def executescript(self, sql: str) -> None:
+        await self._run(self._executescript, sql)
+
+    async def fetchone(self, sql: str, params: Params = ()) -> t.Optional[Row]:
+        return await self._run(self._fetchone, sql, params)
+
+    async def fetchall(self, sql: str, params: Params = ()) -> t.List[Row]:
+        return await self._run(self._fetchall, sql, params)
@@ -0,0 +1,27 @@
+import typing as t
+
+import discord
+
+__all__ = ("EXTENSIONS", "Extension")
+
+# Prefix commands need to see the message that invoked them
+_PREFIX_COMMANDS = discord.Intents(guild_messages=True, message_content=True)
+
+
+class Extension(t.NamedTuple):
+    name: str
+    # Gateway intents the extension relies on, declared here so nothing has to be imported
+    # to work out what to connect with
+    intents: discord.Intents
+    # Loaded in the background once the bot is ready rather than before it connects
+    lazy: bool = False
+
+
+EXTENSIONS: t.Final[t.Tuple[Extension, ...]] = (
+    # Buttons only need the guild cache, interactions are delivered regardless of intents
+    Extension("hom.cogs.views", discord.Intents(guilds=True)),
+    # Messages in tickets reset their inactivity timers
+    Extension("hom.cogs.support", discord.Intents(guilds=True, guild_messages=True)),
+    Extension("hom.cogs.capture", discord.Intents(guild_messages=True, message_content=True)),
+    Extension("hom.cogs.admin", _PREFIX_COMMANDS, lazy=True),
+)
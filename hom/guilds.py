@@ -0,0 +1,100 @@
+import asyncio
+import json
+import logging
+import typing as t
+from pathlib import Path
+
+from hom.config import Config
+
+__all__ = ("GuildConfig", "GuildConfigs")
+
+logger = logging.getLogger(__name__)
+
+
+class GuildConfig(t.NamedTuple):
+    guild_id: int
+    support_channel: int
+    ticket_category: int
+    mod_log_channel: int
+    patreon_channel: int
+    questions_channel: int
+    mod_role: int
+    overflow_categories: t.Tuple[int, ...] = ()
+    create_overflow_categories: bool = False
+    # Name of the button catalog this guild's support message is built from
+    catalog: t.Optional[str] = None
+
+    @classmethod
+    def from_env(cls, guild_id: int) -> "GuildConfig":
+        return cls(
+            guild_id,
+            Config.SUPPORT_CHANNEL,
+            Config.TICKET_CATEGORY,
+            Config.MOD_LOG_CHANNEL,
+            Config.PATREON_CHANNEL,
+            Config.QUESTIONS_CHANNEL,
+            Config.MOD_ROLE,
+            Config.OVERFLOW_CATEGORIES,
+            Config.CREATE_OVERFLOW_CATEGORIES,
+        )
+
+    @classmethod
+    def from_dict(cls, guild_id: int, data: t.Mapping[str, t.Any]) -> "GuildConfig":
+        return cls(
+            guild_id,
+            int(data["support_channel"]),
+            int(data["ticket_category"]),
+            int(data["mod_log_channel"]),
+            int(data["patreon_channel"]),
+            int(data["questions_channel"]),
+            int(data["mod_role"]),
+            tuple(map(int, data.get("overflow_categories", ()))),
+            bool(data.get("create_overflow_categories", False)),
+            data.get("catalog"),
+        )
+
+    @property
+    def categories(self) -> t.Tuple[int, ...]:
+        return (self.ticket_category, *self.overflow_categories)
+
+
+def _load(path: Path) -> t.Dict[int, GuildConfig]:
+    if not path.exists():
+        return {}
+
+    data = json.loads(path.read_text())
+    return {int(k): GuildConfig.from_dict(int(k), v) for k, v in data.items()}
+
+
+@t.final
+class GuildConfigs:
+    __slots__ = ("_configs", "_path", "home_guild")
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._configs: t.Dict[int, GuildConfig] = {}
+        # The guild the IDs from the environment belong to
+        self.home_guild = Config.HOME_GUILD
+
+    def __iter__(self) -> t.Iterator[GuildConfig]:
+        return iter(list(self._configs.values()))
+
+    def __len__(self) -> int:
+        return len(self._configs)
+
+    def configured(self, guild_id: int) -> bool:
+        # The IDs from the environment only belong to the home guild, any other guild would
+        # be pointed at channels and categories it doesn't own
+        return guild_id in self._configs or guild_id == self.home_guild
+
+    def get(self, guild_id: int) -> GuildConfig:
+        # Guilds without their own entry use the IDs from the environment, callers acting on
+        # them check configured() first
+        return self._configs.get(guild_id) or GuildConfig.from_env(guild_id)
+
+    async def reload(self) -> int:
+        loop = asyncio.get_running_loop()
+        # A broken file raises here and the previous configuration stays in place
+        self._configs = await loop.run_in_executor(None, _load, self._path)
+        logger.info(f"Loaded configuration for {len(self._configs)} guilds from {self._path}")
+        return len(self._configs)
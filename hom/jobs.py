@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import typing as t
+
+from hom.database import Database
+
+__all__ = ("CloseJob", "CloseQueue")
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS close_jobs (
+    channel_id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    mod_id INTEGER NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    uploaded INTEGER NOT NULL DEFAULT 0,
+    mod_name TEXT NOT NULL DEFAULT ''
+);
+"""
+
+# Columns added since the table was first created, keyed by their name
+MIGRATIONS = {
+    "uploaded": "ALTER TABLE close_jobs ADD COLUMN uploaded INTEGER NOT NULL DEFAULT 0",
+    "mod_name": "ALTER TABLE close_jobs ADD COLUMN mod_name TEXT NOT NULL DEFAULT ''",
+}
+
+
+class CloseJob(t.NamedTuple):
+    channel_id: int
+    guild_id: int
+    mod_id: int
+    attempts: int = 0
+    # Set once the transcript has been posted, so retries only have the delete left to do
+    uploaded: bool = False
+    # Shown in the mod log, so closing doesn't have to look the moderator up
+    mod_name: str = ""
+
+
+Handler = t.Callable[[CloseJob], t.Awaitable[None]]
+Filter = t.Callable[[CloseJob], bool]
+
+
+@t.final
+class CloseQueue:
+    __slots__ = (
+        "_backoff",
+        "_concurrency",
+        "_db",
+        "_max_attempts",
+        "_pending",
+        "_queue",
+        "_timers",
+        "_workers",
+    )
+
+    def __init__(
+        self,
+        db: Database,
+        *,
+        concurrency: int = 2,
+        max_attempts: int = 5,
+        backoff: float = 5.0,
+    ) -> None:
+        self._db = db
+        self._concurrency = concurrency
+        self._max_attempts = max_attempts
+        self._backoff = backoff
+        self._queue: asyncio.Queue[CloseJob] = asyncio.Queue()
+        self._pending: t.Set[int] = set()
+        # Retries waiting out their backoff, keyed by channel ID
+        self._timers: t.Dict[int, asyncio.TimerHandle] = {}
+        self._workers: t.List[asyncio.Task[None]] = []
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def _put(self, job: CloseJob) -> None:
+        if job.channel_id not in self._pending:
+            self._pending.add(job.channel_id)
+            self._queue.put_nowait(job)
+
+    async def setup(self) -> None:
+        await self._db.executescript(SCHEMA)
+        columns = {row[1] for row in await self._db.fetchall("PRAGMA table_info(close_jobs)")}
+
+        for column, migration in MIGRATIONS.items():
+            if column not in columns:
+                await self._db.execute(migration)
+
+    async def enqueue(self, job: CloseJob) -> bool:
+        # The channel ID is the primary key, so repeated clicks don't queue the same ticket twice.
+        # Jobs that were given up on are started over instead
+        created = await self._db.execute(
+            "INSERT INTO close_jobs (channel_id, guild_id, mod_id, mod_name) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (channel_id) DO UPDATE SET mod_id = excluded.mod_id, "
+            "mod_name = excluded.mod_name, attempts = 0, failed = 0, uploaded = 0 WHERE failed = 1",
+            (job.channel_id, job.guild_id, job.mod_id, job.mod_name),
+        )
+
+        if created:
+            self._put(job)
+
+        return bool(created)
+
+    async def start(self, handler: Handler, owns: Filter = lambda _: True) -> None:
+        if self._workers:
+            return None
+
+        # Resume the jobs that were still pending when the bot last stopped
+        rows = await self._db.fetchall(
+            "SELECT channel_id, guild_id, mod_id, attempts, uploaded, mod_name FROM close_jobs "
+            "WHERE failed = 0"
+        )
+
+        # Other worker processes share the database and resume their own guilds' jobs
+        for job in filter(owns, map(CloseJob._make, rows)):
+            self._put(job)
+
+        self._workers = [
+            asyncio.create_task(self._work(handler)) for _ in range(self._concurrency)
+        ]
+
+    async def mark_uploaded(self, job: CloseJob) -> None:
+        await self._db.execute(
+            "UPDATE close_jobs SET uploaded = 1 WHERE channel_id = ?", (job.channel_id,)
+        )
+
+    def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+
+        for timer in self._timers.values():
+            timer.cancel()
+
+        # Whatever was still pending is resumed from the database by the next start()
+        self._workers.clear()
+        self._timers.clear()
+        self._pending.clear()
+        self._queue = asyncio.Queue()
+
+    def _requeue(self, job: CloseJob) -> None:
+        del self._timers[job.channel_id]
+        self._queue.put_nowait(job)
+
+    async def _retry(self, job: CloseJob) -> None:
+        attempts = job.attempts + 1
+
+        if attempts >= self._max_attempts:
+            logger.error(
+                f"Giving up on closing channel {job.channel_id} after {attempts} attempts"
+            )
+            await self._db.execute(
+                "UPDATE close_jobs SET attempts = ?, failed = 1 WHERE channel_id = ?",
+                (attempts, job.channel_id),
+            )
+            self._pending.discard(job.channel_id)
+            return None
+
+        delay = self._backoff * 2**job.attempts
+        logger.warning(f"Retrying close of channel {job.channel_id} in {delay:.0f}s")
+        await self._db.execute(
+            "UPDATE close_jobs SET attempts = ? WHERE channel_id = ?", (attempts, job.channel_id)
+        )
+        row = await self._db.fetchone(
+            "SELECT uploaded FROM close_jobs WHERE channel_id = ?", (job.channel_id,)
+        )
+        job = job._replace(attempts=attempts, uploaded=bool(row and row[0]))
+
+        loop = asyncio.get_running_loop()
+        self._timers[job.channel_id] = loop.call_later(delay, self._requeue, job)
+
+    async def _work(self, handler: Handler) -> None:
+        # stop() swaps the queue out while cancelled workers are still finishing up
+        queue = self._queue
+
+        while True:
+            job = await queue.get()
+
+            try:
+                await handler(job)
+            except Exception:
+                logger.exception(f"Failed to close channel {job.channel_id}")
+                await self._retry(job)
+            else:
+                await self._db.execute(
+                    "DELETE FROM close_jobs WHERE channel_id = ?", (job.channel_id,)
+                )
+                self._pending.discard(job.channel_id)
+            finally:
+                queue.task_done()
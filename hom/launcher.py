@@ -0,0 +1,261 @@
+import asyncio
+import contextlib
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
+import signal
+import time
+import typing as t
+
+import discord
+
+from hom.config import Config
+
+__all__ = ("Supervisor", "WorkerHealth", "recommended_shards", "split_shards")
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = "[{asctime}] [{levelname:<8}] {processName}: {name}: {message}"
+HEALTH_INTERVAL = 30.0
+# Workers that stop reporting for this long are assumed to be stuck and restarted
+HEALTH_TIMEOUT = 300.0
+REPORT_INTERVAL = 300.0
+MAX_BACKOFF = 60.0
+# A worker that stays up this long has its restart backoff reset
+STABLE_AFTER = 120.0
+
+
+class WorkerHealth(t.NamedTuple):
+    worker: int
+    pid: int
+    ready: bool
+    guilds: int
+    latencies: t.Dict[int, float]
+    reported_at: float
+
+
+class _Worker(t.NamedTuple):
+    process: multiprocessing.process.BaseProcess
+    started_at: float
+
+
+def split_shards(shard_count: int, workers: int) -> t.List[t.List[int]]:
+    workers = max(1, min(workers, shard_count))
+    return [
+        list(range(i * shard_count // workers, (i + 1) * shard_count // workers))
+        for i in range(workers)
+    ]
+
+
+async def _fetch_recommended_shards(token: str) -> int:
+    http = discord.http.HTTPClient(asyncio.get_running_loop())
+
+    try:
+        await http.static_login(token)
+        shards, _ = await http.get_bot_gateway()
+        return shards
+    finally:
+        await http.close()
+
+
+def recommended_shards(token: str) -> int:
+    return asyncio.run(_fetch_recommended_shards(token))
+
+
+def _install_uvloop() -> None:
+    if os.name != "nt":
+        import uvloop
+
+        # Faster drop in replacement for the asyncio event loop
+        # Only works on unix-like systems
+        uvloop.install()
+
+
+async def _report_health(bot: t.Any, worker: int, health: t.Any) -> None:
+    while True:
+        latencies = {shard: latency for shard, latency in bot.latencies if latency == latency}
+        health.put(
+            WorkerHealth(
+                worker, os.getpid(), bot.is_ready(), len(bot.guilds), latencies, time.time()
+            )
+        )
+        await asyncio.sleep(HEALTH_INTERVAL)
+
+
+async def _run_worker(
+    worker: int, shard_ids: t.List[int], shard_count: int, health: t.Any
+) -> None:
+    started = time.perf_counter()
+    # Imported here so the supervisor never loads the bot or its cogs
+    from hom.bot import Bot
+
+    metrics_port = Config.METRICS_PORT + worker if Config.METRICS_PORT else None
+    bot = Bot(
+        shard_ids=shard_ids, shard_count=shard_count, started=started, metrics_port=metrics_port
+    )
+    loop = asyncio.get_running_loop()
+
+    if os.name != "nt":
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, lambda: asyncio.create_task(bot.close()))
+
+    async with bot:
+        reporter = asyncio.create_task(_report_health(bot, worker, health))
+
+        try:
+            await bot.start(Config.DISCORD_TOKEN)
+        finally:
+            reporter.cancel()
+
+
+def _worker_main(
+    worker: int, shard_ids: t.List[int], shard_count: int, logs: t.Any, health: t.Any
+) -> None:
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(logs)]
+    root.setLevel(logging.INFO)
+
+    _install_uvloop()
+    logger.info(f"Starting shards {shard_ids[0]}-{shard_ids[-1]} of {shard_count}")
+    asyncio.run(_run_worker(worker, shard_ids, shard_count, health))
+
+
+@t.final
+class Supervisor:
+    __slots__ = (
+        "_context",
+        "_failures",
+        "_health",
+        "_listener",
+        "_logs",
+        "_ranges",
+        "_respawn_at",
+        "_shard_count",
+        "_stopping",
+        "_workers",
+    )
+
+    def __init__(self, shard_count: int, workers: int) -> None:
+        # Spawned rather than forked so no event loop state leaks into the workers
+        self._context = multiprocessing.get_context("spawn")
+        self._shard_count = shard_count
+        self._ranges = split_shards(shard_count, workers)
+        self._logs = self._context.Queue()
+        self._health = self._context.Queue()
+        self._listener: t.Optional[logging.handlers.QueueListener] = None
+        self._workers: t.Dict[int, _Worker] = {}
+        self._failures: t.Dict[int, int] = {i: 0 for i in range(len(self._ranges))}
+        self._respawn_at: t.Dict[int, float] = {}
+        self._stopping = False
+
+    def _spawn(self, worker: int) -> None:
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker, self._ranges[worker], self._shard_count, self._logs, self._health),
+            name=f"worker-{worker}",
+        )
+        process.start()
+        self._workers[worker] = _Worker(process, time.monotonic())
+
+    def _check(self, worker: int, health: t.Dict[int, WorkerHealth]) -> None:
+        process, started_at = self._workers[worker]
+        uptime = time.monotonic() - started_at
+
+        if process.is_alive():
+            last = health.get(worker)
+            if uptime > HEALTH_TIMEOUT and (
+                not last or time.time() - last.reported_at > HEALTH_TIMEOUT
+            ):
+                logger.error(f"Worker {worker} stopped reporting, restarting it")
+                process.kill()
+                process.join()
+            else:
+                return None
+
+        del self._workers[worker]
+        health.pop(worker, None)
+
+        if uptime > STABLE_AFTER:
+            self._failures[worker] = 0
+
+        delay = min(2.0 ** self._failures[worker], MAX_BACKOFF)
+        self._failures[worker] += 1
+        self._respawn_at[worker] = time.monotonic() + delay
+        logger.error(
+            f"Worker {worker} exited with code {process.exitcode}, restarting in {delay:.0f}s"
+        )
+
+    def _report(self, health: t.Dict[int, WorkerHealth]) -> None:
+        for worker, shards in enumerate(self._ranges):
+            if not (last := health.get(worker)):
+                logger.warning(f"Worker {worker} (shards {shards}) has not reported yet")
+                continue
+
+            latency = max(last.latencies.values(), default=0.0) * 1000
+            logger.info(
+                f"Worker {worker} (pid {last.pid}, shards {shards}) - "
+                f"{'ready' if last.ready else 'connecting'}, {last.guilds} guilds, "
+                f"worst shard latency {latency:.0f}ms"
+            )
+
+    def _stop(self, *_: t.Any) -> None:
+        self._stopping = True
+
+    def _shutdown(self) -> None:
+        for process, _ in self._workers.values():
+            process.terminate()
+
+        for process, _ in self._workers.values():
+            process.join(timeout=30)
+
+            if process.is_alive():
+                process.kill()
+
+    def run(self) -> None:
+        handler = logging.StreamHandler()
+        discord.utils.setup_logging(
+            handler=handler,
+            formatter=logging.Formatter(LOG_FORMAT, "%Y-%m-%d %H:%M:%S", style="{"),
+            root=True,
+        )
+        self._listener = logging.handlers.QueueListener(self._logs, handler)
+        self._listener.start()
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        logger.info(f"Running {self._shard_count} shards across {len(self._ranges)} workers")
+        for worker in range(len(self._ranges)):
+            self._spawn(worker)
+
+        health: t.Dict[int, WorkerHealth] = {}
+        next_report = time.monotonic() + REPORT_INTERVAL
+
+        try:
+            while not self._stopping:
+                with contextlib.suppress(queue.Empty):
+                    while True:
+                        report: WorkerHealth = self._health.get_nowait()
+                        health[report.worker] = report
+
+                for worker in list(self._workers):
+                    self._check(worker, health)
+
+                now = time.monotonic()
+                for worker, respawn_at in list(self._respawn_at.items()):
+                    if now >= respawn_at:
+                        del self._respawn_at[worker]
+                        self._spawn(worker)
+
+                if now >= next_report:
+                    self._report(health)
+                    next_report = now + REPORT_INTERVAL
+
+                time.sleep(1)
+
+        finally:
+            logger.info("Shutting down workers")
+            self._shutdown()
+            self._listener.stop()
@@ -0,0 +1,31 @@
+import os
+import tracemalloc
+import typing as t
+
+__all__ = ("max_rss", "top_allocations")
+
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def top_allocations(limit: int = 10) -> t.List[str]:
+    # Blocks the calling thread for a while on big heaps, so this should run in an executor
+    snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+    return [
+        f"{stat.size / 1024:>9.1f} KiB {stat.count:>7} blocks  {stat.traceback[0]}"
+        for stat in snapshot.statistics("lineno")[:limit]
+    ]
+
+
+def max_rss() -> t.Optional[int]:
+    if os.name == "nt":
+        return None
+
+    import resource
+
+    # Reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
@@ -0,0 +1,308 @@
+import bisect
+import collections
+import contextlib
+import contextvars
+import functools
+import logging
+import math
+import time
+import typing as t
+
+import aiohttp
+import discord
+from aiohttp import web
+
+if t.TYPE_CHECKING:
+    from hom.bot import Bot
+
+__all__ = ("HandlerStats", "Histogram", "Metrics", "MetricsServer", "instrumented")
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds, the same defaults the Prometheus clients use
+LATENCY_BUCKETS: t.Final[t.Tuple[float, ...]] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+REST_BUCKETS: t.Final[t.Tuple[float, ...]] = (0, 1, 2, 3, 5, 8, 13, 21)
+# A healthy loop lags well under a millisecond, so these start lower
+LAG_BUCKETS: t.Final[t.Tuple[float, ...]] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+HandlerT = t.TypeVar("HandlerT", bound=t.Callable[..., t.Awaitable[t.Any]])
+
+
+@t.final
+class Histogram:
+    __slots__ = ("_buckets", "_counts", "count", "max", "sum")
+
+    def __init__(self, buckets: t.Sequence[float]) -> None:
+        self._buckets = buckets
+        # The last count is the implicit +Inf bucket
+        self._counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect.bisect_left(self._buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        # Estimated as the upper bound of the bucket the quantile falls in
+        rank, seen = q * self.count, 0
+
+        for bound, count in zip((*self._buckets, math.inf), self._counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+
+        return self.max
+
+    def cumulative(self) -> t.Iterator[t.Tuple[float, int]]:
+        seen = 0
+        for bound, count in zip((*self._buckets, math.inf), self._counts):
+            seen += count
+            yield bound, seen
+
+
+class HandlerStats(t.NamedTuple):
+    handler: str
+    calls: int
+    errors: int
+    defer_p50: float
+    defer_p99: float
+    total_p50: float
+    total_p99: float
+    rest_calls: float
+
+
+@t.final
+class _Invocation:
+    __slots__ = ("deferred_at", "rest_calls", "started_at")
+
+    def __init__(self) -> None:
+        self.started_at = time.perf_counter()
+        self.deferred_at: t.Optional[float] = None
+        self.rest_calls = 0
+
+
+# Tasks started by a handler copy the context, so their requests are counted towards it too
+_current: "contextvars.ContextVar[t.Optional[_Invocation]]" = contextvars.ContextVar(
+    "hom_invocation", default=None
+)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _bound(value: float) -> str:
+    return "+Inf" if value == math.inf else f"{value:g}"
+
+
+@t.final
+class Metrics:
+    __slots__ = ("_defer", "_errors", "_rest", "_total", "loop_lag", "loop_stalls", "trace")
+
+    def __init__(self) -> None:
+        self._defer: t.DefaultDict[str, Histogram] = collections.defaultdict(
+            lambda: Histogram(LATENCY_BUCKETS)
+        )
+        self._total: t.DefaultDict[str, Histogram] = collections.defaultdict(
+            lambda: Histogram(LATENCY_BUCKETS)
+        )
+        self._rest: t.DefaultDict[str, Histogram] = collections.defaultdict(
+            lambda: Histogram(REST_BUCKETS)
+        )
+        self._errors: t.Counter[t.Tuple[str, str]] = collections.Counter()
+        # Only filled in while the loop watchdog is running
+        self.loop_lag = Histogram(LAG_BUCKETS)
+        self.loop_stalls = 0
+
+        # Interaction responses and followups go through the same session as every other
+        # request, so this sees all of them
+        self.trace = aiohttp.TraceConfig()
+        self.trace.on_request_end.append(self._on_request_end)
+        self.trace.on_request_exception.append(self._on_request_exception)
+
+    # Signal callbacks are typed loosely here as their annotations vary between aiohttp versions
+    async def _on_request_end(self, *args: t.Any) -> None:
+        if not (current := _current.get()):
+            return None
+
+        current.rest_calls += 1
+        params: aiohttp.TraceRequestEndParams = args[2]
+
+        if current.deferred_at is None and params.url.path.endswith("/callback"):
+            current.deferred_at = time.perf_counter()
+
+    async def _on_request_exception(self, *_: t.Any) -> None:
+        if current := _current.get():
+            current.rest_calls += 1
+
+    @contextlib.contextmanager
+    def track(self, handler: str) -> t.Iterator[None]:
+        current = _Invocation()
+        token = _current.set(current)
+
+        try:
+            yield None
+        except Exception as e:
+            self._errors[(handler, type(e).__name__)] += 1
+            raise
+        finally:
+            _current.reset(token)
+            self._total[handler].observe(time.perf_counter() - current.started_at)
+            self._rest[handler].observe(current.rest_calls)
+
+            if current.deferred_at is not None:
+                self._defer[handler].observe(current.deferred_at - current.started_at)
+
+    def summary(self) -> t.List[HandlerStats]:
+        errors: t.Counter[str] = collections.Counter()
+        for (handler, _), count in self._errors.items():
+            errors[handler] += count
+
+        stats: t.List[HandlerStats] = []
+        for handler, total in sorted(self._total.items()):
+            # Handlers that bail out before responding never record a defer latency
+            defer = self._defer.get(handler) or Histogram(LATENCY_BUCKETS)
+            stats.append(
+                HandlerStats(
+                    handler,
+                    total.count,
+                    errors[handler],
+                    defer.quantile(0.5),
+                    defer.quantile(0.99),
+                    total.quantile(0.5),
+                    total.quantile(0.99),
+                    self._rest[handler].sum / total.count,
+                )
+            )
+
+        return stats
+
+    def render(self) -> str:
+        lines: t.List[str] = []
+        histograms = (
+            (
+                "hom_interaction_seconds",
+                "Time from a handler starting to it returning",
+                self._total,
+            ),
+            (
+                "hom_interaction_defer_seconds",
+                "Time from a handler starting to its interaction being responded to",
+                self._defer,
+            ),
+            ("hom_interaction_rest_calls", "REST requests made per handler call", self._rest),
+        )
+
+        for name, description, by_handler in histograms:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} histogram")
+
+            for handler, histogram in sorted(by_handler.items()):
+                label = f'handler="{_label(handler)}"'
+                lines.extend(
+                    f'{name}_bucket{{{label},le="{_bound(bound)}"}} {count}'
+                    for bound, count in histogram.cumulative()
+                )
+                lines.append(f"{name}_sum{{{label}}} {histogram.sum:g}")
+                lines.append(f"{name}_count{{{label}}} {histogram.count}")
+
+        lines.append("# HELP hom_interaction_errors_total Handler calls that raised, by error")
+        lines.append("# TYPE hom_interaction_errors_total counter")
+        lines.extend(
+            f'hom_interaction_errors_total{{handler="{_label(handler)}",error="{error}"}} {count}'
+            for (handler, error), count in sorted(self._errors.items())
+        )
+
+        if self.loop_lag.count:
+            name = "hom_event_loop_lag_seconds"
+            lines.append(f"# HELP {name} How late the watchdog's periodic tick ran")
+            lines.append(f"# TYPE {name} histogram")
+            lines.extend(
+                f'{name}_bucket{{le="{_bound(bound)}"}} {count}'
+                for bound, count in self.loop_lag.cumulative()
+            )
+            lines.append(f"{name}_sum {self.loop_lag.sum:g}")
+            lines.append(f"{name}_count {self.loop_lag.count}")
+            lines.append("# HELP hom_event_loop_stalls_total Stalls longer than the threshold")
+            lines.append("# TYPE hom_event_loop_stalls_total counter")
+            lines.append(f"hom_event_loop_stalls_total {self.loop_stalls}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _handler_name(interaction: discord.Interaction[t.Any]) -> str:
+    if interaction.command:
+        return interaction.command.qualified_name
+
+    # Buttons are named after their custom_id, which stays the same across restarts
+    data = t.cast(t.Mapping[str, t.Any], interaction.data or {})
+    return str(data.get("custom_id", "unknown"))
+
+
+def instrumented(func: HandlerT) -> HandlerT:
+    # Goes directly on the callback, below the button or command decorator
+    @functools.wraps(func)
+    async def wrapper(*args: t.Any, **kwargs: t.Any) -> t.Any:
+        interaction = next(arg for arg in args if isinstance(arg, discord.Interaction))
+        bot = t.cast("Bot", interaction.client)
+
+        with bot.metrics.track(_handler_name(interaction)):
+            return await func(*args, **kwargs)
+
+    return t.cast(HandlerT, wrapper)
+
+
+@t.final
+class MetricsServer:
+    __slots__ = ("_metrics", "_port", "_runner")
+
+    def __init__(self, metrics: Metrics, port: int) -> None:
+        self._metrics = metrics
+        self._port = port
+        self._runner: t.Optional[web.AppRunner] = None
+
+    async def _handle(self, _: web.Request) -> web.Response:
+        return web.Response(text=self._metrics.render(), content_type="text/plain")
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        # Only reachable from the host, scrape it through a local agent or an SSH tunnel
+        await web.TCPSite(self._runner, "127.0.0.1", self._port).start()
+        logger.info(f"Serving metrics on http://127.0.0.1:{self._port}/metrics")
+
+    async def close(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
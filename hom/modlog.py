@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import typing as t
+
+import discord
+
+from hom.scheduler import Priority
+from hom.scheduler import RestScheduler
+
+__all__ = ("ModLog",)
+
+logger = logging.getLogger(__name__)
+
+# Discord's limits on the embeds in a single message
+MAX_EMBEDS = 10
+MAX_EMBED_CHARS = 6000
+
+
+class _Upload(t.NamedTuple):
+    embed: discord.Embed
+    files: t.Iterator[discord.File]
+    parts: int
+    future: "asyncio.Future[t.Optional[discord.Message]]"
+
+
+_Item = t.Union[discord.Embed, _Upload, None]
+
+
+@t.final
+class ModLog:
+    __slots__ = ("_client", "_channel_id", "_interval", "_queue", "_scheduler", "_task")
+
+    def __init__(
+        self,
+        client: discord.Client,
+        scheduler: RestScheduler,
+        channel_id: int,
+        *,
+        interval: float = 2.0,
+    ) -> None:
+        self._client = client
+        self._scheduler = scheduler
+        self._channel_id = channel_id
+        self._interval = interval
+        self._queue: asyncio.Queue[_Item] = asyncio.Queue()
+        self._task: t.Optional[asyncio.Task[None]] = None
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def channel_id(self) -> int:
+        return self._channel_id
+
+    @channel_id.setter
+    def channel_id(self, channel_id: int) -> None:
+        self._channel_id = channel_id
+
+    @property
+    def channel(self) -> t.Optional[discord.TextChannel]:
+        channel = self._client.get_channel(self._channel_id)
+        return channel if isinstance(channel, discord.TextChannel) else None
+
+    def start(self) -> None:
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task:
+            # Lets the writer drain everything queued before the sentinel
+            self._queue.put_nowait(None)
+            await self._task
+            self._task = None
+
+    def post(self, embed: discord.Embed) -> None:
+        self._queue.put_nowait(embed)
+
+    async def upload(
+        self, embed: discord.Embed, files: t.Iterator[discord.File], parts: int = 1
+    ) -> t.Optional[discord.Message]:
+        future: asyncio.Future[t.Optional[discord.Message]]
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_Upload(embed, files, parts, future))
+        return await future
+
+    async def _send_embeds(self, embeds: t.List[discord.Embed]) -> None:
+        if not embeds or not (channel := self.channel):
+            return None
+
+        try:
+            async with self._scheduler.slot(Priority.LOGGING):
+                await channel.send(embeds=embeds)
+        except Exception:
+            logger.exception(f"Failed to send {len(embeds)} mod log embeds")
+
+    async def _send_upload(self, upload: _Upload) -> None:
+        if not (channel := self.channel):
+            if not upload.future.done():
+                upload.future.set_result(None)
+
+            return None
+
+        try:
+            async with self._scheduler.slot(Priority.LOGGING):
+                message = await channel.send(embed=upload.embed, file=next(upload.files))
+
+            for part, file in enumerate(upload.files, 2):
+                async with self._scheduler.slot(Priority.LOGGING):
+                    await channel.send(f"Transcript part {part}/{upload.parts}", file=file)
+
+        except Exception as e:
+            # The waiter may have been cancelled in the meantime, a close job on shutdown say
+            if not upload.future.done():
+                upload.future.set_exception(e)
+
+        else:
+            if not upload.future.done():
+                upload.future.set_result(message)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        batch: t.List[discord.Embed] = []
+        deadline = 0.0
+
+        while True:
+            timeout = max(deadline - loop.time(), 0) if batch else None
+
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                await self._send_embeds(batch)
+                batch = []
+                continue
+
+            if isinstance(item, discord.Embed):
+                if sum(map(len, batch)) + len(item) > MAX_EMBED_CHARS:
+                    await self._send_embeds(batch)
+                    batch = []
+
+                if not batch:
+                    deadline = loop.time() + self._interval
+
+                batch.append(item)
+                if len(batch) == MAX_EMBEDS:
+                    await self._send_embeds(batch)
+                    batch = []
+
+                continue
+
+            # Uploads and the shutdown sentinel wait for everything queued before them
+            await self._send_embeds(batch)
+            batch = []
+
+            if item is None:
+                return None
+
+            try:
+                await self._send_upload(item)
+            except Exception:
+                # Nothing may stop the writer, everything queued after this still has to go out
+                logger.exception("Failed to send a mod log upload")
@@ -0,0 +1,56 @@
+import typing as t
+
+import discord
+
+from hom.extensions import Extension
+
+__all__ = ("CacheProfile", "build_profile", "required_intents")
+
+PROFILES = ("minimal", "members", "full")
+
+
+class CacheProfile(t.NamedTuple):
+    name: str
+    intents: discord.Intents
+    member_cache_flags: discord.MemberCacheFlags
+    max_messages: t.Optional[int]
+    chunk_guilds_at_startup: bool
+
+
+def required_intents(extensions: t.Iterable[Extension]) -> discord.Intents:
+    # Channel, role and guild events are needed by the bot itself, the rest is up to the cogs
+    intents = discord.Intents(guilds=True)
+
+    for extension in extensions:
+        intents |= extension.intents
+
+    return intents
+
+
+def build_profile(
+    name: str,
+    extensions: t.Iterable[Extension],
+    *,
+    max_messages: t.Optional[int] = 1000,
+    chunk_guilds_at_startup: t.Optional[bool] = None,
+) -> CacheProfile:
+    if name not in PROFILES:
+        raise ValueError(f"Unknown cache profile {name!r}, expected one of {', '.join(PROFILES)}")
+
+    if name == "full":
+        intents = discord.Intents.all()
+    elif name == "members":
+        intents = required_intents(extensions) | discord.Intents(members=True)
+    else:
+        intents = required_intents(extensions)
+
+    if chunk_guilds_at_startup is None:
+        chunk_guilds_at_startup = name == "full"
+
+    return CacheProfile(
+        name,
+        intents,
+        discord.MemberCacheFlags.from_intents(intents),
+        max_messages,
+        chunk_guilds_at_startup and intents.members,
+    )
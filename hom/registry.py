@@ -0,0 +1,107 @@
+import logging
+import typing as t
+
+import discord
+
+from hom.guilds import GuildConfig
+
+__all__ = ("Registry",)
+
+logger = logging.getLogger(__name__)
+
+_Object = t.Union[discord.abc.GuildChannel, discord.Role]
+_Kind = t.Union[t.Type[discord.abc.GuildChannel], t.Type[discord.Role]]
+_O = t.TypeVar("_O", discord.TextChannel, discord.CategoryChannel, discord.Role)
+
+_FIELDS: t.Tuple[t.Tuple[str, _Kind], ...] = (
+    ("support_channel", discord.TextChannel),
+    ("ticket_category", discord.CategoryChannel),
+    ("mod_log_channel", discord.TextChannel),
+    ("patreon_channel", discord.TextChannel),
+    ("questions_channel", discord.TextChannel),
+    ("mod_role", discord.Role),
+)
+
+
+class _Expected(t.NamedTuple):
+    guild_id: int
+    name: str
+    kind: _Kind
+
+
+@t.final
+class Registry:
+    __slots__ = ("_expected", "_resolved")
+
+    def __init__(self) -> None:
+        self._expected: t.Dict[int, _Expected] = {}
+        self._resolved: t.Dict[int, _Object] = {}
+
+    def expect(self, guild_id: int, name: str, object_id: int, kind: _Kind) -> None:
+        self._expected[object_id] = _Expected(guild_id, name, kind)
+
+    def forget(self, object_id: int) -> None:
+        self._expected.pop(object_id, None)
+        self._resolved.pop(object_id, None)
+
+    def clear(self, guild_id: int) -> None:
+        for object_id in [k for k, v in self._expected.items() if v.guild_id == guild_id]:
+            self.forget(object_id)
+
+    def resolve(
+        self, guild: discord.Guild, config: GuildConfig, overflow: t.Iterable[int] = ()
+    ) -> t.List[str]:
+        self.clear(guild.id)
+
+        for name, kind in _FIELDS:
+            self.expect(guild.id, name, getattr(config, name), kind)
+
+        for category_id in (*config.overflow_categories, *overflow):
+            self.expect(guild.id, "overflow category", category_id, discord.CategoryChannel)
+
+        missing: t.List[str] = []
+
+        for object_id, expected in self._expected.items():
+            if expected.guild_id != guild.id:
+                continue
+
+            if issubclass(expected.kind, discord.Role):
+                found: t.Optional[_Object] = guild.get_role(object_id)
+            else:
+                found = guild.get_channel(object_id)
+
+            if not found:
+                missing.append(f"{expected.name} ({object_id}) does not exist")
+            elif not isinstance(found, expected.kind):
+                missing.append(
+                    f"{expected.name} ({object_id}) is a {type(found).__name__}, "
+                    f"expected a {expected.kind.__name__}"
+                )
+            else:
+                self._resolved[object_id] = found
+
+        for problem in missing:
+            logger.error(f"Configured ID {problem} in {guild.name} ({guild.id})")
+
+        return missing
+
+    def update(self, found: _Object) -> None:
+        if (expected := self._expected.get(found.id)) and isinstance(found, expected.kind):
+            self._resolved[found.id] = found
+
+    def remove(self, object_id: int) -> None:
+        if self._resolved.pop(object_id, None):
+            logger.error(f"Configured {self._expected[object_id].name} ({object_id}) was deleted")
+
+    def _get(self, object_id: int, kind: t.Type[_O]) -> t.Optional[_O]:
+        found = self._resolved.get(object_id)
+        return found if isinstance(found, kind) else None
+
+    def channel(self, channel_id: int) -> t.Optional[discord.TextChannel]:
+        return self._get(channel_id, discord.TextChannel)
+
+    def category(self, category_id: int) -> t.Optional[discord.CategoryChannel]:
+        return self._get(category_id, discord.CategoryChannel)
+
+    def role(self, role_id: int) -> t.Optional[discord.Role]:
+        return self._get(role_id, discord.Role)
@@ -0,0 +1,117 @@
+import asyncio
+import collections
+import contextlib
+import enum
+import typing as t
+
+__all__ = ("Priority", "RestScheduler", "SchedulerStats")
+
+
+class Priority(enum.IntEnum):
+    # Lower values are always scheduled first
+    INTERACTION = 0
+    TICKET = 1
+    LOGGING = 2
+    ARCHIVAL = 3
+
+
+# Background classes can never take up every slot, so a couple are always free for interactions
+DEFAULT_LIMITS: t.Final[t.Mapping[Priority, int]] = {
+    Priority.INTERACTION: 10,
+    Priority.TICKET: 4,
+    Priority.LOGGING: 2,
+    Priority.ARCHIVAL: 2,
+}
+
+
+class SchedulerStats(t.NamedTuple):
+    priority: Priority
+    queued: int
+    active: int
+    peak_queued: int
+    total: int
+
+
+@t.final
+class RestScheduler:
+    __slots__ = ("_active", "_capacity", "_limits", "_peaks", "_running", "_totals", "_waiters")
+
+    def __init__(
+        self, capacity: int = 10, limits: t.Mapping[Priority, int] = DEFAULT_LIMITS
+    ) -> None:
+        self._capacity = capacity
+        self._limits = limits
+        self._running = 0
+        self._active = {p: 0 for p in Priority}
+        self._peaks = {p: 0 for p in Priority}
+        self._totals = {p: 0 for p in Priority}
+        self._waiters: t.Dict[Priority, t.Deque[asyncio.Future[None]]] = {
+            p: collections.deque() for p in Priority
+        }
+
+    def _has_room(self, priority: Priority) -> bool:
+        return self._running < self._capacity and self._active[priority] < self._limits[priority]
+
+    def _grant(self, priority: Priority) -> None:
+        self._running += 1
+        self._active[priority] += 1
+        self._totals[priority] += 1
+
+    def _release(self, priority: Priority) -> None:
+        self._running -= 1
+        self._active[priority] -= 1
+
+        for waiting in Priority:
+            waiters = self._waiters[waiting]
+
+            while waiters and self._has_room(waiting):
+                self._grant(waiting)
+                waiters.popleft().set_result(None)
+
+    async def _acquire(self, priority: Priority) -> None:
+        # Waiters of the same or a more urgent class that could use a free slot go first
+        urgent = any(
+            self._waiters[p] and self._active[p] < self._limits[p]
+            for p in Priority
+            if p <= priority
+        )
+        if self._has_room(priority) and not urgent:
+            self._grant(priority)
+            return None
+
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        waiters = self._waiters[priority]
+        waiters.append(future)
+        self._peaks[priority] = max(self._peaks[priority], len(waiters))
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # We were handed a slot in the same tick we were cancelled
+                self._release(priority)
+            else:
+                waiters.remove(future)
+
+            raise
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: Priority) -> t.AsyncIterator[None]:
+        await self._acquire(priority)
+
+        try:
+            yield None
+        finally:
+            self._release(priority)
+
+    def stats(self) -> t.List[SchedulerStats]:
+        return [
+            SchedulerStats(
+                p,
+                len(self._waiters[p]),
+                self._active[p],
+                self._peaks[p],
+                self._totals[p],
+            )
+            for p in Priority
+        ]
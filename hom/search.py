@@ -0,0 +1,165 @@
+import asyncio
+import datetime
+import sqlite3
+import typing as t
+
+from hom.config import Config
+from hom.database import Database
+
+__all__ = ("SearchResult", "TranscriptDocument", "TranscriptIndex")
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS transcript_search USING fts5(
+    channel,
+    topic,
+    owner_id,
+    mod_id,
+    body,
+    opened_at UNINDEXED,
+    closed_at UNINDEXED,
+    tokenize = 'porter unicode61'
+);
+
+CREATE TABLE IF NOT EXISTS transcript_guilds (
+    document_id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL
+);
+"""
+
+# Transcripts indexed before guilds were tracked belong to the only guild there was, without a
+# home guild to file them under they stay out of search results
+MIGRATION = """
+INSERT INTO transcript_guilds (document_id, guild_id)
+SELECT rowid, ? FROM transcript_search
+WHERE rowid NOT IN (SELECT document_id FROM transcript_guilds)
+"""
+
+# Only this much of a transcript is indexed, the archive itself can be far larger than what's
+# reasonable to hold in memory at once
+INDEX_LIMIT = 2 * 1024 * 1024
+
+
+class TranscriptDocument(t.NamedTuple):
+    # Tickets are keyed by their channel ID, backfilled ones from before the channel ID was
+    # logged by the log message ID
+    id: int
+    guild_id: int
+    channel: str
+    topic: str
+    owner_id: t.Optional[int]
+    mod_id: t.Optional[int]
+    opened_at: t.Optional[datetime.datetime]
+    closed_at: datetime.datetime
+
+
+class SearchResult(t.NamedTuple):
+    id: int
+    channel: str
+    topic: str
+    owner_id: t.Optional[int]
+    mod_id: t.Optional[int]
+    closed_at: datetime.datetime
+    snippet: str
+
+
+def _quote(query: str) -> str:
+    # Treats every term as a literal so stray FTS syntax in user input can't fail the query
+    return " ".join('"{}"'.format(term.replace('"', '""')) for term in query.split())
+
+
+def _read(archive: t.IO[bytes]) -> str:
+    archive.seek(0)
+    # A split character at the end just turns into a replacement character
+    body = archive.read(INDEX_LIMIT).decode(errors="replace")
+    archive.seek(0)
+    return body
+
+
+def _timestamp(value: t.Optional[datetime.datetime]) -> t.Optional[float]:
+    return value.timestamp() if value else None
+
+
+@t.final
+class TranscriptIndex:
+    __slots__ = ("_db",)
+
+    def __init__(self, db: Database) -> None:
+        self._db = db
+
+    async def setup(self) -> None:
+        await self._db.executescript(SCHEMA)
+
+        if Config.HOME_GUILD is not None:
+            await self.assign(Config.HOME_GUILD)
+
+    async def assign(self, guild_id: int) -> None:
+        await self._db.execute(MIGRATION, (guild_id,))
+
+    async def add(self, document: TranscriptDocument, archive: t.IO[bytes]) -> None:
+        loop = asyncio.get_running_loop()
+        body = await loop.run_in_executor(None, _read, archive)
+
+        # Written together, a transcript without its guild would never turn up in a search
+        await self._db.transaction(
+            [
+                (
+                    "INSERT OR REPLACE INTO transcript_search "
+                    "(rowid, channel, topic, owner_id, mod_id, body, opened_at, closed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        document.id,
+                        document.channel,
+                        document.topic,
+                        str(document.owner_id or ""),
+                        str(document.mod_id or ""),
+                        body,
+                        _timestamp(document.opened_at),
+                        _timestamp(document.closed_at),
+                    ),
+                ),
+                (
+                    "INSERT OR REPLACE INTO transcript_guilds VALUES (?, ?)",
+                    (document.id, document.guild_id),
+                ),
+            ]
+        )
+
+    async def contains(
+        self, guild_id: int, channel: str, closed_at: datetime.datetime, window: float = 600.0
+    ) -> bool:
+        # Transcripts indexed on close don't know about the log message they were posted in, but
+        # were closed moments before it
+        row = await self._db.fetchone(
+            "SELECT 1 FROM transcript_search "
+            "JOIN transcript_guilds ON document_id = transcript_search.rowid "
+            "WHERE channel = ? AND closed_at BETWEEN ? AND ? AND guild_id = ? LIMIT 1",
+            (channel, closed_at.timestamp() - window, closed_at.timestamp() + window, guild_id),
+        )
+        return row is not None
+
+    async def search(self, query: str, guild_id: int, limit: int = 10) -> t.List[SearchResult]:
+        sql = (
+            "SELECT transcript_search.rowid, channel, topic, owner_id, mod_id, closed_at, "
+            "snippet(transcript_search, 4, '**', '**', '…', 12) "
+            "FROM transcript_search JOIN transcript_guilds ON document_id = transcript_search.rowid "
+            "WHERE transcript_search MATCH ? AND guild_id = ? "
+            "ORDER BY rank LIMIT ?"
+        )
+
+        try:
+            rows = await self._db.fetchall(sql, (query, guild_id, limit))
+        except sqlite3.OperationalError:
+            rows = await self._db.fetchall(sql, (_quote(query), guild_id, limit))
+
+        return [
+            SearchResult(
+                row[0],
+                row[1],
+                row[2],
+                int(row[3]) if row[3] else None,
+                int(row[4]) if row[4] else None,
+                datetime.datetime.fromtimestamp(row[5], tz=datetime.timezone.utc),
+                row[6],
+            )
+            for row in rows
+        ]
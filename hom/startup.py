@@ -0,0 +1,27 @@
+import time
+import typing as t
+
+__all__ = ("StartupTimer",)
+
+
+@t.final
+class StartupTimer:
+    __slots__ = ("_last", "_phases")
+
+    def __init__(self, started: float) -> None:
+        self._last = started
+        self._phases: t.Dict[str, float] = {}
+
+    def __contains__(self, phase: str) -> bool:
+        return phase in self._phases
+
+    def mark(self, phase: str) -> None:
+        # Phases run back to back, so each one lasts from the previous mark until this one
+        now = time.perf_counter()
+        self._phases[phase] = self._phases.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def report(self) -> t.List[str]:
+        lines = [f"{phase:<16} {seconds:>7.2f}s" for phase, seconds in self._phases.items()]
+        lines.append(f"{'total':<16} {sum(self._phases.values()):>7.2f}s")
+        return lines
@@ -0,0 +1,254 @@
+import collections
+import datetime
+import enum
+import time
+import typing as t
+
+from hom.database import Database
+from hom.database import Statement
+from hom.tickets import TicketRecord
+
+__all__ = ("Event", "Rollup", "Scope", "TicketStats")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ticket_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel_id INTEGER NOT NULL,
+    guild_id INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    user_id INTEGER,
+    category TEXT NOT NULL,
+    at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS ticket_rollups (
+    guild_id INTEGER NOT NULL,
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    opened INTEGER NOT NULL,
+    replied INTEGER NOT NULL,
+    reply_seconds REAL NOT NULL,
+    pings INTEGER NOT NULL,
+    user_closed INTEGER NOT NULL,
+    closed INTEGER NOT NULL,
+    close_seconds REAL NOT NULL,
+    PRIMARY KEY (guild_id, scope, key)
+);
+
+CREATE TABLE IF NOT EXISTS tracked_tickets (
+    channel_id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    opened_at REAL NOT NULL,
+    replied_at REAL
+);
+"""
+
+UPSERT_ROLLUP = """
+INSERT INTO ticket_rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (guild_id, scope, key) DO UPDATE SET
+    opened = opened + excluded.opened,
+    replied = replied + excluded.replied,
+    reply_seconds = reply_seconds + excluded.reply_seconds,
+    pings = pings + excluded.pings,
+    user_closed = user_closed + excluded.user_closed,
+    closed = closed + excluded.closed,
+    close_seconds = close_seconds + excluded.close_seconds
+"""
+
+
+class Event(enum.Enum):
+    OPENED = "opened"
+    REPLIED = "replied"
+    PINGED = "pinged"
+    USER_CLOSED = "user_closed"
+    CLOSED = "closed"
+
+
+# Only these are credited to the moderator who triggered them
+MODERATOR_EVENTS = frozenset((Event.REPLIED, Event.PINGED, Event.CLOSED))
+
+
+class Scope(enum.Enum):
+    ALL = "all"
+    CATEGORY = "category"
+    HOUR = "hour"
+    MODERATOR = "moderator"
+
+
+class Rollup(t.NamedTuple):
+    opened: int = 0
+    replied: int = 0
+    reply_seconds: float = 0.0
+    pings: int = 0
+    user_closed: int = 0
+    closed: int = 0
+    close_seconds: float = 0.0
+
+    def merge(self, other: "Rollup") -> "Rollup":
+        return Rollup._make(a + b for a, b in zip(self, other))
+
+    @property
+    def mean_reply(self) -> t.Optional[float]:
+        return self.reply_seconds / self.replied if self.replied else None
+
+    @property
+    def mean_close(self) -> t.Optional[float]:
+        return self.close_seconds / self.closed if self.closed else None
+
+
+class _Ticket(t.NamedTuple):
+    guild_id: int
+    category: str
+    opened_at: float
+    replied_at: t.Optional[float]
+
+
+def _timestamp(at: t.Optional[datetime.datetime]) -> float:
+    return at.timestamp() if at else time.time()
+
+
+@t.final
+class TicketStats:
+    __slots__ = ("_db", "_rollups", "_tickets")
+
+    def __init__(self, db: Database) -> None:
+        self._db = db
+        # Both mirror their tables, the events themselves are only ever appended
+        self._rollups: t.DefaultDict[
+            int, t.Dict[t.Tuple[Scope, str], Rollup]
+        ] = collections.defaultdict(dict)
+        self._tickets: t.Dict[int, _Ticket] = {}
+
+    async def setup(self) -> None:
+        await self._db.executescript(SCHEMA)
+
+        for guild_id, scope, key, *counts in await self._db.fetchall(
+            "SELECT * FROM ticket_rollups"
+        ):
+            self._rollups[guild_id][Scope(scope), key] = Rollup(*counts)
+
+        for channel_id, *ticket in await self._db.fetchall("SELECT * FROM tracked_tickets"):
+            self._tickets[channel_id] = _Ticket(*ticket)
+
+    def rollup(self, guild_id: int, scope: Scope = Scope.ALL, key: str = "") -> Rollup:
+        return self._rollups[guild_id].get((scope, key)) or Rollup()
+
+    def rollups(self, guild_id: int, scope: Scope) -> t.Dict[str, Rollup]:
+        return {key: rollup for (s, key), rollup in self._rollups[guild_id].items() if s is scope}
+
+    def awaiting_reply(self, channel_id: int) -> bool:
+        return (ticket := self._tickets.get(channel_id)) is not None and ticket.replied_at is None
+
+    async def _record(
+        self,
+        event: Event,
+        channel_id: int,
+        ticket: _Ticket,
+        user_id: t.Optional[int],
+        at: float,
+        delta: Rollup,
+        tracking: t.Optional[Statement] = None,
+    ) -> None:
+        # Rollups are keyed by the hour the event happened in, so load can be read per hour
+        keys = [
+            (Scope.ALL, ""),
+            (Scope.CATEGORY, ticket.category),
+            (Scope.HOUR, f"{datetime.datetime.fromtimestamp(at, datetime.timezone.utc):%H}"),
+        ]
+
+        if user_id is not None and event in MODERATOR_EVENTS:
+            keys.append((Scope.MODERATOR, str(user_id)))
+
+        rollups = self._rollups[ticket.guild_id]
+        for key in keys:
+            rollups[key] = (rollups.get(key) or Rollup()).merge(delta)
+
+        statements: t.List[Statement] = [
+            (
+                "INSERT INTO ticket_events (channel_id, guild_id, event, user_id, category, at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (channel_id, ticket.guild_id, event.value, user_id, ticket.category, at),
+            ),
+            *((UPSERT_ROLLUP, (ticket.guild_id, s.value, k, *delta)) for s, k in keys),
+        ]
+
+        if tracking:
+            statements.append(tracking)
+
+        await self._db.transaction(statements)
+
+    async def opened(self, guild_id: int, record: TicketRecord) -> None:
+        ticket = self._tickets[record.channel_id] = _Ticket(
+            guild_id, record.category, record.opened_at.timestamp(), None
+        )
+        await self._record(
+            Event.OPENED,
+            record.channel_id,
+            ticket,
+            record.owner_id,
+            ticket.opened_at,
+            Rollup(opened=1),
+            (
+                "INSERT OR REPLACE INTO tracked_tickets VALUES (?, ?, ?, ?, ?)",
+                (record.channel_id, *ticket),
+            ),
+        )
+
+    async def replied(
+        self, channel_id: int, mod_id: int, at: t.Optional[datetime.datetime] = None
+    ) -> None:
+        # Tickets opened before the stats existed are never tracked, there's no telling
+        # whether they were replied to already
+        if not self.awaiting_reply(channel_id):
+            return None
+
+        ticket = self._tickets[channel_id]
+        timestamp = _timestamp(at)
+        # Updated before awaiting anything, so a second message can't count as the first reply
+        self._tickets[channel_id] = ticket._replace(replied_at=timestamp)
+        await self._record(
+            Event.REPLIED,
+            channel_id,
+            ticket,
+            mod_id,
+            timestamp,
+            Rollup(replied=1, reply_seconds=max(0.0, timestamp - ticket.opened_at)),
+            (
+                "UPDATE tracked_tickets SET replied_at = ? WHERE channel_id = ?",
+                (timestamp, channel_id),
+            ),
+        )
+
+    async def pinged(self, channel_id: int, mod_id: t.Optional[int]) -> None:
+        if ticket := self._tickets.get(channel_id):
+            await self._record(
+                Event.PINGED, channel_id, ticket, mod_id, time.time(), Rollup(pings=1)
+            )
+
+    async def user_closed(self, channel_id: int, user_id: int) -> None:
+        if ticket := self._tickets.get(channel_id):
+            await self._record(
+                Event.USER_CLOSED,
+                channel_id,
+                ticket,
+                user_id,
+                time.time(),
+                Rollup(user_closed=1),
+            )
+
+    async def closed(self, channel_id: int, mod_id: t.Optional[int]) -> None:
+        # Channels deleted by hand are still counted, just without a moderator to credit
+        if not (ticket := self._tickets.pop(channel_id, None)):
+            return None
+
+        timestamp = time.time()
+        await self._record(
+            Event.CLOSED,
+            channel_id,
+            ticket,
+            mod_id,
+            timestamp,
+            Rollup(closed=1, close_seconds=max(0.0, timestamp - ticket.opened_at)),
+            ("DELETE FROM tracked_tickets WHERE channel_id = ?", (channel_id,)),
+        )
@@ -0,0 +1,207 @@
+import asyncio
+import contextlib
+import heapq
+import logging
+import math
+import time
+import typing as t
+
+import discord
+
+from hom.database import Database
+
+__all__ = ("InactivitySweeper",)
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS inactivity_pings (
+    channel_id INTEGER PRIMARY KEY,
+    message_id INTEGER NOT NULL
+);
+"""
+
+# How long to wait before trying again when pinging or closing a ticket failed
+RETRY_DELAY = 300.0
+
+PingHandler = t.Callable[[discord.TextChannel], t.Awaitable[t.Optional[int]]]
+CloseHandler = t.Callable[[discord.TextChannel], t.Awaitable[None]]
+
+
+class _Ticket(t.NamedTuple):
+    channel: discord.TextChannel
+    # Both are snowflakes, which carry the time they were created at
+    last_message_id: int
+    ping_id: t.Optional[int]
+
+
+def _time(snowflake: int) -> float:
+    return discord.utils.snowflake_time(snowflake).timestamp()
+
+
+@t.final
+class InactivitySweeper:
+    __slots__ = (
+        "_close_after",
+        "_db",
+        "_heap",
+        "_ping_after",
+        "_pings",
+        "_retries",
+        "_scheduled",
+        "_task",
+        "_tickets",
+        "_wakeup",
+    )
+
+    def __init__(self, db: Database, ping_after: float, close_after: float) -> None:
+        self._db = db
+        self._ping_after = ping_after
+        self._close_after = close_after
+        # New messages push a ticket's deadline back, so rather than moving its entry the heap
+        # is left alone and the ticket is rescheduled once the old deadline comes up. Entries
+        # that don't match the deadline a ticket was last scheduled for are stale
+        self._heap: t.List[t.Tuple[float, int]] = []
+        self._scheduled: t.Dict[int, float] = {}
+        self._tickets: t.Dict[int, _Ticket] = {}
+        self._retries: t.Dict[int, float] = {}
+        self._pings: t.Dict[int, int] = {}
+        self._wakeup = asyncio.Event()
+        self._task: t.Optional[asyncio.Task[None]] = None
+
+    def __len__(self) -> int:
+        return len(self._tickets)
+
+    async def setup(self) -> None:
+        await self._db.executescript(SCHEMA)
+        rows = await self._db.fetchall("SELECT * FROM inactivity_pings")
+        self._pings = {channel_id: message_id for channel_id, message_id in rows}
+
+    def _deadline(self, ticket: _Ticket) -> float:
+        if ticket.ping_id is None:
+            deadline = _time(ticket.last_message_id) + self._ping_after
+        elif self._close_after:
+            deadline = _time(ticket.ping_id) + self._close_after
+        else:
+            # Closing is turned off, so pinged tickets wait until someone replies
+            deadline = math.inf
+
+        return max(deadline, self._retries.get(ticket.channel.id, 0.0))
+
+    def _schedule(self, channel_id: int) -> None:
+        deadline = self._scheduled[channel_id] = self._deadline(self._tickets[channel_id])
+        if deadline == math.inf:
+            return None
+
+        heapq.heappush(self._heap, (deadline, channel_id))
+
+        # Only an entry that is now first changes how long the task has to sleep for
+        if self._heap[0][1] == channel_id:
+            self._wakeup.set()
+
+    def track(self, channel: discord.TextChannel) -> None:
+        if channel.id in self._tickets:
+            return None
+
+        # Ping messages from before a restart only count if nobody has said anything since
+        last_message_id = channel.last_message_id or channel.id
+        ping_id = self._pings.get(channel.id)
+        if ping_id is not None and ping_id < last_message_id:
+            ping_id = None
+
+        self._tickets[channel.id] = _Ticket(channel, last_message_id, ping_id)
+        self._schedule(channel.id)
+
+    def rebuild(self, channels: t.Iterable[discord.TextChannel]) -> None:
+        self._tickets.clear()
+        self._scheduled.clear()
+        self._heap.clear()
+
+        for channel in channels:
+            self.track(channel)
+
+        self._wakeup.set()
+
+    def touch(self, channel_id: int, message_id: int) -> None:
+        if not (ticket := self._tickets.get(channel_id)):
+            return None
+
+        self._tickets[channel_id] = ticket = ticket._replace(
+            last_message_id=message_id, ping_id=None
+        )
+        self._retries.pop(channel_id, None)
+
+        # A reply to a ping can bring the deadline forward, which the heap has to know about
+        if self._deadline(ticket) < self._scheduled[channel_id]:
+            self._schedule(channel_id)
+
+    async def pinged(self, channel_id: int, message_id: int) -> None:
+        # Pings are sent by the bot, which touch() never sees, so the close deadline starts here
+        if ticket := self._tickets.get(channel_id):
+            self._tickets[channel_id] = ticket._replace(ping_id=message_id)
+            self._pings[channel_id] = message_id
+            await self._db.execute(
+                "INSERT OR REPLACE INTO inactivity_pings VALUES (?, ?)", (channel_id, message_id)
+            )
+
+    async def remove(self, channel_id: int) -> None:
+        # The heap entry is dropped once it comes up
+        self._tickets.pop(channel_id, None)
+        self._scheduled.pop(channel_id, None)
+        self._retries.pop(channel_id, None)
+
+        if self._pings.pop(channel_id, None) is not None:
+            await self._db.execute(
+                "DELETE FROM inactivity_pings WHERE channel_id = ?", (channel_id,)
+            )
+
+    def start(self, ping: PingHandler, close: CloseHandler) -> None:
+        if not self._task:
+            self._task = asyncio.create_task(self._run(ping, close))
+
+    def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _sleep(self) -> None:
+        self._wakeup.clear()
+        timeout = self._heap[0][0] - time.time() if self._heap else None
+
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+
+    async def _sweep(self, ticket: _Ticket, ping: PingHandler, close: CloseHandler) -> None:
+        channel_id = ticket.channel.id
+
+        if ticket.ping_id is not None:
+            await close(ticket.channel)
+            await self.remove(channel_id)
+            return None
+
+        # Without a message to go by, the close deadline starts from now
+        message_id = await ping(ticket.channel)
+        await self.pinged(
+            channel_id, message_id or discord.utils.time_snowflake(discord.utils.utcnow())
+        )
+
+    async def _run(self, ping: PingHandler, close: CloseHandler) -> None:
+        while True:
+            if not self._heap or self._heap[0][0] > time.time():
+                await self._sleep()
+                continue
+
+            deadline, channel_id = heapq.heappop(self._heap)
+            if self._scheduled.get(channel_id) != deadline:
+                continue
+
+            ticket = self._tickets[channel_id]
+            if self._deadline(ticket) <= time.time():
+                try:
+                    await self._sweep(ticket, ping, close)
+                except Exception:
+                    logger.exception(f"Failed to sweep inactive ticket {channel_id}")
+                    self._retries[channel_id] = time.time() + RETRY_DELAY
+
+            if channel_id in self._tickets:
+                self._schedule(channel_id)
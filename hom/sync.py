@@ -0,0 +1,94 @@
+import hashlib
+import json
+import logging
+import time
+import typing as t
+
+from discord import app_commands
+
+from hom.database import Database
+
+__all__ = ("CommandSync", "SyncDiff")
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS command_sync (
+    application_id INTEGER PRIMARY KEY,
+    digest TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    synced_at REAL NOT NULL
+);
+"""
+
+_Payload = t.Dict[str, t.Dict[str, t.Any]]
+
+
+class SyncDiff(t.NamedTuple):
+    added: t.List[str]
+    removed: t.List[str]
+    changed: t.List[str]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+def _key(command: t.Dict[str, t.Any]) -> str:
+    # Slash commands and context menus live in separate namespaces, so a name alone isn't unique
+    kind = {1: "/", 2: "user:", 3: "message:"}.get(command.get("type", 1), "?")
+    return f"{kind}{command['name']}"
+
+
+@t.final
+class CommandSync:
+    __slots__ = ("_db", "_tree")
+
+    def __init__(self, db: Database, tree: app_commands.CommandTree[t.Any]) -> None:
+        self._db = db
+        self._tree = tree
+
+    async def setup(self) -> None:
+        await self._db.executescript(SCHEMA)
+
+    def payload(self) -> _Payload:
+        # Only global commands are registered, so that is all there is to compare
+        return {_key(c): c for c in (command.to_dict() for command in self._tree.get_commands())}
+
+    def digest(self, payload: _Payload) -> str:
+        data = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    async def _stored(self, application_id: int) -> t.Optional[t.Tuple[str, _Payload]]:
+        row = await self._db.fetchone(
+            "SELECT digest, payload FROM command_sync WHERE application_id = ?",
+            (application_id,),
+        )
+        return (row[0], json.loads(row[1])) if row else None
+
+    async def diff(self, application_id: int) -> SyncDiff:
+        current = self.payload()
+        stored = await self._stored(application_id)
+        previous = stored[1] if stored else {}
+
+        return SyncDiff(
+            sorted(current.keys() - previous.keys()),
+            sorted(previous.keys() - current.keys()),
+            sorted(k for k in current.keys() & previous.keys() if current[k] != previous[k]),
+        )
+
+    async def sync(self, application_id: int, *, force: bool = False) -> bool:
+        payload = self.payload()
+        digest = self.digest(payload)
+        stored = await self._stored(application_id)
+
+        if not force and stored and stored[0] == digest:
+            logger.info("Application commands are unchanged, skipping sync")
+            return False
+
+        await self._tree.sync()
+        await self._db.execute(
+            "INSERT OR REPLACE INTO command_sync VALUES (?, ?, ?, ?)",
+            (application_id, digest, json.dumps(payload, sort_keys=True), time.time()),
+        )
+        logger.info(f"Synced {len(payload)} application commands")
+        return True
@@ -0,0 +1,183 @@
+import asyncio
+import datetime
+import typing as t
+
+import discord
+
+from hom.database import Database
+
+__all__ = ("TicketIndex", "TicketOwner", "TicketRecord", "TicketStore")
+
+# Members are keyed per guild since the same user can have a ticket open in several
+_Member = t.Tuple[int, int]
+
+if t.TYPE_CHECKING:
+    PendingTicket = asyncio.Future[t.Optional[discord.TextChannel]]
+else:
+    PendingTicket = asyncio.Future
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    channel_id INTEGER PRIMARY KEY,
+    owner_id INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    opened_at REAL NOT NULL,
+    owner_name TEXT NOT NULL DEFAULT ''
+);
+"""
+
+# Databases created before the column existed
+MIGRATION = "ALTER TABLE tickets ADD COLUMN owner_name TEXT NOT NULL DEFAULT ''"
+
+
+def _ticket_members(channel: discord.abc.GuildChannel) -> t.Set[int]:
+    members: t.Set[int] = set()
+
+    for target, overwrite in channel.overwrites.items():
+        if isinstance(target, discord.Role):
+            continue
+
+        if isinstance(target, discord.Object) and target.type is discord.Role:
+            continue
+
+        if target.id != channel.guild.me.id and overwrite.view_channel:
+            members.add(target.id)
+
+    return members
+
+
+@t.final
+class TicketIndex:
+    __slots__ = ("_categories", "_channels", "_pending", "_users")
+
+    def __init__(self, categories: t.Iterable[int] = ()) -> None:
+        self._categories = set(categories)
+        self._channels: t.Dict[_Member, int] = {}
+        self._users: t.Dict[int, t.Tuple[int, t.Set[int]]] = {}
+        # Tickets that are still being created, keyed by the user they are for
+        self._pending: t.Dict[_Member, PendingTicket] = {}
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def is_ticket(self, channel: discord.abc.GuildChannel) -> bool:
+        return channel.category_id in self._categories
+
+    def add_category(self, category_id: int) -> None:
+        self._categories.add(category_id)
+
+    def remove_category(self, category_id: int) -> None:
+        self._categories.discard(category_id)
+
+    def channel_for(self, guild_id: int, user_id: int) -> t.Optional[int]:
+        return self._channels.get((guild_id, user_id))
+
+    def users_for(self, channel_id: int) -> t.FrozenSet[int]:
+        _, users = self._users.get(channel_id, (0, ()))
+        return frozenset(users)
+
+    def pending(self, guild_id: int, user_id: int) -> t.Optional[PendingTicket]:
+        return self._pending.get((guild_id, user_id))
+
+    def begin(self, guild_id: int, user_id: int) -> PendingTicket:
+        future: PendingTicket = asyncio.get_running_loop().create_future()
+        self._pending[guild_id, user_id] = future
+        return future
+
+    def finish(
+        self, guild_id: int, user_id: int, channel: t.Optional[discord.TextChannel]
+    ) -> None:
+        if channel:
+            # Indexed right away rather than waiting for the channel create event
+            self.update(channel)
+
+        if (future := self._pending.pop((guild_id, user_id), None)) and not future.done():
+            future.set_result(channel)
+
+    def rebuild(self, categories: t.Iterable[discord.CategoryChannel]) -> None:
+        categories = list(categories)
+        self._categories = {c.id for c in categories}
+        self._channels.clear()
+        self._users.clear()
+
+        for category in categories:
+            for channel in category.channels:
+                self.update(channel)
+
+    def update(self, channel: discord.abc.GuildChannel) -> None:
+        self.remove(channel.id)
+
+        if not self.is_ticket(channel):
+            return None
+
+        members = _ticket_members(channel)
+        for member_id in members:
+            self._channels[channel.guild.id, member_id] = channel.id
+
+        if members:
+            self._users[channel.id] = (channel.guild.id, members)
+
+    def remove(self, channel_id: int) -> None:
+        guild_id, members = self._users.pop(channel_id, (0, set()))
+
+        for member_id in members:
+            # The user may have been indexed against a newer channel in the meantime
+            if self._channels.get((guild_id, member_id)) == channel_id:
+                del self._channels[guild_id, member_id]
+
+
+class TicketRecord(t.NamedTuple):
+    channel_id: int
+    owner_id: int
+    category: str
+    opened_at: datetime.datetime
+    # Recorded when the ticket is opened, empty for tickets from before it was
+    owner_name: str = ""
+
+
+class TicketOwner(t.NamedTuple):
+    # Members aren't cached without the members intent, this is all a ticket needs of them
+    id: int
+    display_name: str
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+
+@t.final
+class TicketStore:
+    __slots__ = ("_db",)
+
+    def __init__(self, db: Database) -> None:
+        self._db = db
+
+    async def setup(self) -> None:
+        await self._db.executescript(SCHEMA)
+        columns = {row[1] for row in await self._db.fetchall("PRAGMA table_info(tickets)")}
+
+        if "owner_name" not in columns:
+            await self._db.execute(MIGRATION)
+
+    async def add(self, record: TicketRecord) -> None:
+        await self._db.execute(
+            "INSERT OR REPLACE INTO tickets VALUES (?, ?, ?, ?, ?)",
+            (
+                record.channel_id,
+                record.owner_id,
+                record.category,
+                record.opened_at.timestamp(),
+                record.owner_name,
+            ),
+        )
+
+    async def get(self, channel_id: int) -> t.Optional[TicketRecord]:
+        row = await self._db.fetchone("SELECT * FROM tickets WHERE channel_id = ?", (channel_id,))
+        if not row:
+            return None
+
+        opened_at = datetime.datetime.fromtimestamp(row[3], tz=datetime.timezone.utc)
+        return TicketRecord(row[0], row[1], row[2], opened_at, row[4])
+
+    async def remove(self, channel_id: int) -> None:
+        await self._db.execute("DELETE FROM tickets WHERE channel_id = ?", (channel_id,))
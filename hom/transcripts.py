@@ -0,0 +1,254 @@
+import asyncio
+import datetime
+import functools
+import gzip
+import io
+import json
+import logging
+import math
+import shutil
+import tempfile
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import discord
+
+__all__ = (
+    "Entry",
+    "LogState",
+    "TranscriptLog",
+    "TranscriptPackage",
+    "format_entry",
+    "package_transcript",
+)
+
+logger = logging.getLogger(__name__)
+
+# Transcripts larger than this are spilled from memory to a temporary file
+SPOOL_SIZE = 4 * 1024 * 1024
+# Smaller transcripts are sent as plain text so they can be previewed in Discord
+COMPRESS_THRESHOLD = 1024 * 1024
+# Discord counts the whole request against a guild's upload limit, so parts are kept this far
+# under it to leave room for the multipart headers and the message sent alongside them
+UPLOAD_MARGIN = 64 * 1024
+
+
+class Entry(t.NamedTuple):
+    id: int
+    created_at: int
+    author: str
+    content: str
+    # References to where each of the message's attachments were archived
+    attachments: t.Tuple[str, ...] = ()
+
+    @classmethod
+    def from_message(
+        cls, message: discord.Message, attachments: t.Tuple[str, ...] = ()
+    ) -> "Entry":
+        author = f"{message.author.display_name.split('/')[0].strip()} - {message.author.id}"
+        created_at = int(message.created_at.timestamp())
+        return cls(message.id, created_at, author, message.clean_content, attachments)
+
+
+class LogState(t.NamedTuple):
+    entries: t.Dict[int, Entry]
+    # Whether the log was started when the channel was created
+    complete: bool
+    first_id: t.Optional[int]
+    last_id: t.Optional[int]
+
+
+@functools.lru_cache(maxsize=1024)
+def _format_minute(minute: int) -> str:
+    # Every message sent within the same minute shares this prefix
+    created_at = datetime.datetime.fromtimestamp(minute * 60, tz=datetime.timezone.utc)
+    return created_at.strftime("%b %d, %Y at %I:%M%p")
+
+
+def format_entry(entry: Entry) -> bytes:
+    timestamp = f"{_format_minute(entry.created_at // 60)} <t:{entry.created_at}:F>"
+    attachments = "".join(f"\n[Attachment] {reference}" for reference in entry.attachments)
+    return f"{timestamp}\n{entry.author}\n{entry.content}{attachments}\n\n".encode()
+
+
+@t.final
+class TranscriptLog:
+    __slots__ = ("_executor", "_pending", "_root", "_task")
+
+    def __init__(self, root: Path) -> None:
+        self._root = root
+        # Records are buffered per channel and written out in batches by a single task, a
+        # single thread keeps the writes to each file in the order they were made
+        self._pending: t.Dict[int, t.List[str]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hom-transcripts")
+        self._task: t.Optional[asyncio.Task[None]] = None
+
+    def _path(self, channel_id: int) -> Path:
+        return self._root / f"{channel_id}.jsonl"
+
+    def _write(self, batch: t.Dict[int, t.List[str]]) -> None:
+        self._root.mkdir(parents=True, exist_ok=True)
+
+        for channel_id, lines in batch.items():
+            with open(self._path(channel_id), "a", encoding="utf-8") as f:
+                f.writelines(lines)
+
+    async def _writer(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        try:
+            # Records made while a batch is being written go out with the next one
+            while self._pending:
+                batch, self._pending = self._pending, {}
+
+                try:
+                    await loop.run_in_executor(self._executor, self._write, batch)
+                except Exception:
+                    logger.exception(f"Failed to write transcript logs for {list(batch)}")
+        finally:
+            self._task = None
+
+    def _append(self, channel_id: int, record: t.Dict[str, t.Any]) -> None:
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        self._pending.setdefault(channel_id, []).append(line)
+
+        if not self._task:
+            self._task = asyncio.create_task(self._writer())
+
+    async def flush(self) -> None:
+        while task := self._task:
+            await asyncio.shield(task)
+
+    async def close(self) -> None:
+        await self.flush()
+        self._executor.shutdown(wait=True)
+
+    def channels(self) -> t.List[int]:
+        return [int(path.stem) for path in self._root.glob("*.jsonl")]
+
+    def open(self, channel_id: int) -> None:
+        self._append(channel_id, {"op": "open"})
+
+    def message(self, message: discord.Message) -> None:
+        record = {"op": "message", **Entry.from_message(message)._asdict()}
+        self._append(message.channel.id, record)
+
+    def attachments(self, message: discord.Message, references: t.Sequence[str]) -> None:
+        record = {"op": "attachments", "id": message.id, "attachments": references}
+        self._append(message.channel.id, record)
+
+    def edit(self, message: discord.Message) -> None:
+        record = {"op": "edit", "id": message.id, "content": message.clean_content}
+        self._append(message.channel.id, record)
+
+    def delete(self, channel_id: int, message_id: int) -> None:
+        self._append(channel_id, {"op": "delete", "id": message_id})
+
+    async def remove(self, channel_id: int) -> None:
+        # Runs after any batch already being written, so the file can't be recreated by it
+        self._pending.pop(channel_id, None)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._unlink, channel_id)
+
+    def _unlink(self, channel_id: int) -> None:
+        self._path(channel_id).unlink(missing_ok=True)
+
+    async def read(self, channel_id: int) -> t.Optional[LogState]:
+        await self.flush()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._read, channel_id)
+
+    def _read(self, channel_id: int) -> t.Optional[LogState]:
+        try:
+            f = open(self._path(channel_id), encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+        entries: t.Dict[int, Entry] = {}
+        complete = False
+        ids: t.List[int] = []
+
+        with f:
+            for line in f:
+                record = json.loads(line)
+                op = record.pop("op")
+
+                if op == "open":
+                    complete = True
+                elif op == "message":
+                    record["attachments"] = tuple(record.get("attachments", ()))
+                    entries[record["id"]] = Entry(**record)
+                    ids.append(record["id"])
+                elif op == "attachments" and (entry := entries.get(record["id"])):
+                    entries[entry.id] = entry._replace(attachments=tuple(record["attachments"]))
+                elif op == "edit" and (entry := entries.get(record["id"])):
+                    entries[entry.id] = entry._replace(content=record["content"])
+                elif op == "delete":
+                    entries.pop(record["id"], None)
+
+        return LogState(entries, complete, min(ids, default=None), max(ids, default=None))
+
+
+def _size(file: t.IO[bytes]) -> int:
+    file.seek(0, io.SEEK_END)
+    size = file.tell()
+    file.seek(0)
+    return size
+
+
+def _compress(archive: t.IO[bytes]) -> t.IO[bytes]:
+    compressed: t.IO[bytes] = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+
+    with gzip.GzipFile(fileobj=compressed, mode="wb") as gz:
+        shutil.copyfileobj(archive, gz)
+
+    archive.close()
+    compressed.seek(0)
+    return compressed
+
+
+@t.final
+class TranscriptPackage:
+    __slots__ = ("_file", "_limit", "filename", "size")
+
+    def __init__(self, file: t.IO[bytes], filename: str, limit: int) -> None:
+        self._file = file
+        self._limit = max(1, limit - UPLOAD_MARGIN)
+        self.filename = filename
+        self.size = _size(file)
+
+    @property
+    def parts(self) -> int:
+        return max(1, math.ceil(self.size / self._limit))
+
+    def files(self) -> t.Generator[discord.File, None, None]:
+        if self.parts == 1:
+            file = discord.File(t.cast(io.BufferedIOBase, self._file), filename=self.filename)
+
+            try:
+                yield file
+            finally:
+                # Hands closing the file back to us, discord.py only closes files it opened
+                file.close()
+
+            return None
+
+        # Only one part is held in memory at a time, concatenating
+        # the parts in order restores the original file
+        for part in range(self.parts):
+            self._file.seek(part * self._limit)
+            buf = io.BytesIO(self._file.read(self._limit))
+            yield discord.File(buf, filename=f"{self.filename}.{part + 1:03}")
+
+    def close(self) -> None:
+        self._file.close()
+
+
+async def package_transcript(archive: t.IO[bytes], name: str, limit: int) -> TranscriptPackage:
+    if _size(archive) <= COMPRESS_THRESHOLD:
+        return TranscriptPackage(archive, f"{name}.txt", limit)
+
+    loop = asyncio.get_running_loop()
+    compressed = await loop.run_in_executor(None, _compress, archive)
+    return TranscriptPackage(compressed, f"{name}.txt.gz", limit)
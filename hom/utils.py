@@ -1,43 +1,92 @@
+import asyncio
+import contextlib
 import datetime
-import functools
 import io
-import traceback
+import logging
+import re
+import tempfile
 import typing as t
+import zlib
 
 import discord
 from discord.ext import commands
 
+from hom import transcripts
+from hom.bot import Bot
 from hom.cogs import views
-from hom.config import Config
 from hom.config import Constants
+from hom.jobs import CloseJob
+from hom.scheduler import Priority
+from hom.search import INDEX_LIMIT
+from hom.search import TranscriptDocument
+from hom.tickets import TicketOwner
+from hom.tickets import TicketRecord
+
+CLOSED_LOG_RGX = re.compile(
+    r"^\((?P<topic>.*)\) Ticket channel closed for user:\n(?:.* - <@!?(?P<owner>\d+)>)?"
+)
+LOG_FOOTER_RGX = re.compile(r"Channel: (?P<channel_id>\d+)$")
+TRANSCRIPT_NAME_RGX = re.compile(r"^(?P<channel>.+?)_\d{4}_\d{2}_\d{2}_.*\.txt(?P<gz>\.gz)?")
+HISTORY_PAGE_SIZE = 100
+# Interaction tokens expire after 15 minutes, after which a queued user can't be told anything
+QUEUE_TIMEOUT = 14 * 60.0
+
+T = t.TypeVar("T")
 
 __all__ = (
+    "archive_attachments",
     "archive_channel_messages",
+    "backfill_transcript_index",
     "build_support_embed",
+    "close_ticket",
     "create_ticket_for_user",
-    "get_category",
-    "get_channel",
-    "get_role",
+    "get_ticket_owner",
     "get_user_by_original_message",
     "get_user_ticket_channel",
+    "is_moderator",
+    "iter_history",
+    "scheduled",
     "send_log_message",
 )
 
-
-def get_category(guild: discord.Guild, category_id: int) -> t.Optional[discord.CategoryChannel]:
-    # The builtin `next` short circuits as soon as it finds a match reducing iterations
-    return next((c for c in guild.categories if c.id == category_id), None)
+logger = logging.getLogger(__name__)
 
 
-def get_role(guild: discord.Guild, role_id: int) -> t.Optional[discord.Role]:
-    return next((r for r in guild.roles if r.id == role_id), None)
+async def scheduled(bot: Bot, priority: Priority, request: t.Awaitable[T]) -> T:
+    async with bot.scheduler.slot(priority):
+        return await request
 
 
-def get_channel(guild: discord.Guild, channel_id: int) -> t.Optional[discord.TextChannel]:
-    return t.cast(
-        discord.TextChannel,
-        next((c for c in guild.channels if c.id == channel_id), None),
-    )
+async def iter_history(
+    bot: Bot,
+    channel: discord.TextChannel,
+    *,
+    before: t.Optional[int] = None,
+    after: t.Optional[int] = None,
+) -> t.AsyncIterator[discord.Message]:
+    # Fetches one page per scheduler slot so long archives can't starve other requests.
+    # Pages run oldest first when paging forwards from `after`, otherwise newest first
+    while True:
+        async with bot.scheduler.slot(Priority.ARCHIVAL):
+            page = [
+                message
+                async for message in channel.history(
+                    limit=HISTORY_PAGE_SIZE,
+                    before=discord.Object(before) if before else None,
+                    after=discord.Object(after) if after else None,
+                )
+            ]
+
+        for message in page:
+            yield message
+
+        if len(page) < HISTORY_PAGE_SIZE:
+            return
+
+        if after:
+            after = page[-1].id
+        else:
+            before = page[-1].id
 
 
 async def get_user_by_original_message(
@@ -48,40 +97,147 @@ async def get_user_by_original_message(
     return mentions[0] if mentions else None
 
 
+async def get_ticket_owner(bot: Bot, channel: discord.TextChannel) -> t.Optional[TicketOwner]:
+    if record := await bot.ticket_store.get(channel.id):
+        return TicketOwner(record.owner_id, record.owner_name)
+
+    # Tickets opened before the store existed only have the welcome mention to go on
+    if user := await get_user_by_original_message(channel):
+        return TicketOwner(user.id, user.display_name)
+
+    return None
+
+
+def is_moderator(bot: Bot, member: t.Union[discord.User, discord.Member]) -> bool:
+    if not isinstance(member, discord.Member):
+        return False
+
+    mod_role = bot.guild_configs.get(member.guild.id).mod_role
+    return any(r.id == mod_role for r in member.roles)
+
+
 def get_user_ticket_channel(
-    guild: discord.Guild, user: t.Union[discord.User, discord.Member]
+    bot: Bot, guild: discord.Guild, user: t.Union[discord.User, discord.Member]
 ) -> t.Optional[discord.TextChannel]:
-    if category := get_category(guild, Config.TICKET_CATEGORY):
-        for channel in category.channels:
-            user_perms = channel.overwrites_for(user)
-
-            if user_perms.view_channel:
-                return t.cast(discord.TextChannel, channel)
+    if channel_id := bot.tickets.channel_for(guild.id, user.id):
+        return t.cast(t.Optional[discord.TextChannel], guild.get_channel(channel_id))
 
     return None
 
 
-async def create_ticket_for_user(
+async def _create_overflow_category(bot: Bot, guild: discord.Guild) -> bool:
+    capacity = bot.capacity(guild.id)
+    primary = bot.registry.category(bot.guild_configs.get(guild.id).ticket_category)
+    name = f"{primary.name if primary else 'Tickets'} {len(capacity) + 1}"
+    overwrites = {
+        target: overwrite
+        for target, overwrite in (primary.overwrites.items() if primary else ())
+        if isinstance(target, (discord.Role, discord.Member))
+    }
+
+    try:
+        category = await scheduled(
+            bot,
+            Priority.TICKET,
+            guild.create_category(
+                name,
+                overwrites=overwrites,
+                reason="All ticket categories are full.",
+            ),
+        )
+    except discord.HTTPException:
+        logger.exception("Failed to create an overflow ticket category")
+        return False
+
+    await bot.category_store.add(guild.id, category.id)
+    bot.registry.expect(guild.id, "overflow category", category.id, discord.CategoryChannel)
+    bot.registry.update(category)
+    bot.tickets.add_category(category.id)
+    capacity.add_category(category.id, category.channels)
+    return True
+
+
+async def _reserve_category(
+    bot: Bot, interaction: discord.Interaction[commands.Bot]
+) -> t.Optional[int]:
+    assert interaction.guild
+    capacity = bot.capacity(interaction.guild.id)
+
+    if (category_id := capacity.reserve()) is not None:
+        return category_id
+
+    # Without any categories nothing will ever be closed to make room, so nobody is queued
+    can_queue = len(capacity) > 0
+
+    if can_queue and bot.guild_configs.get(interaction.guild.id).create_overflow_categories:
+        async with capacity.lock:
+            # Someone else may have made room while we were waiting on the lock
+            if (category_id := capacity.reserve()) is not None:
+                return category_id
+
+            can_queue = await _create_overflow_category(bot, interaction.guild)
+            if can_queue and (category_id := capacity.reserve()) is not None:
+                return category_id
+
+    if not can_queue:
+        logger.error(f"No ticket category to create a ticket in for guild {interaction.guild.id}")
+        msg_content = (
+            f"{Constants.DENIED} Your ticket could not be created, please try again later."
+        )
+        await scheduled(
+            bot,
+            Priority.INTERACTION,
+            interaction.followup.send(content=msg_content, ephemeral=True),
+        )
+        return None
+
+    position, future = capacity.enqueue()
+    msg_content = (
+        f":hourglass:  All ticket categories are full, you're #{position} in line. "
+        "Your ticket will be created as soon as one is closed."
+    )
+    await scheduled(
+        bot, Priority.INTERACTION, interaction.followup.send(content=msg_content, ephemeral=True)
+    )
+
+    try:
+        # A timed out future is cancelled, which takes it out of the line
+        return await asyncio.wait_for(future, QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        msg_content = f"{Constants.DENIED} No room was freed up in time, please try again later."
+        await scheduled(
+            bot,
+            Priority.INTERACTION,
+            interaction.followup.send(content=msg_content, ephemeral=True),
+        )
+        return None
+    except asyncio.CancelledError:
+        if future.done() and not future.cancelled():
+            capacity.release(future.result())
+
+        raise
+
+
+async def _create_ticket_channel(
+    bot: Bot,
     interaction: discord.Interaction[commands.Bot],
-    instructions: str,
     button_label: t.Optional[str],
-    example_url: t.Optional[str] = None,
+    category_id: int,
 ) -> discord.TextChannel:
     assert interaction.guild
 
-    existing_ticket_channel = get_user_ticket_channel(interaction.guild, interaction.user)
-    if existing_ticket_channel:
-        msg_content = f":envelope:  Click [here]({existing_ticket_channel.jump_url}) to view your open ticket."
-        await interaction.followup.send(content=msg_content, ephemeral=True)
-        return existing_ticket_channel
-
     channel_name = f"help-{interaction.user.display_name[:15]}"
-    tickets_category = get_category(interaction.guild, Config.TICKET_CATEGORY)
-    if not (mod_role := get_role(interaction.guild, Config.MOD_ROLE)):
-        await interaction.followup.send("The moderator role is missing from the server.")
-        raise RuntimeError(f"Couldn't find mod role with ID: {Config.MOD_ROLE}")
+    tickets_category = bot.registry.category(category_id)
+    mod_role_id = bot.guild_configs.get(interaction.guild.id).mod_role
+    if not (mod_role := bot.registry.role(mod_role_id)):
+        await scheduled(
+            bot,
+            Priority.INTERACTION,
+            interaction.followup.send("The moderator role is missing from the server."),
+        )
+        raise RuntimeError(f"Couldn't find mod role with ID: {mod_role_id}")
 
-    new_text_channel = await interaction.guild.create_text_channel(
+    create_channel = interaction.guild.create_text_channel(
         name=channel_name,
         category=tickets_category,
         reason=f"{interaction.user.display_name} ({interaction.user.id}) has opened a ticket.",
@@ -102,25 +258,86 @@ async def create_ticket_for_user(
         },
     )
 
-    content = (
-        ":envelope:  We have created a support ticket for you, click [here]"
-        f"({new_text_channel.jump_url}) to view."
-    )
+    return await scheduled(bot, Priority.TICKET, create_channel)
 
-    embed = discord.Embed(description=instructions, title=button_label)
-    embed.set_footer(
-        text=(
-            "This channel is only visible to you and our moderators. If your question has been "
-            "answered, feel free to close the ticket."
+
+async def create_ticket_for_user(
+    interaction: discord.Interaction[commands.Bot],
+    embed: discord.Embed,
+    button_label: t.Optional[str],
+) -> t.Optional[discord.TextChannel]:
+    assert interaction.guild
+
+    bot = t.cast(Bot, interaction.client)
+
+    if not bot.guild_configs.configured(interaction.guild.id):
+        msg_content = f"{Constants.DENIED} Tickets haven't been set up in this server."
+        await scheduled(
+            bot,
+            Priority.INTERACTION,
+            interaction.followup.send(content=msg_content, ephemeral=True),
         )
-    )
+        return None
+
+    existing_ticket_channel = get_user_ticket_channel(bot, interaction.guild, interaction.user)
+
+    if not existing_ticket_channel and (
+        pending := bot.tickets.pending(interaction.guild.id, interaction.user.id)
+    ):
+        # Another click is already creating this user's ticket, so wait on that one instead
+        if not (existing_ticket_channel := await asyncio.shield(pending)):
+            msg_content = f"{Constants.DENIED} Your ticket could not be created, please try again."
+            await scheduled(
+                bot,
+                Priority.INTERACTION,
+                interaction.followup.send(content=msg_content, ephemeral=True),
+            )
+            return None
+
+    if existing_ticket_channel:
+        msg_content = f":envelope:  Click [here]({existing_ticket_channel.jump_url}) to view your open ticket."
+        await scheduled(
+            bot,
+            Priority.INTERACTION,
+            interaction.followup.send(content=msg_content, ephemeral=True),
+        )
+        return existing_ticket_channel
+
+    if remaining := bot.cooldowns.acquire(
+        "ticket", interaction.user.id, Constants.TICKET_COOLDOWN
+    ):
+        msg_content = f"{Constants.DENIED} Please wait {remaining:.1f}s before opening a ticket."
+        await scheduled(
+            bot,
+            Priority.INTERACTION,
+            interaction.followup.send(content=msg_content, ephemeral=True),
+        )
+        return None
+
+    bot.tickets.begin(interaction.guild.id, interaction.user.id)
+    new_text_channel: t.Optional[discord.TextChannel] = None
+    category_id: t.Optional[int] = None
+
+    try:
+        if (category_id := await _reserve_category(bot, interaction)) is None:
+            return None
+
+        new_text_channel = await _create_ticket_channel(
+            bot, interaction, button_label, category_id
+        )
+    finally:
+        if category_id is not None:
+            capacity = bot.capacity(interaction.guild.id)
+            if new_text_channel:
+                capacity.add(new_text_channel)
 
-    if example_url:
-        embed.set_image(url=example_url)
+            capacity.release(category_id)
 
-    await interaction.followup.send(content, ephemeral=True)
-    await new_text_channel.send(
-        f"{interaction.user.mention}", embed=embed, view=views.SupportMessage()
+        bot.tickets.finish(interaction.guild.id, interaction.user.id, new_text_channel)
+
+    content = (
+        ":envelope:  We have created a support ticket for you, click [here]"
+        f"({new_text_channel.jump_url}) to view."
     )
 
     log_content = (
@@ -128,84 +345,219 @@ async def create_ticket_for_user(
         f"- {interaction.user.mention}"
     )
 
+    record = TicketRecord(
+        new_text_channel.id,
+        interaction.user.id,
+        new_text_channel.topic or "",
+        new_text_channel.created_at,
+        interaction.user.display_name,
+    )
+
+    # None of these depend on each other, only on the channel existing
     assert interaction.client.user
-    await send_log_message(interaction, log_content, interaction.client.user)
+    await asyncio.gather(
+        bot.ticket_store.add(record),
+        bot.ticket_stats.opened(interaction.guild.id, record),
+        _send_ticket_link(bot, interaction, content),
+        scheduled(
+            bot,
+            Priority.TICKET,
+            new_text_channel.send(
+                f"{interaction.user.mention}", embed=embed, view=views.SupportMessage()
+            ),
+        ),
+        send_log_message(
+            bot, interaction.guild, log_content, interaction.client.user.display_name
+        ),
+    )
+
     return new_text_channel
 
 
+async def _send_ticket_link(
+    bot: Bot, interaction: discord.Interaction[commands.Bot], content: str
+) -> None:
+    # The interaction token may have expired while the user was waiting in line, but they're
+    # still mentioned in the new channel so there's nothing else to do
+    with contextlib.suppress(discord.HTTPException):
+        await scheduled(
+            bot, Priority.INTERACTION, interaction.followup.send(content, ephemeral=True)
+        )
+
+
+async def _archive_ticket(
+    bot: Bot, guild: discord.Guild, channel: discord.TextChannel, job: CloseJob
+) -> None:
+    content = f"({channel.topic}) Ticket channel closed for user:\n"
+    if user := await get_ticket_owner(bot, channel):
+        # Tickets from before owner names were stored only have the mention
+        content += f"{user.display_name} - {user.mention}" if user.display_name else user.mention
+
+    archive = await archive_channel_messages(bot, channel)
+    record = await bot.ticket_store.get(channel.id)
+    document = TranscriptDocument(
+        channel.id,
+        guild.id,
+        channel.name,
+        channel.topic or "",
+        user.id if user else None,
+        job.mod_id,
+        record.opened_at if record else channel.created_at,
+        discord.utils.utcnow(),
+    )
+
+    try:
+        await bot.transcript_index.add(document, archive)
+    except BaseException:
+        archive.close()
+        raise
+
+    # Jobs queued before moderator names were stored fall back to the ID
+    mod_name = job.mod_name or str(job.mod_id)
+    await send_log_message(bot, guild, content, mod_name, channel, archive)
+
+
+async def close_ticket(bot: Bot, job: CloseJob) -> None:
+    guild = bot.get_guild(job.guild_id)
+    channel = guild.get_channel(job.channel_id) if guild else None
+
+    if not guild or not isinstance(channel, discord.TextChannel):
+        # The channel was already deleted, there is nothing left to archive
+        return None
+
+    # A retry after the transcript went out must not post or index it a second time
+    if not job.uploaded:
+        await _archive_ticket(bot, guild, channel, job)
+        await bot.close_queue.mark_uploaded(job)
+
+    # Counted before the delete, which would otherwise count it without the moderator.
+    # Tickets closed for inactivity are closed by the bot itself, which isn't credited
+    await bot.ticket_stats.closed(channel.id, None if job.mod_id == guild.me.id else job.mod_id)
+
+    try:
+        await scheduled(bot, Priority.ARCHIVAL, channel.delete())
+    except discord.NotFound:
+        pass
+
+
 async def send_log_message(
-    interaction: discord.Interaction[commands.Bot],
+    bot: Bot,
+    guild: discord.Guild,
     content: str,
-    mod: t.Union[discord.User, discord.ClientUser, discord.Member],
+    mod_name: str,
     channel: t.Optional[discord.TextChannel] = None,
+    archive: t.Optional[t.IO[bytes]] = None,
 ) -> t.Optional[discord.Message]:
-    assert interaction.guild
+    footer = f"Mod: {mod_name}"
+    if channel:
+        # Lets the transcript backfill key the transcript by channel, the same way closing does
+        footer += f" | Channel: {channel.id}"
 
-    log_channel = get_channel(interaction.guild, Config.MOD_LOG_CHANNEL)
     embed = discord.Embed(title=None, description=content)
-    embed.set_footer(text=f"Mod: {mod.display_name}")
-    file: t.Optional[discord.File] = None
+    embed.set_footer(text=footer)
 
-    if channel:
-        archived_data = await archive_channel_messages(channel)
-        timestamp = datetime.datetime.now().strftime("_%Y_%m_%d_%Hh_%Mm_%Ss")
-        file_name = f"{channel}" + timestamp + ".txt"
-        buf = io.BytesIO(bytes(archived_data, "utf-8"))
-        file = discord.File(buf, filename=file_name)
+    if not channel:
+        # Plain log entries are batched with others, so there is no message to return
+        bot.mod_log(guild.id).post(embed)
+        return None
 
-    if log_channel:
-        send = functools.partial(log_channel.send, embed=embed)
-        return await (send(file=file) if file else send())
+    if not archive:
+        archive = await archive_channel_messages(bot, channel)
 
-    return None
+    timestamp = datetime.datetime.now().strftime("_%Y_%m_%d_%Hh_%Mm_%Ss")
+    package = await transcripts.package_transcript(
+        archive, f"{channel}{timestamp}", guild.filesize_limit
+    )
+
+    files = package.files()
+
+    try:
+        return await bot.mod_log(guild.id).upload(embed, files, package.parts)
+
+    finally:
+        files.close()
+        package.close()
+
+
+async def archive_attachments(bot: Bot, message: discord.Message) -> t.List[str]:
+    stored = await asyncio.gather(
+        *(bot.attachments.save(a.url, a.filename, a.size) for a in message.attachments)
+    )
+
+    # Attachments that couldn't be stored keep their CDN link, which may still resolve
+    return [
+        f"{attachment.filename} ({saved.path if saved else attachment.url})"
+        for attachment, saved in zip(message.attachments, stored)
+    ]
+
+
+async def _build_entry(bot: Bot, message: discord.Message) -> transcripts.Entry:
+    attachments = await archive_attachments(bot, message) if message.attachments else []
+    return transcripts.Entry.from_message(message, tuple(attachments))
 
 
-async def archive_channel_messages(channel: discord.TextChannel) -> str:
-    data = ""
+async def _fetch_history(
+    bot: Bot,
+    channel: discord.TextChannel,
+    entries: t.Dict[int, transcripts.Entry],
+    *,
+    before: t.Optional[int] = None,
+    after: t.Optional[int] = None,
+) -> None:
+    async for message in iter_history(bot, channel, before=before, after=after):
+        entries[message.id] = await _build_entry(bot, message)
+
+
+async def archive_channel_messages(bot: Bot, channel: discord.TextChannel) -> t.IO[bytes]:
+    archive: t.IO[bytes] = tempfile.SpooledTemporaryFile(max_size=transcripts.SPOOL_SIZE)
+    state = await bot.transcript_log.read(channel.id)
+    entries = state.entries if state else {}
 
     try:
-        async for message in channel.history(limit=None, oldest_first=True):
-            datetime_info = datetime.datetime.strftime(message.created_at, "%b %d, %Y at %I:%M%p")
-            datetime_info_timestamp = f"<t:{str(message.created_at.timestamp()).split('.')[0]}:F>"
-            data += (
-                f"{datetime_info} {datetime_info_timestamp}\n"
-                f"{message.author.display_name.split('/')[0].strip()} - "
-                f"{message.author.id}\n{message.clean_content}\n\n"
-            )
+        if not state:
+            # The ticket predates live capture so the history is the only source
+            async for message in iter_history(bot, channel, after=channel.id):
+                archive.write(transcripts.format_entry(await _build_entry(bot, message)))
 
-    except:
-        traceback.print_exc()
-        pass
+        else:
+            # Snowflakes are ordered by time, so anything the log missed while
+            # the bot was offline sits before its first or after its last entry
+            if not state.complete and state.first_id:
+                await _fetch_history(bot, channel, entries, before=state.first_id)
 
-    finally:
-        return data
+            await _fetch_history(bot, channel, entries, after=state.last_id or channel.id)
+
+    except BaseException:
+        # A partial transcript is never sent, the close job retries instead
+        archive.close()
+        raise
+
+    for message_id in sorted(entries):
+        archive.write(transcripts.format_entry(entries[message_id]))
+
+    archive.seek(0)
+    return archive
 
 
-def build_support_embed(guild: discord.Guild) -> discord.Embed:
+def build_support_embed(bot: Bot, guild: discord.Guild) -> discord.Embed:
     questions_message = ""
 
-    if questions_channel := get_channel(guild, Config.QUESTIONS_CHANNEL):
+    config = bot.guild_configs.get(guild.id)
+
+    if questions_channel := bot.registry.channel(config.questions_channel):
         questions_message = (
             "\n\nIf you'd like to ask a quick question, you may do so in the "
             f"{questions_channel.mention} channel."
         )
 
-    button_synopsis = (
-        f"\n\n**Groups** {Constants.ARROW} Assistance on group related things\n- Verify my group "
-        "(for groups with 50+ members)\n- Reset my verification code\n- Remove me from a group\n"
-        f"- Other\n\n**Name Changes** {Constants.ARROW} Help with name related things\n- Approve a "
-        "pending name change\n- Delete name change history\n- Other\n\n**Patreon** "
-        f"{Constants.ARROW} Request help with Patreon benefits\n\n**API Key** {Constants.ARROW} "
-        f"Request an API key for development\n\n**Other** {Constants.ARROW} Request assistance "
-        "for all other inquiries"
-    )
+    button_synopsis = bot.catalogs.get(config.catalog).synopsis
 
     footer = (
         "As a reminder, all moderators and admins in this server volunteer to help in their "
         "free time.\nWe appreciate your patience."
     )
 
-    suffix = f"{button_synopsis}{questions_message}"
+    suffix = f"\n\n{button_synopsis}{questions_message}"
     embed = discord.Embed(
         title="Need help from one of our moderators?",
         color=discord.Colour.dark_blue(),
@@ -214,3 +566,83 @@ def build_support_embed(guild: discord.Guild) -> discord.Embed:
 
     embed.set_footer(text=footer)
     return embed
+
+
+async def _read_transcript(attachments: t.List[discord.Attachment], compressed: bool) -> bytes:
+    loop = asyncio.get_running_loop()
+    # Parts of a split archive continue the same gzip stream
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16) if compressed else None
+    data = b""
+
+    # Only the start of a transcript is indexed, so the parts after it aren't downloaded
+    for attachment in attachments:
+        if len(data) >= INDEX_LIMIT:
+            break
+
+        chunk = await attachment.read()
+        if decompressor:
+            chunk = await loop.run_in_executor(
+                None, decompressor.decompress, chunk, INDEX_LIMIT - len(data)
+            )
+
+        data += chunk
+
+    return data[:INDEX_LIMIT]
+
+
+async def _index_log_message(
+    bot: Bot, message: discord.Message, attachments: t.List[discord.Attachment]
+) -> bool:
+    log = CLOSED_LOG_RGX.match(message.embeds[0].description or "")
+    name = TRANSCRIPT_NAME_RGX.match(attachments[0].filename)
+    if not log or not name:
+        return False
+
+    assert message.guild
+    embed = message.embeds[0]
+
+    if footer := LOG_FOOTER_RGX.search(embed.footer.text or ""):
+        document_id = int(footer["channel_id"])
+    elif await bot.transcript_index.contains(
+        message.guild.id, name["channel"], message.created_at
+    ):
+        # Logged before the channel ID was, but already indexed when the ticket was closed
+        return False
+    else:
+        document_id = message.id
+
+    data = await _read_transcript(attachments, bool(name["gz"]))
+    owner_id = int(log["owner"]) if log["owner"] else None
+    document = TranscriptDocument(
+        document_id,
+        message.guild.id,
+        name["channel"],
+        log["topic"],
+        owner_id,
+        None,
+        None,
+        message.created_at,
+    )
+
+    await bot.transcript_index.add(document, io.BytesIO(data))
+    return True
+
+
+async def backfill_transcript_index(bot: Bot, guild: discord.Guild) -> int:
+    if not (log_channel := bot.registry.channel(bot.guild_configs.get(guild.id).mod_log_channel)):
+        return 0
+
+    logs: t.List[t.Tuple[discord.Message, t.List[discord.Attachment]]] = []
+
+    async for message in iter_history(bot, log_channel, after=log_channel.id):
+        if message.author != bot.user or not message.attachments:
+            continue
+
+        if message.embeds:
+            logs.append((message, []))
+
+        # Transcripts split into parts continue in the messages after the embed
+        if logs:
+            logs[-1][1].extend(message.attachments)
+
+    return sum([await _index_log_message(bot, message, files) for message, files in logs])
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+import typing as t
+
+from hom.metrics import Metrics
+
+__all__ = ("LoopWatchdog",)
+
+logger = logging.getLogger(__name__)
+
+TICK_INTERVAL = 0.25
+
+
+@t.final
+class LoopWatchdog:
+    __slots__ = (
+        "_beat",
+        "_interval",
+        "_loop",
+        "_loop_thread",
+        "_metrics",
+        "_stopped",
+        "_task",
+        "_thread",
+        "_threshold",
+    )
+
+    def __init__(
+        self, metrics: Metrics, threshold: float, interval: float = TICK_INTERVAL
+    ) -> None:
+        self._metrics = metrics
+        self._threshold = threshold
+        self._interval = interval
+        self._beat = time.monotonic()
+        self._loop: t.Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: t.Optional[int] = None
+        self._task: t.Optional[asyncio.Task[None]] = None
+        self._thread: t.Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.create_task(self._tick())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+        if self._task:
+            self._task.cancel()
+
+    async def _tick(self) -> None:
+        while True:
+            expected = time.monotonic() + self._interval
+            await asyncio.sleep(self._interval)
+
+            self._beat = now = time.monotonic()
+            self._metrics.loop_lag.observe(max(0.0, now - expected))
+
+    def _running(self) -> str:
+        # Read from another thread, which is fine for a one off diagnostic
+        task = asyncio.current_task(self._loop) if self._loop else None
+        frame = sys._current_frames().get(self._loop_thread or 0)
+        stack = "".join(traceback.format_stack(frame)) if frame else "  (no frame available)\n"
+        return f"{f'task {task.get_name()!r}' if task else 'outside of a task'}:\n{stack}"
+
+    def _watch(self) -> None:
+        # Runs in its own thread, so it keeps going while the loop is stuck
+        reported = False
+
+        while not self._stopped.wait(self._threshold / 2):
+            behind = time.monotonic() - self._beat - self._interval
+
+            if behind < self._threshold:
+                reported = False
+                continue
+
+            # Each stall is only reported once, however long it lasts
+            if reported:
+                continue
+
+            reported = True
+            self._metrics.loop_stalls += 1
+            logger.warning(
+                f"Event loop has been blocked for at least {behind * 1000:.0f}ms, "
+                f"currently running {self._running()}"
+            )
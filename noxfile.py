@@ -33,6 +33,9 @@ def parse_dependencies(*suffixes: str) -> Dict[str, str]:
 
 DEPS = parse_dependencies("", ".dev")
 
+# The benchmark takes a while and is only run when asked for, with `nox -s bench`
+nox.options.sessions = ["types", "formatting", "imports", "tests"]
+
 
 def install(*packages: str) -> InjectorT:
     if os.name == "nt" and "uvloop" in packages:
@@ -80,3 +83,15 @@ def imports(session: nox.Session) -> None:
         "--extend-exclude",
         "__init__.py",
     )
+
+
+@nox.session(reuse_venv=True)
+@install("discord.py")
+def tests(session: nox.Session) -> None:
+    session.run("python", "-m", "unittest", "discover", "tests", *session.posargs)
+
+
+@nox.session(reuse_venv=True)
+@install("discord.py", "python-dotenv", "uvloop")
+def bench(session: nox.Session) -> None:
+    session.run("python", "-m", "bench", *session.posargs)
@@ -0,0 +1,80 @@
+import hashlib
+import tempfile
+import typing as t
+import unittest
+from pathlib import Path
+
+from aiohttp import web
+
+from hom.attachments import AttachmentStore
+
+IMAGE = b"\x89PNG" + bytes(range(256)) * 64
+
+
+class AttachmentStoreTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.requests: t.List[str] = []
+        app = web.Application()
+        app.router.add_get("/{name}", self._serve)
+
+        # A local stand-in for the CDN, on whatever port is free
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = t.cast(t.Tuple[str, int], self.runner.addresses[0])
+        self.base = f"http://{host}:{port}"
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        self.store = AttachmentStore(self.root, max_size=len(IMAGE))
+        await self.store.start()
+
+    async def asyncTearDown(self) -> None:
+        await self.store.close()
+        await self.runner.cleanup()
+        self.directory.cleanup()
+
+    async def _serve(self, request: web.Request) -> web.Response:
+        self.requests.append(request.match_info["name"])
+
+        if request.match_info["name"] == "large.png":
+            return web.Response(body=IMAGE + b"!")
+
+        if request.match_info["name"] == "missing.png":
+            return web.Response(status=404)
+
+        return web.Response(body=IMAGE)
+
+    def _stored(self) -> t.List[Path]:
+        return [path for path in self.root.rglob("*") if path.is_file()]
+
+    async def test_same_content_is_stored_once(self) -> None:
+        first = await self.store.save(f"{self.base}/a.png", "a.png")
+        second = await self.store.save(f"{self.base}/b.PNG", "b.PNG")
+
+        assert first and second
+        digest = hashlib.sha256(IMAGE).hexdigest()
+        self.assertEqual(first.digest, digest)
+        self.assertEqual(first.path, f"{digest[:2]}/{digest}.png")
+        self.assertEqual(second.path, first.path)
+        self.assertEqual(first.size, len(IMAGE))
+        self.assertEqual(self._stored(), [self.root / first.path])
+        self.assertEqual((self.root / first.path).read_bytes(), IMAGE)
+
+    async def test_declared_size_over_the_cap_is_not_downloaded(self) -> None:
+        self.assertIsNone(await self.store.save(f"{self.base}/a.png", "a.png", len(IMAGE) + 1))
+        self.assertEqual(self.requests, [])
+
+    async def test_streamed_size_over_the_cap_is_discarded(self) -> None:
+        self.assertIsNone(await self.store.save(f"{self.base}/large.png", "large.png"))
+        self.assertEqual(self.requests, ["large.png"])
+        self.assertEqual(self._stored(), [])
+
+    async def test_failed_download_leaves_nothing_behind(self) -> None:
+        self.assertIsNone(await self.store.save(f"{self.base}/missing.png", "missing.png"))
+        self.assertEqual(self._stored(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import asyncio
+import typing as t
+import unittest
+
+import discord
+
+from hom.capacity import TicketCapacity
+
+
+class _Channel(t.NamedTuple):
+    id: int
+    category_id: int
+
+
+class _Category(t.NamedTuple):
+    id: int
+    channels: t.List[_Channel]
+
+
+def _channel(channel_id: int, category_id: int) -> discord.abc.GuildChannel:
+    return t.cast(discord.abc.GuildChannel, _Channel(channel_id, category_id))
+
+
+def _category(category_id: int, channels: int) -> discord.CategoryChannel:
+    members = [_Channel(category_id * 100 + i, category_id) for i in range(channels)]
+    return t.cast(discord.CategoryChannel, _Category(category_id, members))
+
+
+class TicketCapacityTest(unittest.IsolatedAsyncioTestCase):
+    def test_categories_are_filled_in_order(self) -> None:
+        capacity = TicketCapacity([1, 2], limit=2)
+
+        self.assertEqual([capacity.reserve() for _ in range(5)], [1, 1, 2, 2, None])
+        self.assertEqual(capacity.count(1), 2)
+
+    def test_channels_count_against_the_limit(self) -> None:
+        capacity = TicketCapacity([1, 2], limit=2)
+        capacity.add(_channel(10, 1))
+        capacity.add(_channel(11, 1))
+        # Channels outside the ticket categories are ignored
+        capacity.add(_channel(12, 3))
+
+        self.assertEqual(capacity.reserve(), 2)
+
+    def test_a_created_channel_takes_over_its_reservation(self) -> None:
+        capacity = TicketCapacity([1], limit=1)
+        category_id = capacity.reserve()
+        assert category_id is not None
+
+        capacity.add(_channel(10, category_id))
+        capacity.release(category_id)
+
+        self.assertEqual(capacity.count(1), 1)
+        self.assertIsNone(capacity.reserve())
+
+    async def test_freed_slots_go_to_the_queue_in_order(self) -> None:
+        capacity = TicketCapacity([1], limit=1)
+        capacity.add(_channel(10, 1))
+        self.assertIsNone(capacity.reserve())
+
+        first_position, first = capacity.enqueue()
+        second_position, second = capacity.enqueue()
+        self.assertEqual((first_position, second_position), (1, 2))
+        self.assertEqual(capacity.waiting, 2)
+
+        capacity.remove(_channel(10, 1))
+
+        self.assertEqual(await asyncio.wait_for(first, 1), 1)
+        self.assertFalse(second.done())
+        self.assertEqual(capacity.waiting, 1)
+
+        # The slot stays reserved for the first ticket until it is created or given up on
+        capacity.release(1)
+        self.assertEqual(await asyncio.wait_for(second, 1), 1)
+
+    async def test_cancelled_waiters_are_skipped(self) -> None:
+        capacity = TicketCapacity([1], limit=1)
+        self.assertEqual(capacity.reserve(), 1)
+
+        _, cancelled = capacity.enqueue()
+        _, waiting = capacity.enqueue()
+        cancelled.cancel()
+        self.assertEqual(capacity.waiting, 1)
+
+        capacity.release(1)
+        self.assertEqual(await asyncio.wait_for(waiting, 1), 1)
+
+    async def test_new_categories_admit_the_queue(self) -> None:
+        capacity = TicketCapacity([1], limit=1)
+        self.assertEqual(capacity.reserve(), 1)
+        _, future = capacity.enqueue()
+
+        capacity.add_category(2)
+
+        self.assertEqual(await asyncio.wait_for(future, 1), 2)
+        self.assertEqual(list(capacity), [1, 2])
+
+    def test_rebuilding_keeps_reservations(self) -> None:
+        capacity = TicketCapacity([1, 2], limit=3)
+        self.assertEqual(capacity.reserve(), 1)
+
+        capacity.rebuild([_category(1, 2), _category(3, 0)])
+
+        self.assertEqual(list(capacity), [1, 3])
+        self.assertNotIn(2, capacity)
+        self.assertEqual(capacity.count(1), 3)
+        self.assertEqual(capacity.reserve(), 3)
+
+    def test_removed_categories_take_no_tickets(self) -> None:
+        capacity = TicketCapacity([1, 2], limit=1)
+        capacity.remove_category(1)
+
+        self.assertEqual(len(capacity), 1)
+        self.assertEqual([capacity.reserve(), capacity.reserve()], [2, None])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import asyncio
+import tempfile
+import time
+import typing as t
+import unittest
+from pathlib import Path
+
+from hom.database import Database
+from hom.jobs import CloseJob
+from hom.jobs import CloseQueue
+
+BACKOFF = 0.05
+
+
+class CloseQueueTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = Database(Path(self.directory.name) / "hom.sqlite3")
+        await self.db.connect()
+        self.queue = await self._queue()
+        self.handled: t.List[t.Tuple[CloseJob, float]] = []
+        self.failures = 0
+
+    async def asyncTearDown(self) -> None:
+        self.queue.stop()
+        await self.db.close()
+        self.directory.cleanup()
+
+    async def _queue(self, max_attempts: int = 3) -> CloseQueue:
+        queue = CloseQueue(self.db, concurrency=1, max_attempts=max_attempts, backoff=BACKOFF)
+        await queue.setup()
+        return queue
+
+    async def _handler(self, job: CloseJob) -> None:
+        self.handled.append((job, time.monotonic()))
+
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("Discord is down")
+
+    async def _drain(self, queue: CloseQueue) -> None:
+        # Jobs are only removed from the database once the handler has returned
+        async def drain() -> None:
+            while len(queue):
+                await asyncio.sleep(0.01)
+
+        await asyncio.wait_for(drain(), 1)
+
+    async def _rows(self) -> t.List[t.Tuple[t.Any, ...]]:
+        return await self.db.fetchall("SELECT channel_id, attempts, failed FROM close_jobs")
+
+    async def test_the_same_ticket_is_only_queued_once(self) -> None:
+        self.assertTrue(await self.queue.enqueue(CloseJob(1, 10, 100)))
+        self.assertFalse(await self.queue.enqueue(CloseJob(1, 10, 101)))
+        self.assertEqual(len(self.queue), 1)
+
+        await self.queue.start(self._handler)
+        await self._drain(self.queue)
+
+        self.assertEqual([job.mod_id for job, _ in self.handled], [100])
+        self.assertEqual(await self._rows(), [])
+        self.assertEqual(len(self.queue), 0)
+
+    async def test_failed_jobs_are_retried_with_backoff(self) -> None:
+        self.failures = 2
+        await self.queue.enqueue(CloseJob(1, 10, 100))
+
+        with self.assertLogs("hom.jobs", "WARNING"):
+            await self.queue.start(self._handler)
+            await self._drain(self.queue)
+
+        self.assertEqual([job.attempts for job, _ in self.handled], [0, 1, 2])
+        times = [at for _, at in self.handled]
+        # Each retry waits twice as long as the one before it
+        self.assertGreaterEqual(times[1] - times[0], BACKOFF * 0.9)
+        self.assertGreaterEqual(times[2] - times[1], BACKOFF * 2 * 0.9)
+        self.assertEqual(await self._rows(), [])
+
+    async def test_jobs_are_given_up_on_and_can_be_queued_again(self) -> None:
+        self.queue = await self._queue(max_attempts=2)
+        self.failures = 2
+        await self.queue.enqueue(CloseJob(1, 10, 100))
+
+        with self.assertLogs("hom.jobs", "WARNING") as logs:
+            await self.queue.start(self._handler)
+            await self._drain(self.queue)
+
+        self.assertIn("Giving up", logs.output[-1])
+
+        self.assertEqual(len(self.handled), 2)
+        self.assertEqual(await self._rows(), [(1, 2, 1)])
+        self.assertEqual(len(self.queue), 0)
+
+        # Closing the ticket again starts over rather than being refused as a duplicate
+        self.assertTrue(await self.queue.enqueue(CloseJob(1, 10, 101)))
+        await self._drain(self.queue)
+        self.assertEqual(self.handled[-1][0], CloseJob(1, 10, 101))
+        self.assertEqual(await self._rows(), [])
+
+    async def test_retries_know_the_transcript_was_uploaded(self) -> None:
+        async def handler(job: CloseJob) -> None:
+            if not job.uploaded:
+                self.handled.append((job, time.monotonic()))
+                await self.queue.mark_uploaded(job)
+                raise RuntimeError("Couldn't delete the channel")
+
+            await self._handler(job)
+
+        await self.queue.enqueue(CloseJob(1, 10, 100))
+
+        with self.assertLogs("hom.jobs", "WARNING"):
+            await self.queue.start(handler)
+            await self._drain(self.queue)
+
+        self.assertEqual([job.uploaded for job, _ in self.handled], [False, True])
+
+    async def test_pending_jobs_are_resumed_by_their_owner(self) -> None:
+        await self.queue.enqueue(CloseJob(1, 10, 100))
+        await self.queue.enqueue(CloseJob(2, 20, 100))
+
+        # A restart, where this process only handles the first guild
+        queue = await self._queue()
+        await queue.start(self._handler, lambda job: job.guild_id == 10)
+        await self._drain(queue)
+        queue.stop()
+
+        self.assertEqual([job.channel_id for job, _ in self.handled], [1])
+        self.assertEqual(await self._rows(), [(2, 0, 0)])
+
+    async def test_stopping_cancels_waiting_retries(self) -> None:
+        self.failures = 1
+        await self.queue.enqueue(CloseJob(1, 10, 100))
+
+        with self.assertLogs("hom.jobs", "WARNING"):
+            await self.queue.start(self._handler)
+
+            # The retry is scheduled once its attempt has been stored
+            while not self.queue._timers:
+                await asyncio.sleep(0.01)
+
+        self.queue.stop()
+        await asyncio.sleep(BACKOFF * 3)
+
+        self.assertEqual(len(self.handled), 1)
+        # The job is still there for the next start() to pick up
+        self.assertEqual(await self._rows(), [(1, 1, 0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import datetime
+import tempfile
+import unittest
+from pathlib import Path
+
+from hom.database import Database
+from hom.stats import Rollup
+from hom.stats import Scope
+from hom.stats import TicketStats
+from hom.tickets import TicketRecord
+
+GUILD = 1
+OPENED_AT = datetime.datetime(2024, 1, 1, 13, 30, tzinfo=datetime.timezone.utc)
+
+
+def _after(seconds: float) -> datetime.datetime:
+    return OPENED_AT + datetime.timedelta(seconds=seconds)
+
+
+class TicketStatsTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = Database(Path(self.directory.name) / "hom.sqlite3")
+        await self.db.connect()
+        self.stats = await self._stats()
+
+    async def asyncTearDown(self) -> None:
+        await self.db.close()
+        self.directory.cleanup()
+
+    async def _stats(self) -> TicketStats:
+        stats = TicketStats(self.db)
+        await stats.setup()
+        return stats
+
+    async def _open(self, channel_id: int, category: str = "Patreon") -> None:
+        await self.stats.opened(GUILD, TicketRecord(channel_id, 100, category, OPENED_AT))
+
+    async def test_only_the_first_reply_is_counted(self) -> None:
+        await self._open(10)
+        self.assertTrue(self.stats.awaiting_reply(10))
+
+        await self.stats.replied(10, 200, _after(60))
+        await self.stats.replied(10, 201, _after(120))
+
+        self.assertFalse(self.stats.awaiting_reply(10))
+        rollup = self.stats.rollup(GUILD)
+        self.assertEqual((rollup.opened, rollup.replied), (1, 1))
+        self.assertEqual(rollup.mean_reply, 60)
+        self.assertEqual(
+            self.stats.rollups(GUILD, Scope.MODERATOR),
+            {"200": Rollup(replied=1, reply_seconds=60)},
+        )
+
+    async def test_events_are_rolled_up_by_category_and_hour(self) -> None:
+        await self._open(10, "Patreon")
+        await self._open(11, "Names")
+        await self.stats.replied(11, 200, _after(30))
+        await self.stats.pinged(11, None)
+        await self.stats.user_closed(11, 100)
+        await self.stats.closed(10, 200)
+
+        rollup = self.stats.rollup(GUILD)
+        self.assertEqual(
+            (rollup.opened, rollup.replied, rollup.pings, rollup.user_closed, rollup.closed),
+            (2, 1, 1, 1, 1),
+        )
+        self.assertEqual(self.stats.rollup(GUILD, Scope.CATEGORY, "Names").replied, 1)
+        self.assertEqual(self.stats.rollup(GUILD, Scope.CATEGORY, "Patreon").closed, 1)
+        self.assertEqual(self.stats.rollup(GUILD, Scope.HOUR, "13").opened, 2)
+        # Pings sent by the bot itself aren't credited to anyone
+        self.assertEqual(self.stats.rollups(GUILD, Scope.MODERATOR).keys(), {"200"})
+        self.assertEqual(self.stats.rollup(2), Rollup())
+
+    async def test_untracked_tickets_are_ignored(self) -> None:
+        await self.stats.replied(10, 200, _after(60))
+        await self.stats.pinged(10, 200)
+        await self.stats.closed(10, 200)
+
+        self.assertEqual(self.stats.rollup(GUILD), Rollup())
+        self.assertEqual(await self.db.fetchall("SELECT * FROM ticket_events"), [])
+
+    async def test_closed_tickets_stop_being_tracked(self) -> None:
+        await self._open(10)
+        await self.stats.closed(10, None)
+        await self.stats.closed(10, 200)
+
+        self.assertEqual(self.stats.rollup(GUILD).closed, 1)
+        self.assertFalse(self.stats.awaiting_reply(10))
+
+    async def test_rollups_and_open_tickets_survive_a_restart(self) -> None:
+        await self._open(10)
+        await self._open(11)
+        await self.stats.replied(11, 200, _after(60))
+
+        before = self.stats.rollups(GUILD, Scope.ALL)
+        self.stats = await self._stats()
+
+        self.assertEqual(self.stats.rollups(GUILD, Scope.ALL), before)
+        self.assertTrue(self.stats.awaiting_reply(10))
+        self.assertFalse(self.stats.awaiting_reply(11))
+
+        # Counting carries on from the stored totals
+        await self.stats.replied(10, 200, _after(120))
+        self.assertEqual(self.stats.rollup(GUILD, Scope.MODERATOR, "200").mean_reply, 90)
+
+
+if __name__ == "__main__":
+    unittest.main()
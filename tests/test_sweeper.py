@@ -0,0 +1,167 @@
+import asyncio
+import datetime
+import tempfile
+import time
+import typing as t
+import unittest
+from pathlib import Path
+
+import discord
+
+from hom import sweeper
+from hom.database import Database
+from hom.sweeper import InactivitySweeper
+
+PING_AFTER = 0.2
+CLOSE_AFTER = 0.3
+
+
+class _Channel(t.NamedTuple):
+    id: int
+    last_message_id: t.Optional[int]
+
+
+def _snowflake(seconds_ago: float = 0.0) -> int:
+    at = discord.utils.utcnow() - datetime.timedelta(seconds=seconds_ago)
+    return discord.utils.time_snowflake(at)
+
+
+def _channel(channel_id: int, last_message_id: t.Optional[int]) -> discord.TextChannel:
+    return t.cast(discord.TextChannel, _Channel(channel_id, last_message_id))
+
+
+class InactivitySweeperTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = Database(Path(self.directory.name) / "hom.sqlite3")
+        await self.db.connect()
+        self.sweeper = await self._sweeper()
+        self.events: t.List[t.Tuple[str, int, float]] = []
+        self.changed = asyncio.Event()
+        self.failing = False
+
+    async def asyncTearDown(self) -> None:
+        self.sweeper.stop()
+        await self.db.close()
+        self.directory.cleanup()
+
+    async def _sweeper(self, close_after: float = CLOSE_AFTER) -> InactivitySweeper:
+        inactivity = InactivitySweeper(self.db, PING_AFTER, close_after)
+        await inactivity.setup()
+        return inactivity
+
+    def _record(self, event: str, channel: discord.TextChannel) -> None:
+        self.events.append((event, channel.id, time.time()))
+        self.changed.set()
+
+    async def _ping(self, channel: discord.TextChannel) -> t.Optional[int]:
+        if self.failing:
+            raise RuntimeError("Discord is down")
+
+        self._record("ping", channel)
+        return _snowflake()
+
+    async def _close(self, channel: discord.TextChannel) -> None:
+        self._record("close", channel)
+
+    async def _wait(self, events: int, timeout: float = 2.0) -> None:
+        async def wait() -> None:
+            while len(self.events) < events:
+                self.changed.clear()
+                await self.changed.wait()
+
+        await asyncio.wait_for(wait(), timeout)
+
+    async def test_inactive_tickets_are_pinged_then_closed(self) -> None:
+        started = time.time()
+        self.sweeper.track(_channel(1, _snowflake()))
+        self.sweeper.start(self._ping, self._close)
+        await self._wait(2)
+
+        (ping, _, pinged_at), (close, _, closed_at) = self.events
+        self.assertEqual((ping, close), ("ping", "close"))
+        self.assertGreaterEqual(pinged_at - started, PING_AFTER - 0.01)
+        self.assertGreaterEqual(closed_at - pinged_at, CLOSE_AFTER - 0.01)
+        self.assertEqual(len(self.sweeper), 0)
+        self.assertEqual(await self.db.fetchall("SELECT * FROM inactivity_pings"), [])
+
+    async def test_tickets_are_swept_by_deadline(self) -> None:
+        self.sweeper.track(_channel(1, _snowflake()))
+        # Went quiet before the first one did, so it comes up first
+        self.sweeper.track(_channel(2, _snowflake(PING_AFTER / 2)))
+        self.sweeper.start(self._ping, self._close)
+        await self._wait(2)
+
+        self.assertEqual(
+            [(event, channel_id) for event, channel_id, _ in self.events],
+            [("ping", 2), ("ping", 1)],
+        )
+
+    async def test_replies_push_the_deadline_back(self) -> None:
+        self.sweeper.track(_channel(1, _snowflake()))
+        self.sweeper.start(self._ping, self._close)
+        await self._wait(1)
+
+        # A reply to the ping means the ticket is pinged again rather than closed
+        replied_at = time.time()
+        self.sweeper.touch(1, _snowflake())
+        await self._wait(2)
+
+        self.assertEqual([event for event, _, _ in self.events], ["ping", "ping"])
+        self.assertGreaterEqual(self.events[1][2] - replied_at, PING_AFTER - 0.01)
+
+    async def test_pings_survive_a_restart(self) -> None:
+        channel = _channel(1, _snowflake(PING_AFTER * 2))
+        self.sweeper.track(channel)
+        self.sweeper.start(self._ping, self._close)
+        await self._wait(1)
+
+        # The ping is stored after it has been sent
+        while not await self.db.fetchall("SELECT * FROM inactivity_pings"):
+            await asyncio.sleep(0.01)
+
+        self.sweeper.stop()
+
+        self.sweeper = await self._sweeper()
+        self.sweeper.rebuild([channel])
+        self.sweeper.start(self._ping, self._close)
+        await self._wait(2)
+
+        self.assertEqual([event for event, _, _ in self.events], ["ping", "close"])
+
+    async def test_removed_tickets_are_left_alone(self) -> None:
+        self.sweeper.track(_channel(1, _snowflake()))
+        self.sweeper.track(_channel(2, _snowflake()))
+        await self.sweeper.remove(1)
+        self.sweeper.start(self._ping, self._close)
+        await self._wait(1)
+        await asyncio.sleep(PING_AFTER)
+
+        self.assertEqual([channel_id for _, channel_id, _ in self.events], [2])
+
+    async def test_pinged_tickets_stay_open_when_closing_is_off(self) -> None:
+        self.sweeper = await self._sweeper(close_after=0.0)
+        self.sweeper.track(_channel(1, _snowflake()))
+        self.sweeper.start(self._ping, self._close)
+        await self._wait(1)
+        await asyncio.sleep(PING_AFTER * 2)
+
+        self.assertEqual([event for event, _, _ in self.events], ["ping"])
+        self.assertEqual(len(self.sweeper), 1)
+
+    async def test_failures_are_retried_later(self) -> None:
+        self.failing = True
+        self.sweeper.track(_channel(1, _snowflake(PING_AFTER)))
+
+        with self.assertLogs("hom.sweeper", "ERROR"):
+            self.sweeper.start(self._ping, self._close)
+
+            while self.sweeper._scheduled[1] < time.time() + sweeper.RETRY_DELAY / 2:
+                await asyncio.sleep(0.01)
+
+        self.assertEqual(self.events, [])
+        self.assertEqual(len(self.sweeper), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
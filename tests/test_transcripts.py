@@ -0,0 +1,70 @@
+import gzip
+import io
+import os
+import typing as t
+import unittest
+
+from hom import transcripts
+from hom.transcripts import TranscriptPackage
+
+LIMIT = 4 * transcripts.UPLOAD_MARGIN
+
+
+def _parts(package: TranscriptPackage) -> t.List[t.Tuple[str, bytes]]:
+    parts: t.List[t.Tuple[str, bytes]] = []
+
+    for file in package.files():
+        parts.append((file.filename, file.fp.read()))
+
+    return parts
+
+
+class TranscriptPackageTest(unittest.TestCase):
+    def test_small_transcripts_are_sent_whole(self) -> None:
+        data = b"x" * (LIMIT - transcripts.UPLOAD_MARGIN)
+        package = TranscriptPackage(io.BytesIO(data), "help-user.txt", LIMIT)
+
+        self.assertEqual(package.parts, 1)
+        self.assertEqual(_parts(package), [("help-user.txt", data)])
+
+    def test_parts_leave_room_below_the_limit(self) -> None:
+        # Exactly at the limit is too large once the rest of the request is counted
+        package = TranscriptPackage(io.BytesIO(b"x" * LIMIT), "help-user.txt", LIMIT)
+        self.assertEqual(package.parts, 2)
+
+    def test_parts_join_back_into_the_transcript(self) -> None:
+        data = os.urandom(LIMIT * 3)
+        package = TranscriptPackage(io.BytesIO(data), "help-user.txt.gz", LIMIT)
+        parts = _parts(package)
+
+        self.assertEqual(package.parts, 4)
+        self.assertEqual(
+            [name for name, _ in parts],
+            [f"help-user.txt.gz.{part:03}" for part in range(1, 5)],
+        )
+        self.assertTrue(all(len(part) <= LIMIT - transcripts.UPLOAD_MARGIN for _, part in parts))
+        self.assertEqual(b"".join(part for _, part in parts), data)
+
+
+class PackageTranscriptTest(unittest.IsolatedAsyncioTestCase):
+    async def test_small_transcripts_stay_plain_text(self) -> None:
+        data = b"hello\n" * 10
+        package = await transcripts.package_transcript(io.BytesIO(data), "help-user", LIMIT)
+
+        self.assertEqual(package.filename, "help-user.txt")
+        self.assertEqual(package.size, len(data))
+        package.close()
+
+    async def test_large_transcripts_are_compressed(self) -> None:
+        data = b"hello\n" * transcripts.COMPRESS_THRESHOLD
+        package = await transcripts.package_transcript(io.BytesIO(data), "help-user", LIMIT)
+        parts = _parts(package)
+
+        self.assertEqual(package.filename, "help-user.txt.gz")
+        self.assertLess(package.size, len(data))
+        self.assertEqual(gzip.decompress(b"".join(part for _, part in parts)), data)
+        package.close()
+
+
+if __name__ == "__main__":
+    unittest.main()